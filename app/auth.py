@@ -1,50 +1,193 @@
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Depends, HTTPException, status
+from passlib.context import CryptContext
+from app.cache.revocation_filter import revocation_filter
+from datetime import datetime, timedelta
+from app.crud import user_crud, shared_crud
+from app.config.logger import logger
+from app.models.database import UserRole
 from sqlalchemy.orm import Session
-from . import crud, models, schemas
-from .config.database import get_db
+from dataclasses import dataclass
+from jose import JWTError, jwt
+import hashlib
+import secrets
+import asyncio
+import os
 
-SECRET_KEY = "your-secret-key"
+#Key signing access tokens, required. Every worker has to use the same key, so tokens issued by one are accepted by the
+#others and stay valid across restarts. Generate it with: python -c "import secrets; print(secrets.token_urlsafe(32))"
+SECRET_KEY = os.getenv("STREAMABIT_JWT_SECRET")
+if not SECRET_KEY:
+    raise RuntimeError("STREAMABIT_JWT_SECRET is not set, it has to hold the key signing access tokens")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("STREAMABIT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("STREAMABIT_REFRESH_TOKEN_EXPIRE_DAYS", 14))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+#bcrypt work factor (log2 of key expansion rounds). Hashes with a different work factor are rehashed on next login
+PASSWORD_HASH_ROUNDS = int(os.getenv("STREAMABIT_BCRYPT_ROUNDS", 12))
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+#Threads hashing and verifying passwords. bcrypt releases the GIL, so this caps CPU spent on hashing at this many cores.
+#Routes checking passwords are async and await the hash, database work before and after it runs in the threadpool with
+#the connection released in between, so slow hashing holds neither request threads nor pooled connections
+PASSWORD_HASH_WORKERS = int(os.getenv("STREAMABIT_PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
 
-def get_password_hash(password):
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=PASSWORD_HASH_ROUNDS,
+    bcrypt__min_rounds=PASSWORD_HASH_ROUNDS,
+    bcrypt__max_rounds=PASSWORD_HASH_ROUNDS
+)
+
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+
+def compute_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+
+#Check password against the stored hash. Returns (valid, new_hash), new_hash is set when the stored value has to be
+#replaced - it was hashed with another work factor or it is a plaintext password stored before hashing was introduced
+def compute_verify_and_update(password: str, stored_hash: str) -> tuple:
+    if not stored_hash:
+        return False, None
+    if pwd_context.identify(stored_hash) is None:
+        if secrets.compare_digest(password.encode(), stored_hash.encode()):
+            return True, pwd_context.hash(password)
+        return False, None
+    return pwd_context.verify_and_update(password, stored_hash)
+
+
+async def async_hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, compute_password_hash, password)
+
+
+async def async_verify_and_update_password(password: str, stored_hash: str) -> tuple:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, compute_verify_and_update, password, stored_hash)
+
+
+async def async_verify_password(password: str, stored_hash: str) -> bool:
+    return (await async_verify_and_update_password(password, stored_hash))[0]
+
+
+#Identity carried by an access token, everything authorization needs without a database lookup
+@dataclass(frozen=True)
+class TokenClaims:
+    user_id: int
+    role: str
+    session_id: int
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = crud.get_user_by_email(db, email)
-    if not user or not verify_password(password, user.hashed_password):
-        return False
-    return user
-
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+
+#Access token of a session, user id, role and session id are embedded as sub, role and sid claims
+def create_session_access_token(user_id: int, role: str, session_id: int) -> str:
+    return create_access_token({"sub": str(user_id), "role": role, "sid": session_id})
+
+
+def hash_refresh_token(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+#New refresh token of a session as (token, hash of its secret). The token is "<session_id>.<secret>", only the hash of
+#the secret is stored
+def create_refresh_token(session_id: int) -> tuple:
+    secret = secrets.token_urlsafe(32)
+    return f"{session_id}.{secret}", hash_refresh_token(secret)
+
+
+#Split refresh token into (session_id, hash of its secret), returns None for malformed tokens
+def parse_refresh_token(refresh_token: str):
+    session_id, _, secret = refresh_token.partition(".")
+    if not session_id.isdigit() or not secret:
+        return None
+    return int(session_id), hash_refresh_token(secret)
+
+
+def refresh_token_expiration() -> datetime:
+    return datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+#Revocations have to be kept while access tokens issued before them are still valid
+def revocation_expiration() -> datetime:
+    return datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
+#Credentials row of the user read with a pooled connection which is returned right away, run in a threadpool thread
+def read_credentials(db: Session, username: str = None, user_id: int = None):
+    db_user = user_crud.get_credentials(db=db, username=username, user_id=user_id)
+    shared_crud.release_connection(db)
+    return db_user
+
+
+def store_rehashed_password(db: Session, db_user, new_hash: str):
+    logger.info(f"Rehashing password of user {db_user.user_id}")
+    user_crud.update_password_hash(db=db, user_id=db_user.user_id, password_hash=db_user.password_hash, new_password_hash=new_hash)
+    shared_crud.commit(db)
+
+
+#Check username and password, returns the credentials row of the user or None. Passwords hashed with an outdated work
+#factor are rehashed in place, a concurrent password change wins over the rehash. Database work runs in the threadpool,
+#the password is verified by the password executor without holding a request thread or a connection
+async def authenticate_user(db: Session, username: str, password: str):
+    db_user = await run_in_threadpool(read_credentials, db=db, username=username)
+    if db_user is None:
+        #Spend the same time as a wrong password, so existing usernames cannot be told apart by response time
+        await async_verify_password(password, DUMMY_HASH)
+        return None
+
+    valid, new_hash = await async_verify_and_update_password(password, db_user.password_hash)
+    if not valid:
+        return None
+
+    if new_hash is not None:
+        await run_in_threadpool(store_rehashed_password, db=db, db_user=db_user, new_hash=new_hash)
+    return db_user
+
+
+#Claims of a valid access token whose session is not revoked, None otherwise. Only the signature, expiration and the
+#in-memory revocation filter are checked, so no database connection is taken
+def decode_access_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        return None
+
+    user_id = payload.get("sub")
+    role = payload.get("role")
+    session_id = payload.get("sid")
+    if user_id is None or not user_id.isdigit() or role is None or not isinstance(session_id, int):
+        return None
+    if revocation_filter.is_revoked(session_id):
+        return None
+    return TokenClaims(user_id=int(user_id), role=role, session_id=session_id)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenClaims:
+    claims = decode_access_token(token)
+    if claims is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+
+#Claims of an admin access token, other users get 403
+def get_current_admin(claims: TokenClaims = Depends(get_current_user)) -> TokenClaims:
+    if claims.role != UserRole.admin.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return claims
+
 
-    user = crud.get_user(db, user_id=user_id)
-    if user is None:
-        raise credentials_exception
-    return user
+DUMMY_HASH = compute_password_hash(secrets.token_urlsafe(16))
@@ -0,0 +1,129 @@
+from app.config.db_connection import engine
+from app.models.json_responses import dumps
+from app.services.etag_service import hash_parts, make_etag
+from app.config.logger import logger
+from dataclasses import dataclass
+import threading
+import select
+import os
+
+#Channel used to tell every worker that categories or sub-categories have changed
+CATEGORY_TREE_CHANNEL = "category_tree"
+
+#How often the listener thread checks if it has to stop and how long it waits before reconnecting
+LISTEN_POLL_SECONDS = float(os.getenv("STREAMABIT_CATEGORY_CACHE_POLL_SECONDS", 1))
+LISTEN_RECONNECT_SECONDS = float(os.getenv("STREAMABIT_CATEGORY_CACHE_RECONNECT_SECONDS", 5))
+
+
+#Whole category -> sub-category tree, kept as encoded JSON so cached responses are not serialized again. categories holds
+#the encoded {"name": ...} object of every category ordered by name, with the names in the same order in names, so a page
+#after a given name is found with a binary search. by_name holds encoded SubCategories responses by category name and etags
+#their entity tags. version identifies the content of the whole tree, equal trees have the same version in every worker
+@dataclass(frozen=True)
+class CategoryTree:
+    categories: list
+    names: list
+    by_name: dict
+    etags: dict
+    version: str
+
+
+#Build the tree from (category_id, category_name, category_description, sub_category_name) rows ordered by category
+def build_category_tree(rows) -> CategoryTree:
+    sub_categories = {}
+
+    for _, category_name, _, sub_category_name in rows:
+        names = sub_categories.setdefault(category_name, [])
+        if sub_category_name is not None:
+            names.append({"name": sub_category_name})
+
+    names = sorted(sub_categories)
+    by_name = {name: dumps({"category_name": name, "sub_categories": sub_categories[name]}) for name in names}
+    return CategoryTree(
+        categories=[dumps({"name": name}) for name in names],
+        names=names,
+        by_name=by_name,
+        etags={name: make_etag(body) for name, body in by_name.items()},
+        version=hash_parts(*by_name.values())
+    )
+
+
+#In-memory copy of the category tree shared by all requests of a worker. Every invalidation bumps the generation, a tree
+#loaded while an invalidation happened is not installed, so a reader racing with a write never caches the old tree.
+#With PostgreSQL the cache is only used while the worker listens for change notifications of other workers
+class CategoryTreeCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self.generation = 0
+        self.listening = engine.dialect.name != "postgresql"
+        self._listener = None
+        self._stopping = threading.Event()
+
+    #Cached tree or None when it has to be loaded from the database
+    def get(self):
+        tree = self._tree
+        if tree is not None and self.listening:
+            return tree
+        return None
+
+    def install(self, tree: CategoryTree, generation: int):
+        with self._lock:
+            if generation == self.generation and self.listening:
+                self._tree = tree
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._tree = None
+        logger.info(f"Category tree cache invalidated, generation: {self.generation}")
+
+    def _listen(self, connection):
+        cursor = connection.cursor()
+        cursor.execute(f"LISTEN {CATEGORY_TREE_CHANNEL}")
+
+        #Changes made while nothing was listening are unknown, start from an empty cache
+        self.invalidate()
+        self.listening = True
+        logger.info(f"Listening for category changes on channel {CATEGORY_TREE_CHANNEL}")
+
+        while not self._stopping.is_set():
+            if select.select([connection], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                continue
+            connection.poll()
+            if connection.notifies:
+                connection.notifies.clear()
+                self.invalidate()
+
+    #Keep a dedicated connection outside of the pool subscribed to change notifications, reconnecting when it drops
+    def _run(self):
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                connect_args, connect_params = engine.dialect.create_connect_args(engine.url)
+                connection = engine.dialect.connect(*connect_args, **connect_params)
+                connection.autocommit = True
+                self._listen(connection)
+            except Exception as ex:
+                logger.exception(f"Category change listener failed, cache disabled until it reconnects: {ex}")
+            finally:
+                self.listening = False
+                self.invalidate()
+                if connection is not None:
+                    connection.close()
+            self._stopping.wait(LISTEN_RECONNECT_SECONDS)
+
+    def start(self):
+        if engine.dialect.name == "postgresql" and self._listener is None:
+            self._stopping.clear()
+            self._listener = threading.Thread(target=self._run, name="category-tree-listener", daemon=True)
+            self._listener.start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._stopping.set()
+            self._listener.join()
+            self._listener = None
+
+
+category_tree_cache = CategoryTreeCache()
@@ -0,0 +1,85 @@
+from app.config.logger import logger
+import threading
+import math
+import os
+
+#Revoked sessions expected within one access token lifetime and accepted false positive rate of the bloom filter
+REVOCATION_FILTER_CAPACITY = int(os.getenv("STREAMABIT_REVOCATION_FILTER_CAPACITY", 100000))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("STREAMABIT_REVOCATION_FILTER_ERROR_RATE", 0.01))
+
+MASK_64 = (1 << 64) - 1
+
+#Odd multipliers of the two multiplicative hashes the bit positions are derived from
+HASH_MULTIPLIER_1 = 0x9E3779B97F4A7C15
+HASH_MULTIPLIER_2 = 0xC2B2AE3D27D4EB4F
+
+
+#Bloom filter of integer keys in a bytearray. Bit positions use double hashing over two 64-bit multiplicative hashes,
+#so a lookup costs a few integer operations and never allocates
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int):
+        first = (key * HASH_MULTIPLIER_1) & MASK_64
+        second = ((key * HASH_MULTIPLIER_2) & MASK_64) | 1
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.size
+
+    def add(self, key: int):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+#Revoked session ids of this worker. The bloom filter answers the common case - a session which is not revoked - and its
+#positives are confirmed by the exact set, so a false positive never rejects a valid token. Both are rebuilt from the
+#database by the sync job and sessions revoked by this worker are added as soon as their revocation is committed
+class RevocationFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        #(bloom filter, exact set) replaced as one value, so readers never see halves of two syncs
+        self._state = (BloomFilter(capacity, error_rate), set())
+        self.generation = 0
+        self.loaded = False
+
+    def is_revoked(self, session_id: int) -> bool:
+        bloom, revoked = self._state
+        return session_id in bloom and session_id in revoked
+
+    def add(self, session_ids):
+        with self._lock:
+            self.generation += 1
+            bloom, revoked = self._state
+            for session_id in session_ids:
+                bloom.add(session_id)
+                revoked.add(session_id)
+
+    #Replace the filter with revocations loaded from the database. Revocations are added only after they are committed,
+    #so when the generation is unchanged the loaded ids already contain them, otherwise current ids are kept as well
+    def install(self, session_ids: list, generation: int):
+        revoked = set(session_ids)
+
+        with self._lock:
+            if generation != self.generation:
+                revoked |= self._state[1]
+            bloom = BloomFilter(max(self.capacity, len(revoked)), self.error_rate)
+            for session_id in revoked:
+                bloom.add(session_id)
+            self._state = (bloom, revoked)
+            self.loaded = True
+
+        logger.info(f"Revocation filter synced, revoked sessions: {len(revoked)}")
+
+
+revocation_filter = RevocationFilter(capacity=REVOCATION_FILTER_CAPACITY, error_rate=REVOCATION_FILTER_ERROR_RATE)
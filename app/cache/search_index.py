@@ -0,0 +1,128 @@
+import app.models.database as db_models
+from app.config.logger import logger
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import event
+import threading
+import time
+import re
+import os
+
+#The in-process index is rebuilt at least this often, changes made by other workers become searchable within it
+SEARCH_INDEX_TTL_SECONDS = float(os.getenv("STREAMABIT_SEARCH_INDEX_TTL_SECONDS", 60))
+
+#Same weights ts_rank gives to A (title), B (category names) and C (description) terms in PostgreSQL
+TITLE_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.4
+DESCRIPTION_WEIGHT = 0.2
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+#Writes of these models change search documents
+INDEXED_MODELS = (db_models.PublicUpload, db_models.PublicUploadSubCategory, db_models.SubCategory, db_models.Category)
+
+#UPDATE/DELETE statements on these models change search documents. Statements on public_upload itself only write counters
+#and removed uploads are filtered out when results are read, so they keep the index
+INDEXED_STATEMENT_MODELS = (db_models.PublicUploadSubCategory, db_models.SubCategory, db_models.Category)
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+#Term -> {upload_id: weight} postings of every public upload. Built once and never modified, so searches need no lock
+class InvertedIndex:
+    def __init__(self, postings: dict):
+        self.postings = postings
+
+    #Build from get_search_documents rows
+    @classmethod
+    def build(cls, uploads, category_names):
+        postings = defaultdict(lambda: defaultdict(float))
+
+        for upload_id, title, description in uploads:
+            for term in tokenize(title):
+                postings[term][upload_id] += TITLE_WEIGHT
+            for term in tokenize(description):
+                postings[term][upload_id] += DESCRIPTION_WEIGHT
+
+        for upload_id, sub_category_name, category_name in category_names:
+            for term in tokenize(sub_category_name) + tokenize(category_name):
+                postings[term][upload_id] += CATEGORY_WEIGHT
+
+        return cls({term: dict(uploads) for term, uploads in postings.items()})
+
+    #(rank, upload_id) of uploads containing every query term, best ranked first
+    def search(self, terms: list) -> list:
+        term_postings = [self.postings.get(term) for term in set(terms)]
+        if not term_postings or any(postings is None for postings in term_postings):
+            return []
+
+        term_postings.sort(key=len)
+        matches = []
+        for upload_id in term_postings[0]:
+            if all(upload_id in postings for postings in term_postings[1:]):
+                matches.append((sum(postings[upload_id] for postings in term_postings), upload_id))
+
+        matches.sort(reverse=True)
+        return matches
+
+
+#Worker-wide search index for databases without full-text search. Commits which write indexed models invalidate it and
+#every invalidation bumps the generation, an index built while an invalidation happened is not installed
+class SearchIndex:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = 0.0
+        self.generation = 0
+
+    #Current index or None when it has to be built
+    def get(self):
+        index = self._index
+        if index is not None and time.monotonic() - self._built_at < self.ttl_seconds:
+            return index
+        return None
+
+    def install(self, index: InvertedIndex, generation: int):
+        with self._lock:
+            if generation == self.generation:
+                self._index = index
+                self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._index = None
+        logger.info(f"Search index invalidated, generation: {self.generation}")
+
+
+search_index = SearchIndex(ttl_seconds=SEARCH_INDEX_TTL_SECONDS)
+
+
+@event.listens_for(Session, "after_flush")
+def track_indexed_changes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, INDEXED_MODELS):
+            session.info["search_index_changed"] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def track_indexed_statements(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, INDEXED_STATEMENT_MODELS):
+            orm_execute_state.session.info["search_index_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_search_index(session):
+    if session.info.pop("search_index_changed", False):
+        search_index.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_rolled_back_search_changes(session):
+    session.info.pop("search_index_changed", None)
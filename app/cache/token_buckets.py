@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from app.config.logger import logger
+from dataclasses import dataclass
+import threading
+import time
+import os
+
+#Buckets kept by a worker, the least recently used bucket is dropped first and starts full when it is used again
+TOKEN_BUCKET_MAX_ENTRIES = int(os.getenv("STREAMABIT_RATE_LIMIT_MAX_BUCKETS", 100000))
+
+#Redis shared by all workers, buckets are kept in-process per worker when it is not set
+TOKEN_BUCKET_REDIS_URL = os.getenv("STREAMABIT_RATE_LIMIT_REDIS_URL")
+
+
+#Bucket of burst tokens refilled at rate tokens per second, every request takes one token
+@dataclass(frozen=True)
+class RateLimit:
+    rate: float
+    burst: int
+
+
+#Parse "<requests>/<seconds>" into a limit allowing bursts of <requests> refilled over <seconds>, "0" disables the limit
+def parse_rate_limit(value: str):
+    requests, _, seconds = value.partition("/")
+    if int(requests) <= 0:
+        return None
+    return RateLimit(rate=int(requests) / float(seconds or 1), burst=int(requests))
+
+
+#Token buckets of this worker in a bounded LRU. take_all() costs one dict lookup and a few float operations per bucket
+class LocalTokenBuckets:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def _refill(self, key: str, limit: RateLimit, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return limit.burst
+        return min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+
+    #Take a token from every bucket or from none of them, buckets is a list of (key, limit). Returns 0 when the tokens
+    #were taken or seconds until every bucket has a token
+    def take_all_now(self, buckets: list, now: float) -> float:
+        with self._lock:
+            levels = [self._refill(key, limit, now) for key, limit in buckets]
+            wait = max(((1 - tokens) / limit.rate for (_, limit), tokens in zip(buckets, levels) if tokens < 1), default=0)
+            taken = 0 if wait > 0 else 1
+
+            for (key, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - taken, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+            return wait
+
+    async def take_all(self, buckets: list) -> float:
+        return self.take_all_now(buckets, time.monotonic())
+
+    async def close(self):
+        pass
+
+
+#Refill every bucket and take a token from all of them only when each has one, in one script, so concurrent workers
+#never take the same token and a rejected request takes nothing. KEYS are the buckets, ARGV holds rate and burst of
+#each. Redis TIME is the clock of all workers
+TAKE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local levels = {}
+local wait = 0
+for index, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[index * 2 - 1])
+    local burst = tonumber(ARGV[index * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = burst
+    if bucket[1] then
+        tokens = math.min(burst, tonumber(bucket[1]) + math.max(0, now - tonumber(bucket[2])) * rate)
+    end
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    levels[index] = tokens
+end
+local taken = 1
+if wait > 0 then
+    taken = 0
+end
+for index, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[index * 2 - 1])
+    local burst = tonumber(ARGV[index * 2])
+    redis.call('HSET', key, 'tokens', tostring(levels[index] - taken), 'updated', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return tostring(wait)
+"""
+
+
+#Token buckets shared by all workers in Redis, one round trip per request. When Redis cannot be reached requests are
+#limited by the buckets of the worker instead
+class RedisTokenBuckets:
+    def __init__(self, url: str, max_entries: int):
+        #Imported here, so redis is only required when shared buckets are configured
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+        self._fallback = LocalTokenBuckets(max_entries=max_entries)
+        self._available = True
+
+    async def take_all(self, buckets: list) -> float:
+        keys = [f"streamabit:rate:{key}" for key, _ in buckets]
+        args = [value for _, limit in buckets for value in (limit.rate, limit.burst)]
+        try:
+            wait = float(await self._take(keys=keys, args=args))
+        except Exception as ex:
+            if self._available:
+                logger.warning(f"Shared rate limit buckets unavailable, using buckets of this worker: {ex}")
+                self._available = False
+            return await self._fallback.take_all(buckets)
+
+        if not self._available:
+            logger.info("Shared rate limit buckets available again")
+            self._available = True
+        return wait
+
+    async def close(self):
+        await self._client.close()
+
+
+def create_token_buckets():
+    if TOKEN_BUCKET_REDIS_URL:
+        return RedisTokenBuckets(url=TOKEN_BUCKET_REDIS_URL, max_entries=TOKEN_BUCKET_MAX_ENTRIES)
+    return LocalTokenBuckets(max_entries=TOKEN_BUCKET_MAX_ENTRIES)
+
+
+token_buckets = create_token_buckets()
@@ -0,0 +1,168 @@
+from app.config.logger import logger
+from datetime import datetime
+import threading
+import bisect
+import math
+import time
+import os
+
+#Score of an event halves every half-life, so recent activity outranks older totals
+TRENDING_HALF_LIFE_SECONDS = float(os.getenv("STREAMABIT_TRENDING_HALF_LIFE_HOURS", 24)) * 3600
+
+#Number of uploads kept ranked for /trending and for every category
+TRENDING_SIZE = int(os.getenv("STREAMABIT_TRENDING_SIZE", 100))
+
+#Score weights of single events
+VIEW_WEIGHT = 1.0
+DOWNLOAD_WEIGHT = 3.0
+LIKE_WEIGHT = 5.0
+
+DECAY_RATE = math.log(2) / TRENDING_HALF_LIFE_SECONDS
+
+#Scores are rebased once the epoch is this old, well before exp() of normalized scores can overflow
+REBASE_AFTER_SECONDS = 100 * TRENDING_HALF_LIFE_SECONDS
+
+#Eligible upload - approved, unexpired, with its title and names of categories it is placed in
+class RankedUpload:
+    __slots__ = ("upload_id", "title", "expiration_date", "categories")
+
+    def __init__(self, upload_id: int, title: str, expiration_date: datetime, categories: tuple):
+        self.upload_id = upload_id
+        self.title = title
+        self.expiration_date = expiration_date
+        self.categories = categories
+
+
+#Best size uploads as an ascending list of (-score, upload_id), so the first k entries are the top k
+class TopList:
+    def __init__(self, size: int):
+        self.size = size
+        self.entries = []
+        self.scores = {}
+
+    def update(self, upload_id: int, score: float):
+        old_score = self.scores.get(upload_id)
+        if old_score is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-old_score, upload_id))]
+        elif len(self.entries) >= self.size and (-score, upload_id) >= self.entries[-1]:
+            return
+        elif len(self.entries) >= self.size:
+            _, evicted_id = self.entries.pop()
+            del self.scores[evicted_id]
+
+        bisect.insort(self.entries, (-score, upload_id))
+        self.scores[upload_id] = score
+
+    def discard(self, upload_id: int):
+        score = self.scores.pop(upload_id, None)
+        if score is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-score, upload_id))]
+
+
+#Time-decayed ranking of public uploads. Scores use forward decay: an event at time t adds weight * exp(rate * (t - epoch)),
+#so stored scores only grow, their order equals the order of decayed scores at any moment and nothing has to be
+#recomputed as time passes. Since scores only grow, bounded top lists stay exact as long as every upload's score is known.
+#Events update the lists in O(size), reads take the first k entries.
+#Scores are confirmed from counters stored in the database, which every worker sees, on each load. Events of this worker
+#are added right away as provisional scores and replaced by the stored counters once flushed, so all workers converge on
+#the same ranking within a refresh
+class TrendingRanking:
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._epoch = time.time()
+        self._scores = {}
+        self._confirmed = {}
+        self._totals = {}
+        self._uploads = {}
+        self._top = {None: TopList(size)}
+        self.loaded = False
+
+    def _normalize(self, weight: float, timestamp: float) -> float:
+        return weight * math.exp(DECAY_RATE * (timestamp - self._epoch))
+
+    def _place(self, upload: RankedUpload, score: float):
+        self._top[None].update(upload.upload_id, score)
+        for category in upload.categories:
+            top = self._top.get(category)
+            if top is None:
+                top = self._top[category] = TopList(self.size)
+            top.update(upload.upload_id, score)
+
+    #Add a provisional event of provided weight to upload's score, it counts until the next load
+    def record(self, upload_id: int, weight: float):
+        with self._lock:
+            score = self._scores.get(upload_id, 0.0) + self._normalize(weight, time.time())
+            self._scores[upload_id] = score
+            upload = self._uploads.get(upload_id)
+            if upload is not None:
+                self._place(upload, score)
+
+    def discard(self, upload_ids):
+        with self._lock:
+            for upload_id in upload_ids:
+                self._scores.pop(upload_id, None)
+                self._confirmed.pop(upload_id, None)
+                self._totals.pop(upload_id, None)
+                upload = self._uploads.pop(upload_id, None)
+                if upload is not None:
+                    for top in self._top.values():
+                        top.discard(upload_id)
+
+    #Replace eligible uploads with a fresh set loaded from the database. totals holds (stored weighted event total, time
+    #of the upload) of every eligible upload. A newly eligible upload is seeded with its total as if every event happened
+    #at upload time, so older totals count less than recent ones. Growth of a known total since the previous load is
+    #added as events of now. Provisional scores of this worker are dropped, flushed events are part of the totals
+    def load(self, uploads: list, totals: dict):
+        with self._lock:
+            now = time.time()
+            if now - self._epoch > REBASE_AFTER_SECONDS:
+                self._rebase(now)
+
+            confirmed = {}
+            for upload_id, (total, timestamp) in totals.items():
+                previous_total = self._totals.get(upload_id)
+                if previous_total is None:
+                    confirmed[upload_id] = self._normalize(total, timestamp)
+                else:
+                    confirmed[upload_id] = self._confirmed[upload_id] + self._normalize(max(total - previous_total, 0.0), now)
+
+            self._confirmed = confirmed
+            self._totals = {upload_id: total for upload_id, (total, _) in totals.items()}
+            self._scores = dict(confirmed)
+            self._uploads = {upload.upload_id: upload for upload in uploads}
+
+            self._top = {None: TopList(self.size)}
+            for upload in uploads:
+                self._place(upload, self._scores.get(upload.upload_id, 0.0))
+            self.loaded = True
+
+        logger.info(f"Trending ranking loaded, eligible uploads: {len(uploads)}, ranked categories: {len(self._top) - 1}")
+
+    #Move the epoch to now, scaling every confirmed score by the decay since the old epoch
+    def _rebase(self, now: float):
+        factor = math.exp(-DECAY_RATE * (now - self._epoch))
+        self._confirmed = {upload_id: score * factor for upload_id, score in self._confirmed.items()}
+        self._epoch = now
+
+    #Best k eligible uploads of a category (None for all uploads) with their current decayed scores
+    def top(self, category: str, k: int) -> list:
+        with self._lock:
+            top_list = self._top.get(category)
+            if top_list is None:
+                return []
+
+            now = datetime.utcnow()
+            decay = math.exp(-DECAY_RATE * (time.time() - self._epoch))
+            results = []
+            for negative_score, upload_id in top_list.entries:
+                upload = self._uploads[upload_id]
+                if upload.expiration_date is not None and upload.expiration_date < now:
+                    continue
+                results.append({"upload_id": upload_id, "title": upload.title, "score": -negative_score * decay})
+                if len(results) == k:
+                    break
+            return results
+
+
+trending_ranking = TrendingRanking(size=TRENDING_SIZE)
@@ -0,0 +1,111 @@
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from sqlalchemy import event
+from datetime import datetime
+import threading
+import time
+import os
+
+#Identities are shared by all requests of a worker, other workers see changes once their entries expire. Password hashes
+#are never cached, credential checks read them from the database
+USER_CACHE_TTL_SECONDS = float(os.getenv("STREAMABIT_USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("STREAMABIT_USER_CACHE_MAX_ENTRIES", 10000))
+
+
+#Read-only copy of user columns, safe to share between sessions and threads. A plain class rather than a dataclass,
+#so response models read it through orm_mode attribute access
+class UserIdentity:
+    __slots__ = ("user_id", "username", "email", "role", "created_at")
+
+    def __init__(self, user_id: int, username: str, email: str, role, created_at: datetime):
+        for name, value in (("user_id", user_id), ("username", username), ("email", email), ("role", role), ("created_at", created_at)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserIdentity is read-only")
+
+    @classmethod
+    def from_user(cls, db_user):
+        return cls(
+            user_id=db_user.user_id,
+            username=db_user.username,
+            email=db_user.email,
+            role=db_user.role,
+            created_at=db_user.created_at
+        )
+
+
+#Bounded LRU of user identities reachable by ("user_id", id), ("username", name) and ("email", address) keys
+class UserIdentityCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            identity, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(identity)
+                return None
+
+            self._entries.move_to_end(key)
+            return identity
+
+    def put(self, identity: UserIdentity):
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._remove_by_id(identity.user_id)
+            for key in (("user_id", identity.user_id), ("username", identity.username), ("email", identity.email)):
+                self._entries[key] = (identity, expires_at)
+
+            while len(self._entries) > self.max_entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._remove(evicted)
+
+    def _remove(self, identity: UserIdentity):
+        for key in (("user_id", identity.user_id), ("username", identity.username), ("email", identity.email)):
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is identity:
+                del self._entries[key]
+
+    def _remove_by_id(self, user_id: int):
+        entry = self._entries.get(("user_id", user_id))
+        if entry is not None:
+            self._remove(entry[0])
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._remove_by_id(user_id)
+
+    #Drop the user now and once more after the transaction commits, so a lookup running in between cannot keep the
+    #old identity cached. Async sessions pass their sync_session
+    def invalidate_on_commit(self, session: Session, user_id: int):
+        self.invalidate(user_id)
+        session.info.setdefault("invalidated_user_ids", set()).add(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_identity_cache = UserIdentityCache(ttl_seconds=USER_CACHE_TTL_SECONDS, max_entries=USER_CACHE_MAX_ENTRIES)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_users(session):
+    for user_id in session.info.pop("invalidated_user_ids", ()):
+        user_identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_rolled_back_users(session):
+    session.info.pop("invalidated_user_ids", None)
@@ -1,5 +1,7 @@
 from datetime import datetime
 from loguru import logger
+import random
+import sys
 import os
 
 if not os.path.exists('logs/error'):
@@ -10,14 +12,46 @@ if not os.path.exists('logs/info'):
 
 today = datetime.today().strftime("%Y-%m-%d")
 
-logger.add(f"logs/error/{today}.log", 
-           rotation="00:00", 
-           retention="30 days", 
+#Share of records kept for chatty levels, 1 keeps every record. Levels from WARNING up are never sampled
+SAMPLED_LEVELS = ("TRACE", "DEBUG", "INFO", "SUCCESS")
+LOG_SAMPLE_RATES = {level: float(os.getenv(f"STREAMABIT_LOG_{level}_SAMPLE_RATE", 1)) for level in SAMPLED_LEVELS}
+
+CONSOLE_LOG_LEVEL = os.getenv("STREAMABIT_LOG_CONSOLE_LEVEL", "INFO")
+
+
+#Records of a request share one sample value set by the request context middleware, so a sampled request keeps
+#all of its records instead of a random subset. Records outside of a request are sampled one by one
+def sample_record(record) -> bool:
+    rate = LOG_SAMPLE_RATES.get(record["level"].name)
+    if rate is None or rate >= 1:
+        return True
+    return record["extra"].get("sample", random.random()) < rate
+
+
+logger.configure(extra={"request_id": None})
+
+#Sinks are enqueued - request threads only put the serialized record on a queue, a background worker does the I/O
+logger.remove()
+
+logger.add(sys.stderr,
+           level=CONSOLE_LOG_LEVEL,
+           filter=sample_record,
+           enqueue=True,
+           )
+
+logger.add(f"logs/error/{today}.log",
+           rotation="00:00",
+           retention="30 days",
            level="ERROR",
+           serialize=True,
+           enqueue=True,
            )
 
-logger.add(f"logs/info/{today}.log", 
-           rotation="00:00", 
-           retention="30 days", 
+logger.add(f"logs/info/{today}.log",
+           rotation="00:00",
+           retention="30 days",
            level="INFO",
-           )
\ No newline at end of file
+           filter=sample_record,
+           serialize=True,
+           enqueue=True,
+           )
@@ -0,0 +1,125 @@
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config.logger import logger
+from sqlalchemy import event
+import threading
+import bisect
+import time
+import os
+
+#Checkouts waiting longer than this are logged with pool state
+SLOW_CHECKOUT_THRESHOLD_MS = float(os.getenv("STREAMABIT_DB_POOL_SLOW_CHECKOUT_MS", 100))
+
+#Upper bounds of checkout wait histogram buckets in milliseconds, last bucket is unbounded
+CHECKOUT_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+#Counters of one connection pool, updated from pool events and checkout timing
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_wait_ms_sum = 0.0
+        self.checkout_wait_buckets = [0] * (len(CHECKOUT_WAIT_BUCKETS_MS) + 1)
+        self.slow_checkouts = 0
+        self.checkout_timeouts = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.connections_invalidated = 0
+
+    def observe_checkout(self, pool, wait_ms: float, timed_out: bool):
+        with self._lock:
+            self.pool = pool
+            if timed_out:
+                self.checkout_timeouts += 1
+            else:
+                self.checkouts += 1
+            self.checkout_wait_ms_sum += wait_ms
+            self.checkout_wait_buckets[bisect.bisect_left(CHECKOUT_WAIT_BUCKETS_MS, wait_ms)] += 1
+            slow = wait_ms >= SLOW_CHECKOUT_THRESHOLD_MS
+            if slow:
+                self.slow_checkouts += 1
+
+        if slow:
+            outcome = "timed out" if timed_out else "succeeded"
+            logger.warning(f"Slow {self.name} database pool checkout {outcome} after {wait_ms:.1f} ms, {pool.status()}")
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    #Current pool state with accumulated counters
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{bound}": count for bound, count in zip(CHECKOUT_WAIT_BUCKETS_MS, self.checkout_wait_buckets)}
+            buckets["le_inf"] = self.checkout_wait_buckets[-1]
+
+            return {
+                "pool": self.name,
+                "size": self.pool.size() if self.pool else 0,
+                "checked_out": self.pool.checkedout() if self.pool else 0,
+                "checked_in": self.pool.checkedin() if self.pool else 0,
+                "overflow": max(self.pool.overflow(), 0) if self.pool else 0,
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "checkout_wait_ms_sum": round(self.checkout_wait_ms_sum, 3),
+                "checkout_wait_ms_buckets": buckets,
+                "connections_opened": self.connections_opened,
+                "connections_closed": self.connections_closed,
+                "connections_invalidated": self.connections_invalidated
+            }
+
+
+pool_metrics = {name: PoolMetrics(name) for name in ("sync", "async")}
+
+
+#Time spent waiting for a connection is measured around QueuePool._do_get, which blocks while the pool is exhausted.
+#Pools created again by engine.dispose() keep their class, so measurements continue after a dispose
+class InstrumentedPoolMixin:
+    metrics_name = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = True
+        try:
+            connection = super()._do_get()
+            timed_out = False
+            return connection
+        finally:
+            wait_ms = (time.perf_counter() - started) * 1000
+            pool_metrics[self.metrics_name].observe_checkout(self, wait_ms, timed_out)
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    metrics_name = "sync"
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+#Connection churn is counted from pool events, listeners registered on the engine carry over to pools recreated by dispose
+def register_pool_events(engine, name: str):
+    metrics = pool_metrics[name]
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.increment("connections_opened")
+
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        metrics.increment("connections_closed")
+
+    @event.listens_for(engine, "close_detached")
+    def on_close_detached(dbapi_connection):
+        metrics.increment("connections_closed")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("connections_invalidated")
+
+
+def get_pool_metrics() -> list:
+    return [metrics.snapshot() for metrics in pool_metrics.values()]
@@ -0,0 +1,36 @@
+import os
+
+STORAGE_DIR = os.getenv("STREAMABIT_STORAGE_DIR", "storage")
+
+BLOBS_DIR = os.path.join(STORAGE_DIR, "blobs")
+TEMP_DIR = os.path.join(STORAGE_DIR, "tmp")
+PARTIAL_DIR = os.path.join(STORAGE_DIR, "partial")
+
+#Size of a single write to storage, request body is buffered up to this size before it gets flushed
+UPLOAD_CHUNK_SIZE = int(os.getenv("STREAMABIT_UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+#Maximum accepted upload size in bytes, 0 disables the limit
+MAX_UPLOAD_SIZE = int(os.getenv("STREAMABIT_MAX_UPLOAD_SIZE", 0))
+
+#Maximum size of a single non-file multipart form field
+MAX_FORM_FIELD_SIZE = 64 * 1024
+
+#Resumable uploads - default and allowed chunk sizes, inactivity time after which an unfinished upload is removed
+RESUMABLE_CHUNK_SIZE = int(os.getenv("STREAMABIT_RESUMABLE_CHUNK_SIZE", 8 * 1024 * 1024))
+MIN_RESUMABLE_CHUNK_SIZE = 256 * 1024
+MAX_RESUMABLE_CHUNK_SIZE = 64 * 1024 * 1024
+RESUMABLE_UPLOAD_TTL_SECONDS = int(os.getenv("STREAMABIT_RESUMABLE_UPLOAD_TTL_SECONDS", 24 * 60 * 60))
+RESUMABLE_UPLOAD_GC_INTERVAL_SECONDS = int(os.getenv("STREAMABIT_RESUMABLE_UPLOAD_GC_INTERVAL_SECONDS", 10 * 60))
+RESUMABLE_UPLOAD_GC_BATCH_SIZE = 100
+
+#Internal location prefix under which a reverse proxy (nginx X-Accel-Redirect) serves BLOBS_DIR, downloads are handed off to the proxy when set
+ACCEL_REDIRECT_PREFIX = os.getenv("STREAMABIT_ACCEL_REDIRECT_PREFIX", "")
+
+if not os.path.exists(BLOBS_DIR):
+    os.makedirs(BLOBS_DIR)
+
+if not os.path.exists(TEMP_DIR):
+    os.makedirs(TEMP_DIR)
+
+if not os.path.exists(PARTIAL_DIR):
+    os.makedirs(PARTIAL_DIR)
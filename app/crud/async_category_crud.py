@@ -0,0 +1,140 @@
+from app.models import database as db_models, requests as requestModel
+from app.cache.category_tree_cache import CATEGORY_TREE_CHANNEL
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, select, update
+from app.crud import shared_crud
+from app.config.logger import logger
+from fastapi import HTTPException
+
+
+#Get category object by name
+async def get_category_by_name(db: AsyncSession, name: str):
+    try:
+        logger.info("Searching for category")
+
+        if name:
+            query = select(db_models.Category)
+            query = query.where(db_models.Category.name == name)
+
+            return (await db.execute(query)).scalars().first()
+        else:
+            logger.warning("Category name is not provided")
+            raise HTTPException(status_code=400, detail="Category name is not provided")
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with category name={name}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with category name={name}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Insert a new category with provided fields: name and description(optional) in one statement. Returns (category_id, name,
+#description, created_at) row or None when a category with the same name already exists
+async def create_category(db: AsyncSession, category: requestModel.CategoryCreate):
+    try:
+        logger.info("Attempting to create category")
+
+        statement = shared_crud.insert_on_conflict(db, db_models.Category).values(**category.dict())
+        statement = statement.on_conflict_do_nothing()
+        statement = statement.returning(db_models.Category.category_id, db_models.Category.name, db_models.Category.description, db_models.Category.created_at)
+
+        db_category = (await db.execute(statement)).first()
+        if db_category is None:
+            logger.warning(f"Category not created, category with name: {category.name} already exists")
+        else:
+            logger.info("Category prepared for creation, waiting for transaction commit")
+
+        return db_category
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with category name={category.name}, description={category.description}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with category name={category.name}, description={category.description}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+    
+
+#Parse all category objects
+async def get_all_categories(db: AsyncSession):
+    try:
+        logger.info("Attempting to parse all categories")
+
+        category_names = (await db.execute(select(db_models.Category.name))).scalars().all()
+
+        categories_list = [
+            {"name": category_name}
+            for category_name in category_names
+        ]
+
+        logger.info("Categories parsed")
+
+        return categories_list
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Update category name and/or description in one statement. Returns (category_id, name, description, created_at) row or
+#None when the category does not exist, a new name taken by another category is reported as 409 by the unique constraint
+async def update_category(db: AsyncSession, category_name: str, new_name: str, new_description: str):
+    try:
+        logger.info("Attempting to update category data")
+        values = {}
+
+        if new_name is not None:
+            values["name"] = new_name
+        if new_description is not None:
+            values["description"] = new_description
+
+        statement = update(db_models.Category).where(db_models.Category.name == category_name).values(**values)
+        statement = statement.returning(db_models.Category.category_id, db_models.Category.name, db_models.Category.description, db_models.Category.created_at)
+
+        category = (await db.execute(statement)).first()
+        if category is None:
+            logger.warning("Category cannot be updated - category with provided name not found")
+        else:
+            logger.info("Category prepared to get fields updated, waiting for transaction commit")
+
+        return category
+    except IntegrityError as ex:
+        if shared_crud.is_unique_violation(ex):
+            logger.warning("Category cannot be updated - category with provided new_name already exists")
+            raise HTTPException(status_code=409, detail="Category with provided new_name already exists")
+        logger.error(f"IntegrityError with category name={category_name}, new_name={new_name}, new_description={new_description}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with category name={category_name}, new_name={new_name}, new_description={new_description}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Parse the whole category tree with one query, see category_crud.get_category_tree
+async def get_category_tree(db: AsyncSession):
+    try:
+        logger.info("Attempting to parse category tree")
+
+        query = select(db_models.Category.category_id, db_models.Category.name, db_models.Category.description, db_models.SubCategory.name)
+        query = query.outerjoin(db_models.SubCategory, db_models.SubCategory.fk_category_id == db_models.Category.category_id)
+        query = query.order_by(db_models.Category.category_id, db_models.SubCategory.sub_category_id)
+
+        rows = (await db.execute(query)).all()
+
+        logger.info("Category tree parsed")
+
+        return rows
+    except Exception as ex:
+        logger.error(f"Exception: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Tell every worker to drop its cached category tree, PostgreSQL delivers the notification only when the transaction commits
+async def notify_category_change(db: AsyncSession):
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(select(func.pg_notify(CATEGORY_TREE_CHANNEL, "")))
+            logger.info("Category change notification prepared, waiting for transaction commit")
+    except Exception as ex:
+        logger.error(f"Exception: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -0,0 +1,17 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+async def flush(db: AsyncSession):
+    return await db.flush()
+
+async def commit(db: AsyncSession):
+    return await db.commit()
+
+async def rollback(db: AsyncSession):
+    return await db.rollback()
+
+#End the current read-only transaction, so its pooled connection is returned before slow work which needs no database,
+#like password hashing. Async sessions do not expire objects on commit, loaded objects keep their values
+async def release_connection(db: AsyncSession):
+    if db.new or db.dirty or db.deleted:
+        raise RuntimeError("Connection cannot be released with pending changes")
+    return await db.commit()
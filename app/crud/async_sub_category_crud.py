@@ -0,0 +1,34 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import database as db_models
+from sqlalchemy.exc import IntegrityError
+from app.config.logger import logger
+from fastapi import HTTPException
+from sqlalchemy import select
+
+
+#Get all sub-category objects by category object id
+async def get_sub_categories_by_category_id(db: AsyncSession, category_id: int):
+    try:
+        logger.info("Searching for sub-categories")
+
+        if category_id:
+            query = select(db_models.SubCategory.name)
+            query = query.where(db_models.SubCategory.fk_category_id == category_id)
+
+            sub_category_names = (await db.execute(query)).scalars().all()
+
+            sub_categories_list = [
+                {"name": sub_category_name}
+                for sub_category_name in sub_category_names
+            ]
+
+            return sub_categories_list
+        else:
+            logger.warning("Category id is not provided")
+            raise HTTPException(status_code=404, detail="Category id not found")
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with category id={category_id}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with category id={category_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
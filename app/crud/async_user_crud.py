@@ -0,0 +1,158 @@
+import app.models.requests as requestModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from app.config.logger import logger
+import app.models.database as db_models
+from app.cache.user_identity_cache import UserIdentity, user_identity_cache
+from sqlalchemy import case, or_, select, update as update_statement
+from fastapi import HTTPException
+from app.crud import shared_crud
+
+
+#Get user identity by given username or email or user id, matches are preferred in that order. Identities are served from
+#the worker cache, a miss is resolved with one query across the unique columns
+async def get_by_username_email_id(db: AsyncSession, username: str = None, email: str = None, user_id: int = None):
+    try:
+        lookups = [(key, value) for key, value in (("username", username), ("email", email), ("user_id", user_id)) if value]
+        if not lookups:
+            logger.info("User not found with given parameters")
+            return None
+
+        #Only the preferred key can be answered from cache, a user matching it has priority over other matches
+        identity = user_identity_cache.get(lookups[0])
+        if identity is not None:
+            logger.info(f"User found in cache by {lookups[0][0]}: {lookups[0][1]}")
+            return identity
+
+        logger.info(f"Searching for user by {', '.join(f'{key}: {value}' for key, value in lookups)}")
+        conditions = [getattr(db_models.User, key) == value for key, value in lookups]
+        priority = case(*((condition, index) for index, condition in enumerate(conditions)), else_=len(conditions))
+
+        query = select(db_models.User).where(or_(*conditions)).order_by(priority).limit(1)
+        db_user = (await db.execute(query)).scalars().first()
+
+        if db_user is None:
+            logger.info("User not found with given parameters")
+            return None
+
+        logger.info(f"User found, user id: {db_user.user_id}")
+        identity = UserIdentity.from_user(db_user)
+        user_identity_cache.put(identity)
+        return identity
+    
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with username={username}, email={email}, id={user_id}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with username={username}, email={email}, id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+    
+
+#Current (user_id, username, email, password_hash, role) row of the user with given username or user id, or None. Always
+#read from the database, so a password or email changed through another worker is never checked against a stale copy
+async def get_credentials(db: AsyncSession, username: str = None, user_id: int = None):
+    try:
+        model = db_models.User
+        query = select(model.user_id, model.username, model.email, model.password_hash, model.role)
+        query = query.where(model.username == username if username is not None else model.user_id == user_id)
+
+        return (await db.execute(query)).first()
+    except Exception as ex:
+        logger.error(f"Exception with username={username}, id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Insert a new user with provided username, email, password hash and role in one statement. Returns (user_id, username, email,
+#created_at) row or None when username or email is already taken - unique constraints decide instead of a prior SELECT
+async def create(db: AsyncSession, user: requestModel.UserCreate, password_hash: str):
+    role_value = None
+
+    try:
+        logger.info("Attempting to create user")
+
+        if user.role:
+            role_value = db_models.UserRole[user.role]
+        else:
+            role_value = db_models.UserRole.registered_user
+
+        statement = shared_crud.insert_on_conflict(db, db_models.User).values(
+            username=user.username,
+            email=user.email,
+            password_hash=password_hash,
+            role=role_value
+        )
+        statement = statement.on_conflict_do_nothing()
+        statement = statement.returning(db_models.User.user_id, db_models.User.username, db_models.User.email, db_models.User.created_at)
+
+        db_user = (await db.execute(statement)).first()
+        if db_user is None:
+            logger.warning(f"User not created, username or email already in use, provided username: {user.username}")
+        else:
+            logger.info("User prepared for creation, waiting for transaction commit")
+        return db_user
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with username={user.username}, email={user.email}, role:{role_value}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with username={user.username}, email={user.email}, role:{role_value}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Update email or password hash of the user matching provided username, email and current password hash in one statement,
+#optional values: new_password (hash), new_email (one of them is required). Returns (user_id, username, email, created_at)
+#row or None when nothing matches, e.g. the password was changed concurrently. A new_email taken by another user is
+#reported as 409 by the unique constraint
+async def update(db: AsyncSession, username: str, email: str, password_hash: str, new_password: str, new_email: str):
+    try:
+        logger.info("Attempting to edit user account data")
+        values = {}
+
+        if new_password is not None:
+            values["password_hash"] = new_password
+        if new_email is not None:
+            values["email"] = new_email
+
+        statement = update_statement(db_models.User)
+        statement = statement.where(db_models.User.username == username, db_models.User.email == email, db_models.User.password_hash == password_hash)
+        statement = statement.values(**values)
+        statement = statement.returning(db_models.User.user_id, db_models.User.username, db_models.User.email, db_models.User.created_at)
+
+        db_user = (await db.execute(statement)).first()
+        if db_user is None:
+            logger.warning(f"User not found, specified username: {username}")
+        else:
+            user_identity_cache.invalidate_on_commit(db.sync_session, db_user.user_id)
+            logger.info("User prepared for account data change, waiting for transaction commit")
+        return db_user
+
+    except IntegrityError as ex:
+        if shared_crud.is_unique_violation(ex):
+            logger.warning("User provided new_email already exists")
+            raise HTTPException(status_code=409, detail="User with such email address already exists")
+        logger.error(f"IntegrityError with username={username}, new_email={new_email}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with username={username}, new_email={new_email}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+    
+
+#Remove user object by using provided user_id
+async def delete(db: AsyncSession, user_id: int):
+    try:
+        logger.info("Attempting to remove user account")
+        db_user = (await db.execute(select(db_models.User).where(db_models.User.user_id == user_id))).scalars().first()
+
+        if not db_user:
+            logger.warning(f"User not found, provided user_id: {user_id}")
+            raise HTTPException(status_code=404, detail="User not found")
+
+        await db.delete(db_user)
+        user_identity_cache.invalidate_on_commit(db.sync_session, user_id)
+        logger.info("User prepared for account removal, waiting for transaction commit")
+
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with user_id={user_id}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -0,0 +1,52 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import update
+from app.crud import shared_crud
+from app.config.logger import logger
+import app.models.database as models
+from fastapi import HTTPException
+from datetime import datetime
+
+
+#Create a new user session entry in database by provided user ip
+async def create(db: AsyncSession, user_id: int, user_ip: str):
+    try:
+        logger.info("Attempting to create user session")
+
+        if user_id and user_ip:
+            db_session = models.UserSession(
+            ip_address=user_ip,
+            fk_user_id=user_id,
+            )
+
+            db.add(db_session)
+            logger.info("Session prepared for creation, waiting for transaction commit")
+        else:
+            logger.error("Session cannot be created - user_id or user_ip not provided")
+
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with user_id={user_id}, user_ip={user_ip}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}, user_ip={user_ip}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Revoke every active session of a user. Revoked sessions are recorded until revoked_until, the expiration of the last
+#access token they could have issued. Returns ids of revoked sessions
+async def revoke(db: AsyncSession, revoked_until: datetime, user_id: int) -> list:
+    try:
+        logger.info(f"Attempting to revoke sessions, user_id: {user_id}")
+        session = models.UserSession
+
+        statement = update(session).where(session.revoked_at.is_(None), session.fk_user_id == user_id)
+        session_ids = (await db.execute(statement.values(revoked_at=datetime.utcnow()).returning(session.session_id))).scalars().all()
+
+        if session_ids:
+            statement = shared_crud.insert_on_conflict(db.sync_session, models.RevokedSession).values([{"session_id": revoked_id, "expires_at": revoked_until} for revoked_id in session_ids])
+            await db.execute(statement.on_conflict_do_update(index_elements=[models.RevokedSession.session_id], set_={"expires_at": statement.excluded.expires_at}))
+
+        return session_ids
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
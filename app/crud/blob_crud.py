@@ -0,0 +1,61 @@
+from sqlalchemy import update, delete
+from app.crud import shared_crud
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from collections import Counter
+
+
+#Check if blob with provided hash is already referenced by any upload
+def exists(db: Session, file_hash: str) -> bool:
+    try:
+        query = db.query(db_models.Blob.file_hash)
+        query = query.filter(db_models.Blob.file_hash == file_hash)
+
+        return query.first() is not None
+    except Exception as ex:
+        logger.error(f"Exception with file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Add a reference to the blob, creating the blob entry on first reference. Single statement upsert, returns new reference count
+def acquire(db: Session, file_hash: str, size_in_bytes: int) -> int:
+    try:
+        logger.info("Attempting to acquire blob reference")
+
+        statement = shared_crud.insert_on_conflict(db, db_models.Blob).values(file_hash=file_hash, size_in_bytes=size_in_bytes, ref_count=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[db_models.Blob.file_hash],
+            set_={"ref_count": db_models.Blob.ref_count + 1}
+        ).returning(db_models.Blob.ref_count)
+
+        return db.execute(statement).scalar_one()
+    except Exception as ex:
+        logger.error(f"Exception with file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Drop one reference per provided hash occurrence. Blob entries left without references are removed,
+#their hashes are returned so the caller can free stored bytes once the transaction is committed
+def release(db: Session, file_hashes: list) -> list:
+    try:
+        logger.info("Attempting to release blob references")
+        released_hashes = []
+
+        for file_hash, references in Counter(file_hashes).items():
+            statement = update(db_models.Blob).where(db_models.Blob.file_hash == file_hash)
+            statement = statement.values(ref_count=db_models.Blob.ref_count - references).returning(db_models.Blob.ref_count)
+
+            ref_count = db.execute(statement).scalar_one_or_none()
+            if ref_count is not None and ref_count <= 0:
+                released_hashes.append(file_hash)
+
+        if released_hashes:
+            statement = delete(db_models.Blob).where(db_models.Blob.file_hash.in_(released_hashes), db_models.Blob.ref_count <= 0)
+            db.execute(statement)
+
+        return released_hashes
+    except Exception as ex:
+        logger.error(f"Exception with file_hashes={file_hashes}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
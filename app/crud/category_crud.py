@@ -1,5 +1,8 @@
 from app.models import database as db_models, requests as requestModel 
+from app.cache.category_tree_cache import CATEGORY_TREE_CHANNEL
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, select, update
+from app.crud import shared_crud
 from app.config.logger import logger
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
@@ -19,33 +22,36 @@ def get_category_by_name(db: Session, name: str):
             logger.warning("Category name is not provided")
             raise HTTPException(status_code=400, detail="Category name is not provided")
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with category name={name}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError with category name={name}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with category name={name}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+        logger.error(f"Exception with category name={name}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
     
 
-#Create a new category object with provided fields: name and description(optional) 
+#Insert a new category with provided fields: name and description(optional) in one statement. Returns (category_id, name,
+#description, created_at) row or None when a category with the same name already exists
 def create_category(db: Session, category: requestModel.CategoryCreate):
     try:
-        if category:
-            logger.info("Attempting to create user session")
+        logger.info("Attempting to create category")
 
-            db_category = db_models.Category(**category.dict())
-            db.add(db_category)
+        statement = shared_crud.insert_on_conflict(db, db_models.Category).values(**category.dict())
+        statement = statement.on_conflict_do_nothing()
+        statement = statement.returning(db_models.Category.category_id, db_models.Category.name, db_models.Category.description, db_models.Category.created_at)
 
+        db_category = (db.execute(statement)).first()
+        if db_category is None:
+            logger.warning(f"Category not created, category with name: {category.name} already exists")
+        else:
             logger.info("Category prepared for creation, waiting for transaction commit")
 
-            return db_category
-        else:
-            logger.error("Category cannot be created - provided category object input is None")
+        return db_category
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with category name={category.name}, description={category.description}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError with category name={category.name}, description={category.description}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with category name={category.name}, description={category.description}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+        logger.error(f"Exception with category name={category.name}, description={category.description}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
     
 
 #Parse all category objects
@@ -72,34 +78,94 @@ def get_all_categories(db: Session):
 
         return categories_list
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+        logger.error(f"Exception: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
     
 
-#Update category name and/or description
+#Update category name and/or description in one statement. Returns (category_id, name, description, created_at) row or
+#None when the category does not exist, a new name taken by another category is reported as 409 by the unique constraint
 def update_category(db: Session, category_name: str, new_name: str, new_description: str):
     try:
         logger.info("Attempting to update category data")
-        category = db.query(db_models.Category).filter(db_models.Category.name == category_name).first()
-    
-        if not category:
-            logger.warning("Category cannot be updated - category with provided name not found")
-            raise HTTPException(status_code=404, detail="Category not found")
+        values = {}
 
         if new_name is not None:
-            category.name = new_name
+            values["name"] = new_name
         if new_description is not None:
-            category.description = new_description
+            values["description"] = new_description
+
+        statement = update(db_models.Category).where(db_models.Category.name == category_name).values(**values)
+        statement = statement.returning(db_models.Category.category_id, db_models.Category.name, db_models.Category.description, db_models.Category.created_at)
 
-        logger.info("Category prepared to get fields updated, waiting for transaction commit")
+        category = (db.execute(statement)).first()
+        if category is None:
+            logger.warning("Category cannot be updated - category with provided name not found")
+        else:
+            logger.info("Category prepared to get fields updated, waiting for transaction commit")
 
         return category
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with category name={category.name}, new_name={new_name}, new_description={new_description}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        if shared_crud.is_unique_violation(ex):
+            logger.warning("Category cannot be updated - category with provided new_name already exists")
+            raise HTTPException(status_code=409, detail="Category with provided new_name already exists")
+        logger.error(f"IntegrityError with category name={category_name}, new_name={new_name}, new_description={new_description}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with category name={category_name}, new_name={new_name}, new_description={new_description}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Parse the whole category tree with one query - (category_id, name, description, sub-category name) rows ordered by
+#category, categories without sub-categories have a single row with sub-category name None
+def get_category_tree(db: Session):
+    try:
+        logger.info("Attempting to parse category tree")
+
+        query = select(db_models.Category.category_id, db_models.Category.name, db_models.Category.description, db_models.SubCategory.name)
+        query = query.outerjoin(db_models.SubCategory, db_models.SubCategory.fk_category_id == db_models.Category.category_id)
+        query = query.order_by(db_models.Category.category_id, db_models.SubCategory.sub_category_id)
+
+        rows = db.execute(query).all()
+
+        logger.info("Category tree parsed")
+
+        return rows
+    except Exception as ex:
+        logger.error(f"Exception: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Tell every worker to drop its cached category tree, PostgreSQL delivers the notification only when the transaction commits
+def notify_category_change(db: Session):
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(select(func.pg_notify(CATEGORY_TREE_CHANNEL, "")))
+            logger.info("Category change notification prepared, waiting for transaction commit")
+    except Exception as ex:
+        logger.error(f"Exception: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Remove category object by name
+def delete_category_by_name(db: Session, category_name: str):
+    try:
+        logger.info("Attempting to remove category")
+        category = db.query(db_models.Category).filter(db_models.Category.name == category_name).first()
+
+        if not category:
+            logger.warning("Category cannot be removed - category with provided name not found")
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        db.delete(category)
+        logger.info("Category prepared for removal, waiting for transaction commit")
+    except HTTPException:
+        raise
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with category name={category_name}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with category name={category.name}, new_name={new_name}, new_description={new_description}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
\ No newline at end of file
+        logger.error(f"Exception with category name={category_name}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -0,0 +1,54 @@
+from sqlalchemy import BigInteger, String, func, insert, literal, select, update
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+
+COMMENT_COLUMNS = (db_models.Comment.comment_id, db_models.Comment.content, db_models.Comment.created_at, db_models.Comment.fk_user_id)
+
+
+#Add a comment to an approved public upload and increase its comment_count. PostgreSQL inserts the comment and updates
+#the counter in one statement, other dialects use two statements in the same transaction. Returns the comment row or
+#None if the upload is not found
+def create(db: Session, user_id: int, upload_id: int, content: str):
+    try:
+        logger.info(f"Attempting to create comment of user {user_id} to public upload {upload_id}")
+        upload = db_models.PublicUpload
+        comment = db_models.Comment
+
+        source = select(literal(content, String), literal(user_id, BigInteger), upload.public_upload_id)
+        source = source.where(upload.public_upload_id == upload_id, upload.admin_approved.is_(True))
+        statement = insert(comment).from_select(["content", "fk_user_id", "fk_public_upload_id"], source).returning(*COMMENT_COLUMNS, comment.fk_public_upload_id)
+
+        if db.get_bind().dialect.name == "postgresql":
+            added = statement.cte("added_comment")
+            statement = update(upload).where(upload.public_upload_id == added.c.fk_public_upload_id)
+            statement = statement.values(comment_count=func.coalesce(upload.comment_count, 0) + 1)
+            statement = statement.returning(added.c.comment_id, added.c.content, added.c.created_at, added.c.fk_user_id)
+            db_comment = db.execute(statement).first()
+        else:
+            db_comment = db.execute(statement).first()
+            if db_comment is not None:
+                db.execute(update(upload).where(upload.public_upload_id == upload_id).values(comment_count=func.coalesce(upload.comment_count, 0) + 1))
+
+        logger.info("Comment prepared for creation, waiting for transaction commit")
+        return db_comment
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}, upload_id={upload_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Comments of the upload, newest first, starting before provided comment id. limit + 1 rows are selected so the caller
+#knows whether another page exists
+def get_comments_page(db: Session, upload_id: int, before_id: int, limit: int) -> list:
+    try:
+        logger.info(f"Parsing up to {limit} comments of public upload {upload_id} before: {before_id}")
+        query = select(*COMMENT_COLUMNS).where(db_models.Comment.fk_public_upload_id == upload_id)
+        if before_id is not None:
+            query = query.where(db_models.Comment.comment_id < before_id)
+        query = query.order_by(db_models.Comment.comment_id.desc()).limit(limit + 1)
+
+        return db.execute(query).all()
+    except Exception as ex:
+        logger.error(f"Exception with upload_id={upload_id}, before_id={before_id}, limit={limit}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
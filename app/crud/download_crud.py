@@ -0,0 +1,65 @@
+from sqlalchemy import BigInteger, bindparam, column, func, insert, select, update, values
+from app.crud import file_crud
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+
+
+#Insert prepared file download entries with one multi-row INSERT
+def create_many(db: Session, downloads: list):
+    try:
+        logger.info(f"Attempting to create {len(downloads)} file download entries")
+        db.execute(insert(db_models.FileDownload).values(downloads))
+        logger.info("File download entries prepared for creation, waiting for transaction commit")
+    except Exception as ex:
+        logger.error(f"Exception while creating {len(downloads)} file download entries: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Ids from provided list which still belong to existing uploads of the type
+def get_existing_upload_ids(db: Session, upload_type: db_models.UploadType, upload_ids) -> set:
+    try:
+        _, id_column = file_crud.get_upload_model(upload_type)
+        return set(db.execute(select(id_column).where(id_column.in_(upload_ids))).scalars().all())
+    except Exception as ex:
+        logger.error(f"Exception with upload_type={upload_type}, upload_ids={upload_ids}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Add views and download_count deltas ({upload_id: {"views": n, "download_count": n}}) to uploads of one type. PostgreSQL
+#gets a single UPDATE joined with a VALUES list, other dialects an executemany UPDATE. Rows are touched in id order so
+#concurrent flushes from several workers lock them in the same order
+def add_counter_deltas(db: Session, upload_type: db_models.UploadType, deltas: dict):
+    try:
+        logger.info(f"Attempting to update counters of {len(deltas)} {upload_type.value} uploads")
+        model, id_column = file_crud.get_upload_model(upload_type)
+        rows = [(upload_id, delta["views"], delta["download_count"]) for upload_id, delta in sorted(deltas.items())]
+
+        if db.get_bind().dialect.name == "postgresql":
+            delta_values = values(
+                column("upload_id", BigInteger),
+                column("views", BigInteger),
+                column("download_count", BigInteger),
+                name="delta"
+            ).data(rows)
+
+            statement = update(model).where(id_column == delta_values.c.upload_id).values(
+                views=func.coalesce(model.views, 0) + delta_values.c.views,
+                download_count=func.coalesce(model.download_count, 0) + delta_values.c.download_count
+            )
+            db.execute(statement)
+        else:
+            statement = update(model.__table__).where(id_column == bindparam("delta_upload_id")).values(
+                views=func.coalesce(model.views, 0) + bindparam("delta_views"),
+                download_count=func.coalesce(model.download_count, 0) + bindparam("delta_download_count")
+            )
+            db.connection().execute(statement, [
+                {"delta_upload_id": upload_id, "delta_views": views, "delta_download_count": download_count}
+                for upload_id, views, download_count in rows
+            ])
+
+        logger.info("Upload counters prepared for update, waiting for transaction commit")
+    except Exception as ex:
+        logger.error(f"Exception with upload_type={upload_type}, {len(deltas)} counter deltas: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -0,0 +1,251 @@
+import app.models.requests as requestModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import delete, func, select, tuple_
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from datetime import datetime
+import secrets
+
+
+#Create a new public upload object from provided file metadata and stored file attributes
+def create_public_upload(db: Session, user_id: int, file: requestModel.FileCreate, file_path: str, file_hash: str, size_in_bytes: int):
+    try:
+        logger.info("Attempting to create public upload")
+
+        db_upload = db_models.PublicUpload(
+            title=file.title,
+            description=file.description,
+            file_path=file_path,
+            max_download_count=file.max_downloads,
+            expiration_date=file.expiration_date,
+            size_in_bytes=size_in_bytes,
+            file_hash=file_hash,
+            fk_user_id=user_id
+        )
+
+        db.add(db_upload)
+        logger.info("Public upload prepared for creation, waiting for transaction commit")
+        return db_upload
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with user_id={user_id}, file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}, file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Create a new private upload object, private uploads are reachable through a randomly generated download link
+def create_private_upload(db: Session, user_id: int, file: requestModel.FileCreate, file_path: str, file_hash: str, size_in_bytes: int):
+    try:
+        logger.info("Attempting to create private upload")
+
+        db_upload = db_models.PrivateUpload(
+            title=file.title,
+            description=file.description,
+            file_path=file_path,
+            max_download_count=file.max_downloads,
+            expiration_date=file.expiration_date,
+            size_in_bytes=size_in_bytes,
+            file_hash=file_hash,
+            password_protected=False,
+            download_link=secrets.token_urlsafe(32),
+            fk_user_id=user_id
+        )
+
+        db.add(db_upload)
+        logger.info("Private upload prepared for creation, waiting for transaction commit")
+        return db_upload
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with user_id={user_id}, file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}, file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Model and primary key column of the upload table for provided upload type
+def get_upload_model(upload_type: db_models.UploadType):
+    if upload_type == db_models.UploadType.public:
+        return db_models.PublicUpload, db_models.PublicUpload.public_upload_id
+    return db_models.PrivateUpload, db_models.PrivateUpload.private_upload_id
+
+
+#Get public or private upload object by its id
+def get_upload(db: Session, upload_type: db_models.UploadType, upload_id: int):
+    try:
+        logger.info(f"Searching for {upload_type.value} upload by id: {upload_id}")
+        model, id_column = get_upload_model(upload_type)
+
+        return db.query(model).filter(id_column == upload_id).first()
+    except Exception as ex:
+        logger.error(f"Exception with upload_type={upload_type}, upload_id={upload_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Change title of a loaded public or private upload
+def update_title(db: Session, db_upload, new_title: str):
+    try:
+        logger.info("Attempting to update upload title")
+        db_upload.title = new_title
+        db.flush()
+
+        logger.info("Upload title prepared for update, waiting for transaction commit")
+        return db_upload
+    except Exception as ex:
+        logger.error(f"Exception with new_title={new_title}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Titles of approved public uploads ordered by (title, public_upload_id), starting after provided key. limit + 1 rows are
+#selected so the caller knows whether another page exists
+def get_public_titles_page(db: Session, after: tuple, limit: int) -> list:
+    try:
+        logger.info(f"Parsing up to {limit} public upload titles after: {after}")
+        key = tuple_(db_models.PublicUpload.title, db_models.PublicUpload.public_upload_id)
+
+        query = select(db_models.PublicUpload.title, db_models.PublicUpload.public_upload_id)
+        query = query.where(db_models.PublicUpload.admin_approved.is_(True))
+        if after is not None:
+            query = query.where(key > tuple_(*after))
+        query = query.order_by(db_models.PublicUpload.title, db_models.PublicUpload.public_upload_id).limit(limit + 1)
+
+        return db.execute(query).all()
+    except Exception as ex:
+        logger.error(f"Exception with after={after}, limit={limit}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Catalog columns of all public uploads ordered by id, read through a server-side cursor in partitions of batch_size
+#rows. Rows are fetched lazily while the partitions are iterated
+def stream_public_uploads(db: Session, batch_size: int):
+    try:
+        logger.info(f"Streaming public uploads in batches of {batch_size}")
+        model = db_models.PublicUpload
+        query = select(
+            model.public_upload_id, model.title, model.description, model.size_in_bytes, model.file_hash, model.uploaded_at,
+            model.expiration_date, model.admin_approved, model.virus_free, model.views, model.download_count,
+            model.max_download_count, model.like_count, model.dislike_count, model.comment_count, model.fk_user_id
+        )
+        query = query.order_by(model.public_upload_id).execution_options(yield_per=batch_size)
+
+        return db.execute(query).partitions()
+    except Exception as ex:
+        logger.error(f"Exception while streaming public uploads: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Resolve category name / sub-category name / upload title path with one query joined along the unique category and
+#sub-category names and the has (sub-category, upload) index. Returns (upload, category name, sub-category name) of the
+#newest approved, unexpired upload with that title or None
+def get_public_upload_by_path(db: Session, category_name: str, sub_category_name: str, title: str):
+    try:
+        logger.info(f"Resolving public upload by path: {category_name}/{sub_category_name}/{title}")
+        model = db_models.PublicUpload
+
+        query = select(model, db_models.Category.name, db_models.SubCategory.name)
+        query = query.select_from(db_models.Category)
+        query = query.join(db_models.SubCategory, db_models.SubCategory.fk_category_id == db_models.Category.category_id)
+        query = query.join(db_models.PublicUploadSubCategory, db_models.PublicUploadSubCategory.fk_sub_category_id == db_models.SubCategory.sub_category_id)
+        query = query.join(model, model.public_upload_id == db_models.PublicUploadSubCategory.fk_public_upload_id)
+        query = query.where(
+            db_models.Category.name == category_name,
+            db_models.SubCategory.name == sub_category_name,
+            model.title == title,
+            model.admin_approved.is_(True),
+            model.expiration_date > datetime.utcnow()
+        )
+        query = query.order_by(model.public_upload_id.desc()).limit(1)
+
+        return db.execute(query).first()
+    except Exception as ex:
+        logger.error(f"Exception with category_name={category_name}, sub_category_name={sub_category_name}, title={title}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Get private upload object by its download link
+def get_private_upload_by_link(db: Session, download_link: str):
+    try:
+        logger.info("Searching for private upload by download link")
+        query = db.query(db_models.PrivateUpload)
+        query = query.filter(db_models.PrivateUpload.download_link == download_link)
+
+        return query.first()
+    except Exception as ex:
+        logger.error(f"Exception while searching private upload by download link: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Remove uploads of one type with all dependent rows using set-based statements. Returns file hashes of removed uploads,
+#one entry per removed upload, so blob references can be released
+def delete_uploads(db: Session, upload_type: db_models.UploadType, upload_ids: list) -> list:
+    try:
+        logger.info(f"Attempting to remove {len(upload_ids)} {upload_type.value} uploads")
+        model, id_column = get_upload_model(upload_type)
+
+        if upload_type == db_models.UploadType.public:
+            dependent_columns = [
+                db_models.FileLike.fk_public_upload_id,
+                db_models.FileDislike.fk_public_upload_id,
+                db_models.Comment.fk_public_upload_id,
+                db_models.FileApproval.fk_public_upload_id,
+                db_models.PublicUploadSubCategory.fk_public_upload_id,
+                db_models.FileDownload.fk_public_upload_id
+            ]
+        else:
+            dependent_columns = [db_models.FileDownload.fk_private_upload_id]
+
+        for dependent_column in dependent_columns:
+            db.execute(delete(dependent_column.class_).where(dependent_column.in_(upload_ids)))
+
+        statement = delete(model).where(id_column.in_(upload_ids)).returning(model.file_hash)
+        file_hashes = db.execute(statement).scalars().all()
+
+        logger.info("Uploads prepared for removal, waiting for transaction commit")
+        return file_hashes
+    except Exception as ex:
+        logger.error(f"Exception with upload_type={upload_type}, upload_ids={upload_ids}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Ids of up to limit uploads which expired at or before now, oldest expiration first. Served by the expiration_date index
+def get_expired_upload_ids(db: Session, upload_type: db_models.UploadType, now: datetime, limit: int) -> list:
+    try:
+        model, id_column = get_upload_model(upload_type)
+        query = select(id_column).where(model.expiration_date <= now).order_by(model.expiration_date).limit(limit)
+
+        return db.execute(query).scalars().all()
+    except Exception as ex:
+        logger.error(f"Exception with upload_type={upload_type}, now={now}, limit={limit}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+def exhausted_condition(model):
+    return (model.max_download_count > 0, model.download_count >= model.max_download_count)
+
+
+#Ids of up to limit uploads which reached their download limit. Only uploads with a download limit are scanned, through
+#the partial download limit index
+def get_exhausted_upload_ids(db: Session, upload_type: db_models.UploadType, limit: int) -> list:
+    try:
+        model, id_column = get_upload_model(upload_type)
+        query = select(id_column).where(*exhausted_condition(model)).order_by(id_column).limit(limit)
+
+        return db.execute(query).scalars().all()
+    except Exception as ex:
+        logger.error(f"Exception with upload_type={upload_type}, limit={limit}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Number of uploads waiting to be swept - expired at or before now or unexpired with their download limit reached
+def count_sweepable_uploads(db: Session, upload_type: db_models.UploadType, now: datetime) -> int:
+    try:
+        model, _ = get_upload_model(upload_type)
+        expired = db.execute(select(func.count()).select_from(model).where(model.expiration_date <= now)).scalar_one()
+        exhausted = db.execute(select(func.count()).select_from(model).where(*exhausted_condition(model), model.expiration_date > now)).scalar_one()
+
+        return expired + exhausted
+    except Exception as ex:
+        logger.error(f"Exception with upload_type={upload_type}, now={now}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -0,0 +1,104 @@
+from sqlalchemy import BigInteger, delete, func, literal, select, update
+from app.crud import shared_crud
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+
+#Reaction table, its (user, upload) unique constraint and the public_upload counter it maintains
+REACTION_TABLES = {
+    db_models.Reaction.like: (db_models.FileLike, "uq_user_upload_like", "like_count"),
+    db_models.Reaction.dislike: (db_models.FileDislike, "uq_user_upload_dislike", "dislike_count")
+}
+
+
+def approved_upload_condition(upload_id: int):
+    return (db_models.PublicUpload.public_upload_id == upload_id, db_models.PublicUpload.admin_approved.is_(True))
+
+
+#INSERT of the user's reaction which does nothing if the user already has it. Rows are selected from the approved upload,
+#so nothing is inserted for missing or unapproved uploads
+def insert_reaction(db: Session, model, constraint: str, user_id: int, upload_id: int):
+    source = select(literal(user_id, BigInteger), db_models.PublicUpload.public_upload_id).where(*approved_upload_condition(upload_id))
+    statement = shared_crud.insert_on_conflict(db, model).from_select(["fk_user_id", "fk_public_upload_id"], source)
+
+    if db.get_bind().dialect.name == "postgresql":
+        return statement.on_conflict_do_nothing(constraint=constraint)
+    return statement.on_conflict_do_nothing(index_elements=["fk_user_id", "fk_public_upload_id"])
+
+
+def delete_reaction(model, user_id: int, upload_id: int):
+    return delete(model).where(model.fk_user_id == user_id, model.fk_public_upload_id == upload_id)
+
+
+#Set user's reaction to an approved public upload (None removes it) and adjust like_count and dislike_count by the rows
+#which were actually inserted or removed, so repeated requests are idempotent and switching between like and dislike
+#moves the user's single vote. PostgreSQL does it in one statement with data-modifying CTEs, other dialects with one
+#statement per table in the same transaction. Returns (like_count, dislike_count, added) where added is the number of
+#inserted reaction rows, or None if the upload is not found
+def set_reaction(db: Session, user_id: int, upload_id: int, reaction: db_models.Reaction):
+    try:
+        logger.info(f"Setting reaction of user {user_id} to public upload {upload_id}: {reaction}")
+        upload = db_models.PublicUpload
+        counter_changes = {}
+        added_count = literal(0)
+
+        if db.get_bind().dialect.name == "postgresql":
+            for table_reaction, (model, constraint, counter) in REACTION_TABLES.items():
+                if table_reaction == reaction:
+                    added = insert_reaction(db, model, constraint, user_id, upload_id).returning(model.fk_public_upload_id).cte(f"added_{model.__tablename__}")
+                    added_count = counter_changes[counter] = select(func.count()).select_from(added).scalar_subquery()
+                else:
+                    removed = delete_reaction(model, user_id, upload_id).returning(model.fk_public_upload_id).cte(f"removed_{model.__tablename__}")
+                    counter_changes[counter] = -select(func.count()).select_from(removed).scalar_subquery()
+        else:
+            for table_reaction, (model, constraint, counter) in REACTION_TABLES.items():
+                if table_reaction == reaction:
+                    counter_changes[counter] = db.execute(insert_reaction(db, model, constraint, user_id, upload_id)).rowcount
+                    added_count = literal(counter_changes[counter])
+                else:
+                    counter_changes[counter] = -db.execute(delete_reaction(model, user_id, upload_id)).rowcount
+
+        statement = update(upload).where(*approved_upload_condition(upload_id))
+        statement = statement.values({counter: func.coalesce(getattr(upload, counter), 0) + change for counter, change in counter_changes.items()})
+        statement = statement.returning(upload.like_count, upload.dislike_count, added_count.label("added"))
+
+        counts = db.execute(statement).first()
+        logger.info("Reaction prepared, waiting for transaction commit")
+        return counts
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}, upload_id={upload_id}, reaction={reaction}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Ids of up to batch_size public uploads after provided id, in id order
+def get_upload_id_batch(db: Session, after_id: int, batch_size: int) -> list:
+    try:
+        query = select(db_models.PublicUpload.public_upload_id).where(db_models.PublicUpload.public_upload_id > after_id)
+        query = query.order_by(db_models.PublicUpload.public_upload_id).limit(batch_size)
+
+        return db.execute(query).scalars().all()
+    except Exception as ex:
+        logger.error(f"Exception with after_id={after_id}, batch_size={batch_size}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Recount likes, dislikes and comments of public uploads with ids in [first_id, last_id] and rewrite counters which have
+#drifted. Counts come from the upload indexes of file_like, file_dislike and comment. Returns ids of repaired uploads
+def recount_reaction_counters(db: Session, first_id: int, last_id: int) -> list:
+    try:
+        upload = db_models.PublicUpload
+        counts = {
+            "like_count": select(func.count()).where(db_models.FileLike.fk_public_upload_id == upload.public_upload_id).scalar_subquery(),
+            "dislike_count": select(func.count()).where(db_models.FileDislike.fk_public_upload_id == upload.public_upload_id).scalar_subquery(),
+            "comment_count": select(func.count()).where(db_models.Comment.fk_public_upload_id == upload.public_upload_id).scalar_subquery()
+        }
+
+        drifted = [getattr(upload, counter).is_distinct_from(count) for counter, count in counts.items()]
+        statement = update(upload).where(upload.public_upload_id.between(first_id, last_id)).where(drifted[0] | drifted[1] | drifted[2])
+        statement = statement.values(counts).returning(upload.public_upload_id)
+
+        return db.execute(statement).scalars().all()
+    except Exception as ex:
+        logger.error(f"Exception with first_id={first_id}, last_id={last_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
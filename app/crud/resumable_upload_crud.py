@@ -0,0 +1,142 @@
+import app.models.requests as requestModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import update
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from datetime import datetime
+
+
+#Create a new resumable upload session for provided file metadata
+def create(db: Session, user_id: int, upload_key: str, data: requestModel.ResumableUploadCreate, chunk_size: int, expires_at: datetime):
+    try:
+        logger.info("Attempting to create resumable upload")
+
+        db_resumable_upload = db_models.ResumableUpload(
+            upload_key=upload_key,
+            title=data.title,
+            description=data.description,
+            public=data.public,
+            max_download_count=data.max_downloads,
+            file_expiration_date=data.expiration_date,
+            total_size=data.total_size,
+            chunk_size=chunk_size,
+            file_hash=data.file_hash,
+            expires_at=expires_at,
+            fk_user_id=user_id
+        )
+
+        db.add(db_resumable_upload)
+        logger.info("Resumable upload prepared for creation, waiting for transaction commit")
+        return db_resumable_upload
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with user_id={user_id}, file_hash={data.file_hash}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}, file_hash={data.file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Get resumable upload object by its upload key
+def get_by_key(db: Session, upload_key: str):
+    try:
+        logger.info("Searching for resumable upload")
+        query = db.query(db_models.ResumableUpload)
+        query = query.filter(db_models.ResumableUpload.upload_key == upload_key)
+
+        return query.first()
+    except Exception as ex:
+        logger.error(f"Exception with upload_key={upload_key}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Get indexes and sizes of all received chunks ordered by chunk index, with their checksums when with_checksums is set
+def get_received_chunks(db: Session, resumable_upload_id: int, with_checksums: bool = False):
+    try:
+        columns = [db_models.ResumableUploadChunk.chunk_index, db_models.ResumableUploadChunk.size_in_bytes]
+        if with_checksums:
+            columns.append(db_models.ResumableUploadChunk.checksum)
+        query = db.query(*columns)
+        query = query.filter(db_models.ResumableUploadChunk.fk_resumable_upload_id == resumable_upload_id)
+        query = query.order_by(db_models.ResumableUploadChunk.chunk_index)
+
+        return query.all()
+    except Exception as ex:
+        logger.error(f"Exception with resumable_upload_id={resumable_upload_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Record a verified chunk, re-sent chunk replaces previously stored chunk entry. Upload expiration is extended on every chunk
+def record_chunk(db: Session, db_resumable_upload: db_models.ResumableUpload, chunk_index: int, size_in_bytes: int, checksum: str, expires_at: datetime):
+    try:
+        logger.info(f"Attempting to record resumable upload chunk: {chunk_index}")
+
+        db.merge(db_models.ResumableUploadChunk(
+            fk_resumable_upload_id=db_resumable_upload.resumable_upload_id,
+            chunk_index=chunk_index,
+            size_in_bytes=size_in_bytes,
+            checksum=checksum
+        ))
+        db_resumable_upload.expires_at = expires_at
+
+        logger.info("Chunk prepared for recording, waiting for transaction commit")
+    except IntegrityError as ex:
+        logger.error(f"IntegrityError with upload_key={db_resumable_upload.upload_key}, chunk_index={chunk_index}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
+    except Exception as ex:
+        logger.error(f"Exception with upload_key={db_resumable_upload.upload_key}, chunk_index={chunk_index}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Move resumable upload from from_state to to_state and extend its expiration. The update locks the upload row, so chunks
+#being prepared and completion are ordered. Returns False when the upload is not in from_state
+def set_state(db: Session, resumable_upload_id: int, from_state: db_models.ResumableUploadState, to_state: db_models.ResumableUploadState, expires_at: datetime) -> bool:
+    try:
+        logger.info(f"Attempting to move resumable upload {resumable_upload_id} from {from_state.value} to {to_state.value}")
+        statement = update(db_models.ResumableUpload).where(
+            db_models.ResumableUpload.resumable_upload_id == resumable_upload_id,
+            db_models.ResumableUpload.state == from_state
+        )
+        statement = statement.values(state=to_state, expires_at=expires_at).execution_options(synchronize_session=False)
+
+        return db.execute(statement).rowcount > 0
+    except Exception as ex:
+        logger.error(f"Exception with resumable_upload_id={resumable_upload_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Remove chunk entry, used before a chunk is (re-)written and when its bytes on disk can no longer be trusted
+def delete_chunk(db: Session, resumable_upload_id: int, chunk_index: int):
+    try:
+        logger.info(f"Attempting to remove resumable upload chunk: {chunk_index}")
+        query = db.query(db_models.ResumableUploadChunk)
+        query = query.filter(db_models.ResumableUploadChunk.fk_resumable_upload_id == resumable_upload_id, db_models.ResumableUploadChunk.chunk_index == chunk_index)
+        query.delete(synchronize_session=False)
+    except Exception as ex:
+        logger.error(f"Exception with resumable_upload_id={resumable_upload_id}, chunk_index={chunk_index}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Get a batch of resumable uploads which had no activity until their expiration time
+def get_expired(db: Session, now: datetime, limit: int):
+    try:
+        query = db.query(db_models.ResumableUpload)
+        query = query.filter(db_models.ResumableUpload.expires_at < now)
+        query = query.order_by(db_models.ResumableUpload.expires_at)
+
+        return query.limit(limit).all()
+    except Exception as ex:
+        logger.error(f"Exception with now={now}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Remove resumable upload object together with its chunk entries
+def delete(db: Session, db_resumable_upload: db_models.ResumableUpload):
+    try:
+        logger.info("Attempting to remove resumable upload")
+        db.delete(db_resumable_upload)
+        logger.info("Resumable upload prepared for removal, waiting for transaction commit")
+    except Exception as ex:
+        logger.error(f"Exception with upload_key={db_resumable_upload.upload_key}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -0,0 +1,50 @@
+from sqlalchemy import select, update
+from app.crud import shared_crud
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+
+
+#Stored antivirus verdict of the content or None if it has not been scanned yet
+def get_verdict(db: Session, file_hash: str):
+    try:
+        return db.get(db_models.ScanVerdict, file_hash)
+    except Exception as ex:
+        logger.error(f"Exception with file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Store the verdict of a scan and set virus_free of every public and private upload of the content. A verdict stored
+#by another worker in the meantime is kept
+def save_verdict(db: Session, file_hash: str, infected: bool, signature: str, scanner: str):
+    try:
+        logger.info(f"Saving scan verdict of {file_hash}, infected: {infected}")
+        statement = shared_crud.insert_on_conflict(db, db_models.ScanVerdict).values(file_hash=file_hash, infected=infected, signature=signature, scanner=scanner)
+        db.execute(statement.on_conflict_do_nothing(index_elements=[db_models.ScanVerdict.file_hash]))
+
+        apply_verdict(db=db, file_hash=file_hash, virus_free=not infected)
+    except Exception as ex:
+        logger.error(f"Exception with file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+def apply_verdict(db: Session, file_hash: str, virus_free: bool):
+    try:
+        for model in (db_models.PublicUpload, db_models.PrivateUpload):
+            db.execute(update(model).where(model.file_hash == file_hash, model.virus_free.is_not(virus_free)).values(virus_free=virus_free))
+    except Exception as ex:
+        logger.error(f"Exception with file_hash={file_hash}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Hashes of up to limit stored blobs without a verdict, oldest first
+def get_unscanned_hashes(db: Session, limit: int) -> list:
+    try:
+        query = select(db_models.Blob.file_hash).where(~select(db_models.ScanVerdict.file_hash).where(db_models.ScanVerdict.file_hash == db_models.Blob.file_hash).exists())
+        query = query.order_by(db_models.Blob.created_at).limit(limit)
+
+        return db.execute(query).scalars().all()
+    except Exception as ex:
+        logger.error(f"Exception with limit={limit}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -0,0 +1,64 @@
+from sqlalchemy import Double, cast, func, literal, select, tuple_
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from datetime import datetime
+
+
+def visible_upload_conditions():
+    return (db_models.PublicUpload.admin_approved.is_(True), db_models.PublicUpload.expiration_date > datetime.utcnow())
+
+
+#Ranked page of approved, unexpired public uploads matching the query, PostgreSQL only. Matches come from the GIN index
+#on search_vector, rows are ordered by (rank, id) descending and start after provided (rank, id) key. limit + 1 rows
+#are selected so the caller knows whether another page exists
+def search_public_uploads(db: Session, query_text: str, after: tuple, limit: int) -> list:
+    try:
+        logger.info(f"Searching public uploads, query: {query_text}, after: {after}, limit: {limit}")
+        model = db_models.PublicUpload
+        ts_query = func.websearch_to_tsquery(db_models.SEARCH_TEXT_CONFIG, query_text)
+        #ts_rank_cd returns real, compared as double precision the rank of a row equals the rank in its cursor
+        rank = cast(func.ts_rank_cd(model.search_vector, ts_query), Double)
+
+        query = select(model.public_upload_id, model.title, model.description, rank.label("rank"))
+        query = query.where(model.search_vector.op("@@")(ts_query), *visible_upload_conditions())
+        if after is not None:
+            query = query.where(tuple_(rank, model.public_upload_id) < tuple_(literal(after[0], Double), after[1]))
+        query = query.order_by(rank.desc(), model.public_upload_id.desc()).limit(limit + 1)
+
+        return db.execute(query).all()
+    except Exception as ex:
+        logger.error(f"Exception with query_text={query_text}, after={after}, limit={limit}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Title, description and sub-category/category names of every public upload, used to build the in-process search index
+#of databases without full-text search. Returns (upload rows, (upload_id, sub_category_name, category_name) rows)
+def get_search_documents(db: Session) -> tuple:
+    try:
+        logger.info("Parsing public upload search documents")
+        uploads = db.execute(select(db_models.PublicUpload.public_upload_id, db_models.PublicUpload.title, db_models.PublicUpload.description)).all()
+
+        query = select(db_models.PublicUploadSubCategory.fk_public_upload_id, db_models.SubCategory.name, db_models.Category.name)
+        query = query.join(db_models.SubCategory, db_models.SubCategory.sub_category_id == db_models.PublicUploadSubCategory.fk_sub_category_id)
+        query = query.join(db_models.Category, db_models.Category.category_id == db_models.SubCategory.fk_category_id)
+        category_names = db.execute(query).all()
+
+        return uploads, category_names
+    except Exception as ex:
+        logger.error(f"Exception while parsing public upload search documents: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Approved, unexpired public uploads among provided ids as {upload_id: row}
+def get_visible_uploads(db: Session, upload_ids: list) -> dict:
+    try:
+        model = db_models.PublicUpload
+        query = select(model.public_upload_id, model.title, model.description)
+        query = query.where(model.public_upload_id.in_(upload_ids), *visible_upload_conditions())
+
+        return {row.public_upload_id: row for row in db.execute(query).all()}
+    except Exception as ex:
+        logger.error(f"Exception with upload_ids={upload_ids}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -1,4 +1,10 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+UNIQUE_VIOLATION = "23505"
 
 def flush(db: Session):
     return db.flush()
@@ -7,4 +13,34 @@ def commit(db: Session):
     return db.commit()
 
 def rollback(db: Session):
-    return db.rollback()
\ No newline at end of file
+    return db.rollback()
+
+#End the current read-only transaction, so its pooled connection is returned before slow work which needs no database,
+#like password hashing. Objects it loaded keep their values, the next statement checks out a connection again
+def release_connection(db: Session):
+    if db.new or db.dirty or db.deleted:
+        raise RuntimeError("Connection cannot be released with pending changes")
+
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+#Make statements of the current PostgreSQL transaction fail instead of waiting longer than timeout_ms for a row lock
+def set_lock_timeout(db: Session, timeout_ms: int):
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"SET LOCAL lock_timeout = {int(timeout_ms)}"))
+
+#Dialect specific INSERT construct which supports ON CONFLICT clauses
+def insert_on_conflict(db: Session, model):
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return postgresql_insert(model)
+
+#Check if IntegrityError was caused by a unique constraint, PostgreSQL drivers expose SQLSTATE 23505 as pgcode (psycopg2)
+#or sqlstate (asyncpg), SQLite only reports it in the message
+def is_unique_violation(ex: IntegrityError) -> bool:
+    error = ex.orig
+    return getattr(error, "pgcode", None) == UNIQUE_VIOLATION or getattr(error, "sqlstate", None) == UNIQUE_VIOLATION or "UNIQUE constraint failed" in str(error)
@@ -26,8 +26,8 @@ def get_sub_categories_by_category_id(db: Session, category_id: int):
             logger.warning("Category id is not provided")
             raise HTTPException(status_code=404, detail="Category id not found")
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with category id={category_id}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError with category id={category_id}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with category id={category_id}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
\ No newline at end of file
+        logger.error(f"Exception with category id={category_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
\ No newline at end of file
@@ -0,0 +1,27 @@
+from app.crud.search_crud import visible_upload_conditions
+from app.config.logger import logger
+import app.models.database as db_models
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy import select
+
+
+#Approved, unexpired public uploads with their stored counters and names of categories they are placed in, used to
+#refresh the in-process trending ranking. Returns (upload rows, (upload_id, category_name) rows)
+def get_trending_candidates(db: Session) -> tuple:
+    try:
+        logger.info("Parsing trending ranking candidates")
+        model = db_models.PublicUpload
+        query = select(model.public_upload_id, model.title, model.expiration_date, model.uploaded_at, model.views, model.download_count, model.like_count)
+        uploads = db.execute(query.where(*visible_upload_conditions())).all()
+
+        query = select(db_models.PublicUploadSubCategory.fk_public_upload_id, db_models.Category.name).distinct()
+        query = query.join(db_models.SubCategory, db_models.SubCategory.sub_category_id == db_models.PublicUploadSubCategory.fk_sub_category_id)
+        query = query.join(db_models.Category, db_models.Category.category_id == db_models.SubCategory.fk_category_id)
+        query = query.join(model, model.public_upload_id == db_models.PublicUploadSubCategory.fk_public_upload_id)
+        category_names = db.execute(query.where(*visible_upload_conditions())).all()
+
+        return uploads, category_names
+    except Exception as ex:
+        logger.error(f"Exception while parsing trending ranking candidates: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -1,72 +1,102 @@
 import app.models.requests as requestModel
+from app.cache.user_identity_cache import UserIdentity, user_identity_cache
+from sqlalchemy import case, or_, select, update as update_statement
 from sqlalchemy.exc import IntegrityError
+from app.crud import shared_crud
 from app.config.logger import logger
 import app.models.database as db_models
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
 
-#Parse user object from database by given username or email or user id
+#Get user identity by given username or email or user id, matches are preferred in that order. Identities are served from
+#the worker cache, a miss is resolved with one query across the unique columns
 def get_by_username_email_id(db: Session, username: str = None, email: str = None, user_id: int = None):
     try:
-        query = db.query(db_models.User)
-    
-        if username:
-            logger.info(f"Searching for user by username: {username}")
-            username_query = query.filter(db_models.User.username == username)
-            user = username_query.first()
-            if user:
-                logger.info(f"User found by username: {username}")
-                return user
-    
-        if email:
-            logger.info(f"Searching for user by email: {email}")
-            email_query = query.filter(db_models.User.email == email)
-            user = email_query.first()
-            if user:
-                logger.info(f"User found by email: {email}")
-                return user
-
-        if user_id:
-            logger.info(f"Searching for user by id: {user_id}")
-            id_query = query.filter(db_models.User.user_id == user_id)
-            user = id_query.first()
-            if user:
-                logger.info(f"User found by id: {user_id}")
-                return user
-            
-        logger.info("User not found with given parameters")
-        return None
+        lookups = [(key, value) for key, value in (("username", username), ("email", email), ("user_id", user_id)) if value]
+        if not lookups:
+            logger.info("User not found with given parameters")
+            return None
+
+        #Only the preferred key can be answered from cache, a user matching it has priority over other matches
+        identity = user_identity_cache.get(lookups[0])
+        if identity is not None:
+            logger.info(f"User found in cache by {lookups[0][0]}: {lookups[0][1]}")
+            return identity
+
+        logger.info(f"Searching for user by {', '.join(f'{key}: {value}' for key, value in lookups)}")
+        conditions = [getattr(db_models.User, key) == value for key, value in lookups]
+        priority = case(*((condition, index) for index, condition in enumerate(conditions)), else_=len(conditions))
+
+        query = select(db_models.User).where(or_(*conditions)).order_by(priority).limit(1)
+        db_user = (db.execute(query)).scalars().first()
+
+        if db_user is None:
+            logger.info("User not found with given parameters")
+            return None
+
+        logger.info(f"User found, user id: {db_user.user_id}")
+        identity = UserIdentity.from_user(db_user)
+        user_identity_cache.put(identity)
+        return identity
     
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with username={username}, email={email}, id={id}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError with username={username}, email={email}, id={user_id}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with username={username}, email={email}, id={id}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+        logger.error(f"Exception with username={username}, email={email}, id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
     
 
-#Parse user object by provided username, email and password
-def get_authenticated_user(db: Session, username: str, email: str, password_hash: str):
+#Current (user_id, username, email, password_hash, role) row of the user with given username or user id, or None. Always
+#read from the database, so a password or email changed through another worker is never checked against a stale copy
+def get_credentials(db: Session, username: str = None, user_id: int = None):
     try:
-        logger.info("Searching for user by specified username, email and password_hash")
-        query = db.query(db_models.User) 
-        query = query.filter(db_models.User.username == username, db_models.User.email == email, db_models.User.password_hash == password_hash)
-        if query:
-            logger.info("User found")
-        else:
-            logger.warning(f"User not found, specified username: {username}")
-        return query.first()
-    except IntegrityError as ex:
-        logger.exception(f"IntegrityError with username={username}, email={email}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        model = db_models.User
+        query = select(model.user_id, model.username, model.email, model.password_hash, model.role)
+        query = query.where(model.username == username if username is not None else model.user_id == user_id)
+
+        return db.execute(query).first()
+    except Exception as ex:
+        logger.error(f"Exception with username={username}, id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Usernames ordered by the unique username index, starting after provided username. limit + 1 rows are selected so the
+#caller knows whether another page exists
+def get_usernames_page(db: Session, after_username: str, limit: int) -> list:
+    try:
+        logger.info(f"Parsing up to {limit} usernames after: {after_username}")
+        query = select(db_models.User.username)
+        if after_username is not None:
+            query = query.where(db_models.User.username > after_username)
+        query = query.order_by(db_models.User.username).limit(limit + 1)
+
+        return db.execute(query).scalars().all()
+    except Exception as ex:
+        logger.error(f"Exception with after_username={after_username}, limit={limit}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Export columns of all users ordered by id, read through a server-side cursor in partitions of batch_size rows. Rows
+#are fetched lazily while the partitions are iterated
+def stream_users(db: Session, batch_size: int):
+    try:
+        logger.info(f"Streaming users in batches of {batch_size}")
+        query = select(db_models.User.user_id, db_models.User.username, db_models.User.email, db_models.User.role, db_models.User.created_at)
+        query = query.order_by(db_models.User.user_id).execution_options(yield_per=batch_size)
+
+        return db.execute(query).partitions()
     except Exception as ex:
-        logger.exception(f"Exception with username={username}, email={email}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+        logger.error(f"Exception while streaming users: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
 
+#Insert a new user with provided username, email, password hash and role in one statement. Returns (user_id, username, email,
+#created_at) row or None when username or email is already taken - unique constraints decide instead of a prior SELECT
+def create(db: Session, user: requestModel.UserCreate, password_hash: str):
+    role_value = None
 
-#Create a new user object by given parameters: username, email, password and role
-def create(db: Session, user: requestModel.UserCreate):
     try:
         logger.info("Attempting to create user")
 
@@ -75,56 +105,82 @@ def create(db: Session, user: requestModel.UserCreate):
         else:
             role_value = db_models.UserRole.registered_user
 
-        db_user = db_models.User(
+        statement = shared_crud.insert_on_conflict(db, db_models.User).values(
             username=user.username,
             email=user.email,
-            password_hash=user.password,
+            password_hash=password_hash,
             role=role_value
         )
+        statement = statement.on_conflict_do_nothing()
+        statement = statement.returning(db_models.User.user_id, db_models.User.username, db_models.User.email, db_models.User.created_at)
 
-        db.add(db_user)
-        logger.info("User prepared for creation, waiting for transaction commit")
+        db_user = (db.execute(statement)).first()
+        if db_user is None:
+            logger.warning(f"User not created, username or email already in use, provided username: {user.username}")
+        else:
+            logger.info("User prepared for creation, waiting for transaction commit")
         return db_user
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with username={user.username}, email={user.email}, role:{role_value}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError with username={user.username}, email={user.email}, role:{role_value}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with username={user.username}, email={user.email}, role:{role_value}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
-    
+        logger.error(f"Exception with username={user.username}, email={user.email}, role:{role_value}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
 
-#Update user object email or password by provided user id and optional values: new_password, new_email (one of them is required)
-def update(db: Session, usr_id: int, new_password: str, new_email: str):
+
+#Update email or password hash of the user matching provided username, email and current password hash in one statement,
+#optional values: new_password (hash), new_email (one of them is required). Returns (user_id, username, email, created_at)
+#row or None when nothing matches, e.g. the password was changed concurrently. A new_email taken by another user is
+#reported as 409 by the unique constraint
+def update(db: Session, username: str, email: str, password_hash: str, new_password: str, new_email: str):
     try:
         logger.info("Attempting to edit user account data")
-        db_existing_user = get_by_username_email_id(db=db, user_id=usr_id)
-    
-        if not db_existing_user:
-            logger.warning(f"User not found, provided new_email: {new_email}")
-            raise HTTPException(status_code=404, detail="User not found")
-    
+        values = {}
+
         if new_password is not None:
-            db_existing_user.password_hash = new_password 
-            logger.info("User prepared for password change, waiting for transaction commit")
+            values["password_hash"] = new_password
         if new_email is not None:
-            existing_email = db.query(db_models.User).filter(db_models.User.email == new_email).first()
-            if not existing_email:
-                db_existing_user.email = new_email
-                logger.info("User prepared for email change, waiting for transaction commit")
-            else:
-                logger.warning("User provided new_email already exists")
-                raise HTTPException(status_code=400, detail="User with such email address already exists")
+            values["email"] = new_email
 
-        return db_existing_user
+        statement = update_statement(db_models.User)
+        statement = statement.where(db_models.User.username == username, db_models.User.email == email, db_models.User.password_hash == password_hash)
+        statement = statement.values(**values)
+        statement = statement.returning(db_models.User.user_id, db_models.User.username, db_models.User.email, db_models.User.created_at)
+
+        db_user = (db.execute(statement)).first()
+        if db_user is None:
+            logger.warning(f"User not found, specified username: {username}")
+        else:
+            user_identity_cache.invalidate_on_commit(db, db_user.user_id)
+            logger.info("User prepared for account data change, waiting for transaction commit")
+        return db_user
 
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with usr_id={usr_id}, new_email={new_email}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        if shared_crud.is_unique_violation(ex):
+            logger.warning("User provided new_email already exists")
+            raise HTTPException(status_code=409, detail="User with such email address already exists")
+        logger.error(f"IntegrityError with username={username}, new_email={new_email}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with usr_id={usr_id}, new_email={new_email}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+        logger.error(f"Exception with username={username}, new_email={new_email}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
     
 
+#Replace password hash of the user if it still equals password_hash, used to rehash passwords on login. Returns True
+#when the hash was replaced
+def update_password_hash(db: Session, user_id: int, password_hash: str, new_password_hash: str) -> bool:
+    try:
+        statement = update_statement(db_models.User).where(db_models.User.user_id == user_id, db_models.User.password_hash == password_hash)
+        updated = db.execute(statement.values(password_hash=new_password_hash)).rowcount > 0
+
+        if updated:
+            user_identity_cache.invalidate_on_commit(db, user_id)
+        return updated
+    except Exception as ex:
+        logger.error(f"Exception with user_id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
 #Remove user object by using provided user_id
 def delete(db: Session, user_id: int):
     try:
@@ -136,11 +192,12 @@ def delete(db: Session, user_id: int):
             raise HTTPException(status_code=404, detail="User not found")
 
         db.delete(db_user)
+        user_identity_cache.invalidate_on_commit(db, user_id)
         logger.info("User prepared for account removal, waiting for transaction commit")
         
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with user_id={user_id}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError with user_id={user_id}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with user_id={user_id}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
\ No newline at end of file
+        logger.error(f"Exception with user_id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
\ No newline at end of file
@@ -1,12 +1,16 @@
+from sqlalchemy import select, update, delete
 from sqlalchemy.exc import IntegrityError
+from app.crud import shared_crud
 from app.config.logger import logger
 import app.models.database as models
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from datetime import datetime
 
 
-#Create a new user session entry in database by provided user ip
-def create(db: Session, user_id: int, user_ip: str):
+#Create a new user session entry in database by provided user ip, sessions opened by a login carry the hash and
+#expiration of their refresh token
+def create(db: Session, user_id: int, user_ip: str, refresh_token_hash: str = None, expires_at: datetime = None):
     try:
         logger.info("Attempting to create user session")
 
@@ -14,16 +18,92 @@ def create(db: Session, user_id: int, user_ip: str):
             db_session = models.UserSession(
             ip_address=user_ip,
             fk_user_id=user_id,
+            refresh_token_hash=refresh_token_hash,
+            expires_at=expires_at
             )
 
             db.add(db_session)
             logger.info("Session prepared for creation, waiting for transaction commit")
+            return db_session
         else:
             logger.error("Session cannot be created - user_id or user_ip not provided")
 
     except IntegrityError as ex:
-        logger.exception(f"IntegrityError with user_id={user_id}, user_ip={user_ip}: {ex}")
-        raise HTTPException(status_code=400, detail="An unexpected error occurred")
+        logger.error(f"IntegrityError with user_id={user_id}, user_ip={user_ip}: {ex}")
+        raise HTTPException(status_code=400, detail="An unexpected error occurred") from ex
     except Exception as ex:
-        logger.exception(f"Exception with user_id={user_id}, user_ip={user_ip}: {ex}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
\ No newline at end of file
+        logger.error(f"Exception with user_id={user_id}, user_ip={user_ip}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+def get(db: Session, session_id: int):
+    try:
+        return db.get(models.UserSession, session_id)
+    except Exception as ex:
+        logger.error(f"Exception with session_id={session_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Replace the refresh token of an active session if its current token is still refresh_token_hash, so of two concurrent
+#refreshes with the same token only one succeeds. The replaced hash is kept to recognize reuse of the rotated token.
+#Returns True when the token was replaced
+def rotate_refresh_token(db: Session, session_id: int, refresh_token_hash: str, new_refresh_token_hash: str, expires_at: datetime) -> bool:
+    try:
+        logger.info(f"Attempting to rotate refresh token of session {session_id}")
+        now = datetime.utcnow()
+        session = models.UserSession
+
+        statement = update(session).where(
+            session.session_id == session_id,
+            session.refresh_token_hash == refresh_token_hash,
+            session.revoked_at.is_(None),
+            session.expires_at > now
+        )
+        statement = statement.values(refresh_token_hash=new_refresh_token_hash, previous_refresh_token_hash=refresh_token_hash, refreshed_at=now, expires_at=expires_at)
+
+        return db.execute(statement).rowcount > 0
+    except Exception as ex:
+        logger.error(f"Exception with session_id={session_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Revoke one session or every active session of a user. Revoked sessions are recorded until revoked_until, the expiration
+#of the last access token they could have issued. Returns ids of revoked sessions
+def revoke(db: Session, revoked_until: datetime, session_id: int = None, user_id: int = None) -> list:
+    try:
+        logger.info(f"Attempting to revoke sessions, session_id: {session_id}, user_id: {user_id}")
+        session = models.UserSession
+
+        statement = update(session).where(session.revoked_at.is_(None))
+        if session_id is not None:
+            statement = statement.where(session.session_id == session_id)
+        if user_id is not None:
+            statement = statement.where(session.fk_user_id == user_id)
+        session_ids = db.execute(statement.values(revoked_at=datetime.utcnow()).returning(session.session_id)).scalars().all()
+
+        if session_ids:
+            statement = shared_crud.insert_on_conflict(db, models.RevokedSession).values([{"session_id": revoked_id, "expires_at": revoked_until} for revoked_id in session_ids])
+            db.execute(statement.on_conflict_do_update(index_elements=[models.RevokedSession.session_id], set_={"expires_at": statement.excluded.expires_at}))
+
+        return session_ids
+    except Exception as ex:
+        logger.error(f"Exception with session_id={session_id}, user_id={user_id}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Ids of revoked sessions whose access tokens may still be valid at provided time
+def get_revoked_session_ids(db: Session, now: datetime) -> list:
+    try:
+        return db.execute(select(models.RevokedSession.session_id).where(models.RevokedSession.expires_at > now)).scalars().all()
+    except Exception as ex:
+        logger.error(f"Exception with now={now}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
+
+
+#Remove revocations of sessions whose access tokens have all expired, returns the number of removed entries
+def delete_expired_revocations(db: Session, now: datetime) -> int:
+    try:
+        return db.execute(delete(models.RevokedSession).where(models.RevokedSession.expires_at <= now)).rowcount
+    except Exception as ex:
+        logger.error(f"Exception with now={now}: {ex}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred") from ex
@@ -1,6 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, Request
-from app.config.db_connection import engine, SessionLocal
-from app.services import user_service, category_service
+from fastapi import FastAPI, Depends, HTTPException, Request, Header, Query
+from fastapi.security import OAuth2PasswordRequestForm
+from app.config.db_connection import engine, async_engine, SessionLocal
+from app.services import user_service, category_service, file_service, resumable_upload_service, download_service, counter_service
+from app.services.pagination_service import PAGE_SIZE, MAX_PAGE_SIZE
+from app.services import export_service, search_service, reaction_service, trending_service, sweeper_service, scan_service, session_service
+from app.cache.trending_ranking import TRENDING_SIZE
+from app.services.export_service import ExportFormat
 from fastapi.exceptions import RequestValidationError
 import app.validators.shared_validator as validators
 import app.models.responses as responseModel
@@ -9,18 +14,71 @@ import app.models.requests as requestModel
 import app.crud.user_crud as user_crud
 from app.models.database import Base
 from sqlalchemy.orm import Session
-import app.config.logger
+from app.config.logger import logger
+from app.tasks.periodic import PeriodicTask
+from app.cache.category_tree_cache import category_tree_cache
+from app.config.pool_metrics import get_pool_metrics
+from app.routers import async_routes
+from app.middleware.request_context import RequestContextMiddleware, logged_http_exception_handler
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.cache.token_buckets import token_buckets
+from starlette.concurrency import run_in_threadpool
+from app.config import storage
+from app import auth
 from typing import List
 from . import crud
 
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
+app.include_router(async_routes.router)
+#Middleware added last runs first, request context has to wrap rate limit responses as well
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
+background_tasks = [
+    PeriodicTask(name="resumable_upload_gc", interval=storage.RESUMABLE_UPLOAD_GC_INTERVAL_SECONDS, job=resumable_upload_service.collect_abandoned_uploads),
+    PeriodicTask(name="reaction_counter_reconciliation", interval=reaction_service.REACTION_RECONCILE_INTERVAL_SECONDS, job=reaction_service.reconcile_reaction_counters),
+    PeriodicTask(name="trending_ranking_refresh", interval=trending_service.TRENDING_REFRESH_SECONDS, job=trending_service.refresh_trending_ranking),
+    PeriodicTask(name="upload_sweeper", interval=sweeper_service.SWEEP_INTERVAL_SECONDS, job=sweeper_service.sweep_uploads),
+    PeriodicTask(name="scan_backlog", interval=scan_service.SCAN_BACKLOG_INTERVAL_SECONDS, job=scan_service.queue_scan_backlog),
+    PeriodicTask(name="revocation_sync", interval=session_service.REVOCATION_SYNC_SECONDS, job=session_service.sync_revoked_sessions),
+]
+
+@app.on_event("startup")
+async def start_background_tasks():
+    counter_service.counters.start()
+    category_tree_cache.start()
+    scan_service.scan_pipeline.start()
+    #Revoked sessions have to be known before the first token is accepted, later changes are loaded by revocation_sync
+    try:
+        await run_in_threadpool(session_service.sync_revoked_sessions)
+    except Exception as ex:
+        logger.exception(f"Initial revocation sync failed, it is retried by revocation_sync: {ex}")
+    for task in background_tasks:
+        task.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in background_tasks:
+        await task.stop()
+    #Write counters which are still pending before the process exits
+    await run_in_threadpool(counter_service.counters.stop)
+    await run_in_threadpool(category_tree_cache.stop)
+    await run_in_threadpool(scan_service.scan_pipeline.stop)
+    await async_engine.dispose()
+    await token_buckets.close()
+    #Wait until enqueued log records are written
+    await logger.complete()
 
 @app.exception_handler(RequestValidationError)
 async def custom_validation_exception_handler(request: Request, exc: RequestValidationError):
     return await validators.validation_exception_handler(request, exc)
 
+@app.exception_handler(HTTPException)
+async def custom_http_exception_handler(request: Request, exc: HTTPException):
+    return await logged_http_exception_handler(request, exc)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -33,8 +91,8 @@ def get_db():
         summary="Create a new user", 
         description="This endpoint allows you to create a new user by providing a username, email, password and role(optional). The input is validated for malicious content, and both username and email must follow the appropriate format. If the username or email is already in use, a 409 error is returned.",
         tags=["User Management"])
-def create_user(user: requestModel.UserCreate, request: Request, db: Session = Depends(get_db)):
-    return user_service.create_user(db=db, request=request, user=user)
+async def create_user(user: requestModel.UserCreate, request: Request, db: Session = Depends(get_db)):
+    return await user_service.create_user(db=db, request=request, user=user)
 
 
 @app.get("/user/{username}", response_model=responseModel.User,
@@ -49,16 +107,40 @@ def read_user(username: str, db: Session = Depends(get_db)):
         summary="Update user password or email", 
         description="Update the password or email address of a user by providing the username, email, new_email(optional), old password, and new password(optional). The input is validated to ensure that the old and new passwords(or email addresses) are different. If the user is not found, a 404 error is returned.",
         tags=["User Management"])
-def update_user_credentials(username: str, data: requestModel.UserUpdatePassword, db: Session = Depends(get_db)):
-    return user_service.update_user(db=db, username=username, data=data)
+async def update_user_credentials(username: str, data: requestModel.UserUpdatePassword, db: Session = Depends(get_db)):
+    return await user_service.update_user(db=db, username=username, data=data)
 
 
 @app.delete("/users/{username}", status_code=204, 
         summary="Delete a user", 
         description="Delete a user from the database using their username, email, and password. If the user does not exist, a 404 error is returned. This operation requires valid credentials.",
         tags=["User Management"])
-def delete_user(username: str, db: Session = Depends(get_db), data: requestModel.UserDelete = None):
-    return user_service.remove_user(db=db, username=username, data=data)
+async def delete_user(username: str, db: Session = Depends(get_db), data: requestModel.UserDelete = None):
+    return await user_service.remove_user(db=db, username=username, data=data)
+
+
+@app.post("/token", response_model=responseModel.Token, status_code=200,
+        summary="Log in", 
+        description="Exchange username and password sent as an OAuth2 password form for a bearer access token and a refresh token. Every login opens a user session, access tokens carry the user id, role and session id, so authorized requests are verified without the database. If the username or password is incorrect, a 401 error is returned.",
+        tags=["User Management"])
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    return await user_service.login_user(db=db, request=request, username=form_data.username, password=form_data.password)
+
+
+@app.post("/token/refresh", response_model=responseModel.Token, status_code=200,
+        summary="Refresh access token", 
+        description="Exchange a refresh token for a new access token and refresh token. Every refresh token can be used once, presenting an already used refresh token revokes its whole session. If the refresh token is invalid, expired or revoked, a 401 error is returned.",
+        tags=["User Management"])
+def refresh_token(data: requestModel.TokenRefresh, db: Session = Depends(get_db)):
+    return session_service.refresh_session(db=db, refresh_token=data.refresh_token)
+
+
+@app.post("/logout", status_code=204,
+        summary="Log out", 
+        description="Revoke the session of the bearer access token. Its access and refresh tokens are no longer accepted. If the access token is invalid or revoked, a 401 error is returned.",
+        tags=["User Management"])
+def logout(claims: auth.TokenClaims = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    return session_service.close_session(db=db, claims=claims)
 
 
 
@@ -71,20 +153,20 @@ def create_category(category: requestModel.CategoryCreate, db: Session = Depends
     return category_service.create_category(db=db, category=category)
 
 
-@app.get("/categories/", response_model=List[responseModel.CategorieList], status_code=200,
-        summary="List all categories", 
-        description="Retrieve a list of all categories in the system. Endpoint and returns the names of the categories.",
+@app.get("/categories/", response_model=responseModel.CategoryList, status_code=200,
+        summary="List categories", 
+        description="Retrieve one page of categories ordered by name. Pass next_cursor of the previous response as cursor to get the following page, next_cursor is null on the last page. Responses carry an ETag, a request whose If-None-Match still matches gets 304 without a body.",
         tags=["Category Management"])
-def list_categories(db: Session = Depends(get_db)):
-    return category_service.get_categories(db=db)
+def list_categories(cursor: str = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), if_none_match: str = Header(None, alias="If-None-Match"), db: Session = Depends(get_db)):
+    return category_service.get_categories(db=db, cursor=cursor, limit=limit, if_none_match=if_none_match)
 
 
 @app.get("/categories/{category_name}", response_model=responseModel.SubCategories, status_code=200,
         summary="Retrieve all specific category sub-categories", 
-        description="Fetch sub-categories of a category by its name. If the category is not found, a 404 error is returned.",
+        description="Fetch sub-categories of a category by its name. Responses carry an ETag, a request whose If-None-Match still matches gets 304 without a body. If the category is not found, a 404 error is returned.",
         tags=["Category Management"])
-def read_category(category_name: str, db: Session = Depends(get_db)):
-    return category_service.get_category_with_subcategories(db=db, category_name=category_name)
+def read_category(category_name: str, if_none_match: str = Header(None, alias="If-None-Match"), db: Session = Depends(get_db)):
+    return category_service.get_category_with_subcategories(db=db, category_name=category_name, if_none_match=if_none_match)
 
 
 @app.patch("/admin/categories/{category_name}", response_model=responseModel.NewCategory,
@@ -108,34 +190,56 @@ def update_category(category_name: str, category_update: requestModel.CategoryUp
 
 
 
-@app.get("/admin/users", status_code=200,
-        summary="List all users", 
-        description="Retrieve a list of all registered users. This endpoint is restricted to admin access and returns a list of users in the system.",
-        tags=["User Management"]) #Done list all
-def list_users(db: Session = Depends(get_db)): #current_user: schemas.User = Depends(get_current_active_user)):    #Admino checkas
-    #if current_user.role != "admin":  #Admino checkas
-        #raise HTTPException(status_code=403, detail="Not authorized to perform this action")
+@app.get("/admin/users", response_model=responseModel.UserList, status_code=200,
+        summary="List users", 
+        description="Retrieve one page of registered usernames ordered by username. Pass next_cursor of the previous response as cursor to get the following page, next_cursor is null on the last page. This endpoint is restricted to admin access.",
+        tags=["User Management"])
+def list_users(cursor: str = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+
+        ###Add check based on if user has jwt and if jwt role is admin, then return users###
+
+    return user_service.get_usernames(db=db, cursor=cursor, limit=limit)
 
 
-        ###Add check based on if user has jwt and if jwt role is admin, then return all users###
 
-    
-    users = crud.get_all_users(db=db)
-    return users
+@app.get("/admin/exports/users", status_code=200,
+        summary="Export users", 
+        description="Stream all users (without password hashes) as NDJSON or CSV, optionally gzip compressed. Rows are read in batches through a server-side cursor, so the export size is not limited by server memory. Requires an admin access token, other users get a 403 error.",
+        tags=["User Management"])
+def export_users(format: ExportFormat = ExportFormat.ndjson, gzip: bool = False, claims: auth.TokenClaims = Depends(auth.get_current_admin)):
+    return export_service.export_users(format=format, compress=gzip)
+
+
+@app.get("/admin/exports/files", status_code=200,
+        summary="Export public file catalog", 
+        description="Stream metadata and counters of all public uploads, including uploads waiting for approval, as NDJSON or CSV, optionally gzip compressed. Rows are read in batches through a server-side cursor, so the export size is not limited by server memory. Requires an admin access token, other users get a 403 error.",
+        tags=["File Management"])
+def export_files(format: ExportFormat = ExportFormat.ndjson, gzip: bool = False, claims: auth.TokenClaims = Depends(auth.get_current_admin)):
+    return export_service.export_public_uploads(format=format, compress=gzip)
+
+
+@app.get("/admin/metrics/db-pool", response_model=List[responseModel.PoolMetrics], status_code=200,
+        summary="Database connection pool metrics", 
+        description="Current state of the sync and async database connection pools of this worker: connections checked out, overflow in use, checkout wait time histogram in milliseconds, slow checkouts and connection churn. Pool sizes are configured with STREAMABIT_DB_POOL_* environment variables.",
+        tags=["Monitoring"])
+def read_db_pool_metrics():
+    return get_pool_metrics()
+
+@app.get("/admin/metrics/sweeper", response_model=responseModel.SweepMetrics, status_code=200,
+        summary="Upload sweeper metrics", 
+        description="Counters of the expired and exhausted upload sweeper of this worker: runs (and runs paused during peak hours), batches, failed batches, removed uploads by type, freed blobs, uploads still waiting to be removed by type at the end of the last run and duration and throughput of the last run. The sweeper is configured with STREAMABIT_SWEEP_* environment variables.",
+        tags=["Monitoring"])
+def read_sweeper_metrics():
+    return sweeper_service.get_sweep_metrics()
 
 
 
 @app.delete("/admin/categories/{category_name}", status_code=204,
         summary="Delete a category", 
-        description="Delete a category by its name. If the category is not found, a 404 error is returned. Only admins can perform this action.",
+        description="Delete a category by its name. If the category is not found, a 404 error is returned and categories which still have sub-categories cannot be removed (409). Only admins can perform this action.",
         tags=["Category Management"]) #Done D
 def delete_category(category_name: str, db: Session = Depends(get_db)):
-    validators.check_malicious_input(category_name)
-
-    ###Add check to prevent category removal if it contains sub-categories, if not - then delete category###
-    ###Add check based on if user has jwt and if jwt role is admin, then delete category###
-
-    return crud.delete_category_by_name(db=db, category_name=category_name)
+    return category_service.delete_category(db=db, category_name=category_name)
 
 
 ################### Change to return sub-category files instead of category files
@@ -151,93 +255,184 @@ def list_files_in_category(category_name: str, db: Session = Depends(get_db)):
 
 
 
-@app.post("/files/", response_model=responseModel.File, status_code=201,
+@app.post("/files/", response_model=responseModel.UploadedFile, status_code=201,
         summary="Upload a new file", 
-        description="This endpoint allows users to upload a new file by providing a title. The file's path is generated and stored in the database.",
-        tags=["File Management"]) #Done C
-def upload_file(file: requestModel.FileCreate, user_id: int, db: Session = Depends(get_db)):
-    validators.check_malicious_input(file.title)
-
-    category_id = 13
-    security_status = False
-    views = 0
-
-    validators.validate_category(db=db, category_id=category_id)
-    validators.validate_user(db=db, user_id=user_id)
-
-    file_path = rf"C:\Temp\{file.title}"
-
-    return crud.create_file(
-        db=db,
-        file=file,
-        user_id=user_id,
-        file_path=file_path,
-        category_id=category_id,
-        security_status=security_status,
-        views=views
-    )
+        description="This endpoint allows users to upload a new file as multipart/form-data with a 'file' part and metadata fields: title, public, expiration_date, max_downloads(optional) and description(optional). The file is streamed to storage in fixed-size chunks while its SHA-256 hash and size are computed. A 409 error is returned if the same file has already been uploaded.",
+        tags=["File Management"],
+        openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file", "title", "public", "expiration_date"],
+            "properties": {
+                "file": {"type": "string", "format": "binary"},
+                "title": {"type": "string"},
+                "public": {"type": "boolean"},
+                "expiration_date": {"type": "string", "format": "date-time"},
+                "max_downloads": {"type": "integer"},
+                "description": {"type": "string"}
+            }
+        }}}}}) #Done C
+async def upload_file(request: Request, user_id: int, db: Session = Depends(get_db)):
+    return await file_service.upload_file(db=db, request=request, user_id=user_id)
+
+
+@app.post("/files/uploads/", response_model=responseModel.ResumableUploadStatus, status_code=201,
+        summary="Start a resumable upload", 
+        description="Create a resumable upload session by providing file metadata, total_size, SHA-256 file_hash of the whole file and an optional chunk_size. The returned upload_key is used to send numbered chunks, query received offset and complete the upload. Unfinished uploads are removed after a period of inactivity.",
+        tags=["File Management"])
+def create_resumable_upload(data: requestModel.ResumableUploadCreate, user_id: int, db: Session = Depends(get_db)):
+    return resumable_upload_service.create_resumable_upload(db=db, user_id=user_id, data=data)
+
+
+@app.get("/files/uploads/{upload_key}", response_model=responseModel.ResumableUploadStatus, status_code=200,
+        summary="Retrieve resumable upload status", 
+        description="Fetch received offset and indexes of received chunks of a resumable upload. If the upload does not exist or has expired, a 404 error is returned.",
+        tags=["File Management"])
+def read_resumable_upload(upload_key: str, db: Session = Depends(get_db)):
+    return resumable_upload_service.get_resumable_upload_status(db=db, upload_key=upload_key)
+
+
+@app.put("/files/uploads/{upload_key}/chunks/{chunk_index}", response_model=responseModel.ResumableUploadStatus, status_code=200,
+        summary="Upload a chunk of a resumable upload", 
+        description="Send raw bytes of a numbered chunk with its SHA-256 checksum in the X-Chunk-SHA256 header. Every chunk except the last must be exactly chunk_size bytes long. A chunk with a mismatching checksum is rejected with a 422 error and has to be sent again.",
+        tags=["File Management"])
+async def upload_resumable_chunk(upload_key: str, chunk_index: int, request: Request, checksum: str = Header(..., alias="X-Chunk-SHA256"), db: Session = Depends(get_db)):
+    return await resumable_upload_service.upload_chunk(db=db, request=request, upload_key=upload_key, chunk_index=chunk_index, checksum=checksum)
+
+
+@app.post("/files/uploads/{upload_key}/complete", response_model=responseModel.UploadedFile, status_code=201,
+        summary="Complete a resumable upload", 
+        description="Finalize a resumable upload once all chunks are received. The combined file SHA-256 hash is verified against the declared file_hash, on mismatch the upload is discarded and a 422 error is returned.",
+        tags=["File Management"])
+def complete_resumable_upload(upload_key: str, db: Session = Depends(get_db)):
+    return resumable_upload_service.complete_resumable_upload(db=db, upload_key=upload_key)
+
+
+@app.delete("/files/uploads/{upload_key}", status_code=204,
+        summary="Abort a resumable upload", 
+        description="Abort a resumable upload and remove all received chunks.",
+        tags=["File Management"])
+def abort_resumable_upload(upload_key: str, db: Session = Depends(get_db)):
+    return resumable_upload_service.abort_resumable_upload(db=db, upload_key=upload_key)
+
+
+@app.api_route("/files/public/{file_id}/download", methods=["GET", "HEAD"], status_code=200,
+        summary="Download a public file", 
+        description="Download bytes of an approved public file. Single byte ranges (Range, If-Range) are supported for resumable and parallel segment downloads. Expired files or files which reached their download limit return a 410 error. Every download attempt is recorded.",
+        tags=["File Management"])
+def download_public_file(file_id: int, request: Request, db: Session = Depends(get_db)):
+    return download_service.download_public_file(db=db, request=request, file_id=file_id)
+
+
+@app.api_route("/files/private/{download_link}/download", methods=["GET", "HEAD"], status_code=200,
+        summary="Download a private file", 
+        description="Download bytes of a private file by its download link. Password protected files require the X-Download-Password header. Single byte ranges (Range, If-Range) are supported for resumable and parallel segment downloads. Every download attempt is recorded.",
+        tags=["File Management"])
+async def download_private_file(download_link: str, request: Request, password: str = Header(None, alias="X-Download-Password"), db: Session = Depends(get_db)):
+    return await download_service.download_private_file(db=db, request=request, download_link=download_link, password=password)
 
 @app.get("/{username}/{category_name}/files")
 
 @app.get("/files/titles", response_model=responseModel.TitleList,
-        summary="List all file titles", 
-        description="Retrieve a list of all file titles currently stored in the system. No user authentication is required for this endpoint.",
+        summary="List file titles", 
+        description="Retrieve one page of approved public file titles ordered by title. Pass next_cursor of the previous response as cursor to get the following page, next_cursor is null on the last page. No user authentication is required for this endpoint.",
         tags=["File Management"])
-def list_file_titles(db: Session = Depends(get_db)):
-    return {"titles": crud.get_file_titles(db=db)}
+def list_file_titles(cursor: str = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    return file_service.get_public_titles(db=db, cursor=cursor, limit=limit)
 
-@app.get("/files/{file_id}", response_model=responseModel.File,
+@app.get("/search", response_model=responseModel.SearchResults, status_code=200,
+        summary="Search public files", 
+        description="Full-text search of approved, unexpired public files by title, description and sub-category or category names. Results are ranked with title matches first and returned one page at a time, pass next_cursor of the previous response as cursor to get the following page. No user authentication is required for this endpoint.",
+        tags=["File Management"])
+def search_files(q: str = Query(..., min_length=1, max_length=search_service.MAX_QUERY_LENGTH), cursor: str = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    return search_service.search_public_uploads(db=db, query_text=q, cursor=cursor, limit=limit)
+
+@app.get("/trending", response_model=responseModel.RankedFiles, status_code=200,
+        summary="List trending public files", 
+        description="Retrieve up to limit approved public files with the highest score of recent views, downloads and likes, best first. Every event counts less the older it gets. No user authentication is required for this endpoint.",
+        tags=["File Management"])
+def list_trending_files(limit: int = Query(PAGE_SIZE, ge=1, le=TRENDING_SIZE), db: Session = Depends(get_db)):
+    return trending_service.get_top_uploads(db=db, category_name=None, limit=limit)
+
+@app.get("/top", response_model=responseModel.RankedFiles, status_code=200,
+        summary="List top public files of a category", 
+        description="Retrieve up to limit approved public files placed in a sub-category of the category with the highest score of recent views, downloads and likes, best first. Categories without files return an empty list. No user authentication is required for this endpoint.",
+        tags=["File Management"])
+def list_top_files(category: str = Query(..., min_length=1), limit: int = Query(PAGE_SIZE, ge=1, le=TRENDING_SIZE), db: Session = Depends(get_db)):
+    return trending_service.get_top_uploads(db=db, category_name=category, limit=limit)
+
+
+@app.get("/files/{file_id}", response_model=responseModel.FileDetails,
         summary="Retrieve file details", 
-        description="Fetch the details of a file by its ID. If the file is not found, a 404 error is returned.",
+        description="Fetch the details of an approved public file by its ID. Every request counts as a file view, except revalidations answered with 304 because the If-None-Match ETag still matches. If the file is not found, a 404 error is returned.",
         tags=["File Management"]) #Done R
-def read_file(file_id: int, db: Session = Depends(get_db)):
+def read_file(file_id: int, if_none_match: str = Header(None, alias="If-None-Match"), db: Session = Depends(get_db)):
+    return file_service.get_public_file(db=db, file_id=file_id, if_none_match=if_none_match)
+
+@app.get("/browse/{category_name}/{sub_category_name}/{file_title}", response_model=responseModel.BrowsedFile,
+        summary="Browse to a file by its category path", 
+        description="Resolve a category/sub-category/file title path to an approved public file and return its details with the breadcrumb of the path. Every request counts as a file view. If the path does not lead to a file, a 404 error is returned.",
+        tags=["File Management"])
+def browse_file(category_name: str, sub_category_name: str, file_title: str, db: Session = Depends(get_db)):
+    return file_service.browse_public_file(db=db, category_name=category_name, sub_category_name=sub_category_name, file_title=file_title)
 
-    db_file = crud.get_file(db=db, file_id=file_id)
+@app.get("/files/{file_id}/stats", response_model=responseModel.FileStats,
+        summary="Retrieve file view and download counters", 
+        description="Fetch view and download counters of a public or private(upload_type) file by its ID. Counters are written to the database in batches, so recent views and downloads which are not stored yet are included. If the file is not found, a 404 error is returned.",
+        tags=["File Management"])
+def read_file_stats(file_id: int, upload_type: databaseModel.UploadType = databaseModel.UploadType.public, db: Session = Depends(get_db)):
+    return file_service.get_upload_stats(db=db, upload_type=upload_type, upload_id=file_id)
+
+@app.put("/files/{file_id}/like", response_model=responseModel.Reactions, status_code=200,
+        summary="Like a file", 
+        description="Like an approved public file as the user of the bearer token. Liking twice has no further effect and a dislike of the same user is replaced by the like. Returns updated like and dislike counters. Requests without a valid access token get a 401 error. If the file or user is not found, a 404 error is returned.",
+        tags=["File Management"])
+def like_file(file_id: int, claims: auth.TokenClaims = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    return reaction_service.set_reaction(db=db, user_id=claims.user_id, upload_id=file_id, reaction=databaseModel.Reaction.like)
+
+
+@app.put("/files/{file_id}/dislike", response_model=responseModel.Reactions, status_code=200,
+        summary="Dislike a file", 
+        description="Dislike an approved public file as the user of the bearer token. Disliking twice has no further effect and a like of the same user is replaced by the dislike. Returns updated like and dislike counters. Requests without a valid access token get a 401 error. If the file or user is not found, a 404 error is returned.",
+        tags=["File Management"])
+def dislike_file(file_id: int, claims: auth.TokenClaims = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    return reaction_service.set_reaction(db=db, user_id=claims.user_id, upload_id=file_id, reaction=databaseModel.Reaction.dislike)
+
+
+@app.delete("/files/{file_id}/reaction", response_model=responseModel.Reactions, status_code=200,
+        summary="Remove file reaction", 
+        description="Remove the like or dislike of the user of the bearer token from an approved public file. Returns updated like and dislike counters. Requests without a valid access token get a 401 error. If the file or user is not found, a 404 error is returned.",
+        tags=["File Management"])
+def remove_file_reaction(file_id: int, claims: auth.TokenClaims = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    return reaction_service.set_reaction(db=db, user_id=claims.user_id, upload_id=file_id, reaction=None)
+
+
+@app.post("/files/{file_id}/comments", response_model=responseModel.Comment, status_code=201,
+        summary="Comment a file", 
+        description="Add a comment of the user of the bearer token to an approved public file. Content must not be empty and must be less than 255 characters long. Requests without a valid access token get a 401 error. If the file or user is not found, a 404 error is returned.",
+        tags=["File Management"])
+def create_file_comment(file_id: int, data: requestModel.CommentCreate, claims: auth.TokenClaims = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    return reaction_service.add_comment(db=db, user_id=claims.user_id, upload_id=file_id, data=data)
+
+
+@app.get("/files/{file_id}/comments", response_model=responseModel.CommentList, status_code=200,
+        summary="List file comments", 
+        description="Retrieve one page of file comments, newest first. Pass next_cursor of the previous response as cursor to get the following page, next_cursor is null on the last page.",
+        tags=["File Management"])
+def list_file_comments(file_id: int, cursor: str = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    return reaction_service.get_comments(db=db, upload_id=file_id, cursor=cursor, limit=limit)
 
-    if db_file is None:
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    return db_file
 
 @app.patch("/files/{file_id}", response_model=responseModel.FileTitleUpdated, status_code=200,
         summary="Update file title", 
-        description="Allows the owner of a file to update its title. The user must provide the correct user ID and password for validation. If the file does not belong to the user or if the password is incorrect, appropriate error messages are returned.",
+        description="Allows the owner of a public or private(upload_type) file to update its title. The user must provide the correct user ID and password for validation. If the file does not belong to the user or if the password is incorrect, appropriate error messages are returned.",
         tags=["File Management"]) #Done U
-def update_file_title(file_id: int, data: requestModel.FileTitleUpdate, db: Session = Depends(get_db)):
-    validators.check_malicious_input(data.new_title, data.password)
-
-    db_user = crud.get_user_by_username_email_id(db=db, id=data.user_id)
-    if db_user.password_hash != data.password:
-        raise HTTPException(status_code=404, detail="User not found or password incorrect")
-    
-    db_file = crud.get_file(db=db, file_id=file_id)
-    if not db_file:
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    if db_file.user_id != db_user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
-
-    updated_file = crud.update_file_title(db=db, file_id=file_id, new_title=data.new_title)
+async def update_file_title(file_id: int, data: requestModel.FileTitleUpdate, upload_type: databaseModel.UploadType = databaseModel.UploadType.public, db: Session = Depends(get_db)):
+    return await file_service.update_upload_title(db=db, upload_type=upload_type, upload_id=file_id, data=data)
 
-    return updated_file
 
 @app.delete("/files/{file_id}", status_code=204,
         summary="Delete a file", 
-        description="Delete a file by its ID. The user must provide their user ID and password for validation. If the file does not belong to the user or if the password is incorrect, an error is returned. The file is permanently removed from the database.",
+        description="Delete a public or private(upload_type) file by its ID. The user must provide their user ID and password for validation. If the file does not belong to the user or if the password is incorrect, an error is returned. The file is permanently removed from the database and its stored bytes are freed once no other upload shares the same content.",
         tags=["File Management"]) #Done D
-def delete_file(file_id: int, data: requestModel.FileDelete, db: Session = Depends(get_db)):
-
-    validators.check_malicious_input(data.password)
-
-    db_user = crud.get_user_by_username_email_id(db=db, id=data.user_id)
-    if db_user is None or db_user.password_hash != data.password:
-        raise HTTPException(status_code=404, detail="User not found or password incorrect")
-    
-    db_file = crud.get_file(db=db, file_id=file_id)
-    if not db_file:
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    if db_file.user_id != db_user.id:
-        raise HTTPException(status_code=403, detail="User has no access to the file")
-
-    return crud.delete_file(db=db, file_id=file_id)
\ No newline at end of file
+async def delete_file(file_id: int, data: requestModel.FileDelete, upload_type: databaseModel.UploadType = databaseModel.UploadType.public, db: Session = Depends(get_db)):
+    return await file_service.remove_upload(db=db, upload_type=upload_type, upload_id=file_id, data=data)
\ No newline at end of file
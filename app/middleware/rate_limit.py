@@ -0,0 +1,120 @@
+from app.cache.token_buckets import RateLimit, parse_rate_limit, token_buckets
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.responses import JSONResponse
+from urllib.parse import parse_qsl
+from app.config.logger import logger
+from dataclasses import dataclass
+from app import auth
+import math
+import re
+import os
+
+#Limits per client IP and per user as "<requests>/<seconds>", "0" disables a limit
+REGISTRATION_LIMIT = parse_rate_limit(os.getenv("STREAMABIT_RATE_LIMIT_REGISTRATION", "5/3600"))
+LOGIN_LIMIT = parse_rate_limit(os.getenv("STREAMABIT_RATE_LIMIT_LOGIN", "10/60"))
+CREDENTIALS_LIMIT = parse_rate_limit(os.getenv("STREAMABIT_RATE_LIMIT_CREDENTIALS", "5/60"))
+UPLOAD_LIMIT = parse_rate_limit(os.getenv("STREAMABIT_RATE_LIMIT_UPLOADS", "20/60"))
+FILE_MUTATION_LIMIT = parse_rate_limit(os.getenv("STREAMABIT_RATE_LIMIT_FILE_MUTATIONS", "60/60"))
+
+
+#Limited route. Requests matching method and path take a token from the bucket of their IP and from the bucket of their
+#user - the bearer token user, otherwise the account the request targets by a username path parameter or user_id query
+#parameter. Routes sharing a name share their buckets
+@dataclass(frozen=True)
+class RouteLimit:
+    name: str
+    method: str
+    path: str
+    ip_limit: RateLimit = None
+    user_limit: RateLimit = None
+
+
+RATE_LIMITED_ROUTES = [
+    RouteLimit("register", "POST", r"(/async)?/user", ip_limit=REGISTRATION_LIMIT),
+    RouteLimit("login", "POST", r"/token", ip_limit=LOGIN_LIMIT),
+    RouteLimit("refresh", "POST", r"/token/refresh", ip_limit=LOGIN_LIMIT),
+    RouteLimit("user_update", "PATCH", r"(/async)?/user/(?P<username>[^/]+)", ip_limit=CREDENTIALS_LIMIT, user_limit=CREDENTIALS_LIMIT),
+    RouteLimit("user_delete", "DELETE", r"(/async)?/users/(?P<username>[^/]+)", ip_limit=CREDENTIALS_LIMIT, user_limit=CREDENTIALS_LIMIT),
+    RouteLimit("file_delete", "DELETE", r"/files/\d+", ip_limit=CREDENTIALS_LIMIT, user_limit=CREDENTIALS_LIMIT),
+    RouteLimit("upload", "POST", r"/files/(uploads/)?", ip_limit=UPLOAD_LIMIT, user_limit=UPLOAD_LIMIT),
+    RouteLimit("file_update", "PATCH", r"/files/\d+", ip_limit=FILE_MUTATION_LIMIT, user_limit=FILE_MUTATION_LIMIT),
+    RouteLimit("reaction", "PUT", r"/files/\d+/(like|dislike)", ip_limit=FILE_MUTATION_LIMIT, user_limit=FILE_MUTATION_LIMIT),
+    RouteLimit("reaction", "DELETE", r"/files/\d+/reaction", ip_limit=FILE_MUTATION_LIMIT, user_limit=FILE_MUTATION_LIMIT),
+    RouteLimit("comment", "POST", r"/files/\d+/comments", ip_limit=FILE_MUTATION_LIMIT, user_limit=FILE_MUTATION_LIMIT),
+]
+
+
+def get_bearer_token(scope: Scope):
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token if scheme.lower() == "bearer" and token else None
+    return None
+
+
+#User key of a request - id of a valid bearer token, otherwise the targeted username or user_id, None for anonymous requests
+def get_user_key(scope: Scope, match: re.Match):
+    token = get_bearer_token(scope)
+    if token is not None:
+        claims = auth.decode_access_token(token)
+        if claims is not None:
+            return f"id:{claims.user_id}"
+
+    username = match.groupdict().get("username")
+    if username:
+        return f"name:{username.lower()}"
+
+    for name, value in parse_qsl(scope.get("query_string", b"").decode("latin-1")):
+        if name == "user_id" and value.isdigit():
+            return f"id:{int(value)}"
+    return None
+
+
+#Token bucket rate limiting of routes in RATE_LIMITED_ROUTES. Runs in front of routing, so throttled requests are
+#answered with 429 and Retry-After before their body is read or a database connection is taken. Requests of other routes
+#only cost a lookup among the limited routes of their method
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, routes: list = None, buckets=None):
+        self.app = app
+        self.buckets = buckets or token_buckets
+        self.routes = {}
+        for route in RATE_LIMITED_ROUTES if routes is None else routes:
+            if route.ip_limit is not None or route.user_limit is not None:
+                self.routes.setdefault(route.method, []).append((re.compile(route.path), route))
+
+    def match(self, scope: Scope):
+        for pattern, route in self.routes.get(scope["method"], ()):
+            match = pattern.fullmatch(scope["path"])
+            if match is not None:
+                return route, match
+        return None, None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route, match = self.match(scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        buckets = []
+        if route.ip_limit is not None and scope.get("client"):
+            buckets.append((f"{route.name}:ip:{scope['client'][0]}", route.ip_limit))
+        if route.user_limit is not None:
+            user_key = get_user_key(scope, match)
+            if user_key is not None:
+                buckets.append((f"{route.name}:user:{user_key}", route.user_limit))
+
+        #Both buckets are checked before a token is taken, a request rejected by one of them costs nothing in the other
+        wait = await self.buckets.take_all(buckets) if buckets else 0
+
+        if wait > 0:
+            retry_after = math.ceil(wait)
+            logger.warning(f"Rate limit of {route.name} exceeded on {scope['method']} {scope['path']}, retry after {retry_after}s")
+            response = JSONResponse(status_code=429, content={"detail": "Too many requests"}, headers={"Retry-After": str(retry_after)})
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
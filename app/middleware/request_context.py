@@ -0,0 +1,57 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from fastapi.exception_handlers import http_exception_handler
+from starlette.datastructures import MutableHeaders
+from fastapi import HTTPException, Request
+from app.config.logger import logger
+import random
+import uuid
+import re
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+#Incoming request ids are reused only when they are short and safe to write into logs and headers
+REQUEST_ID_PATTERN = re.compile(r'^[a-zA-Z0-9._-]{1,64}$')
+
+
+def get_request_id(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            request_id = value.decode("latin-1")
+            if REQUEST_ID_PATTERN.match(request_id):
+                return request_id
+            break
+    return uuid.uuid4().hex
+
+
+#Outermost middleware - binds request id and log sample value to every record of the request, returns the id in
+#X-Request-ID header and logs exceptions which escaped the application once, with their stack trace
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = get_request_id(scope)
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        with logger.contextualize(request_id=request_id, sample=random.random()):
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            except Exception as ex:
+                logger.exception(f"Unhandled exception on {scope['method']} {scope['path']}: {ex}")
+                raise
+
+
+#crud functions convert unexpected exceptions to HTTPException raised from the original one and only log a message,
+#the stack trace of the original exception is logged here once per request
+async def logged_http_exception_handler(request: Request, exc: HTTPException):
+    if exc.__cause__ is not None:
+        logger.opt(exception=exc.__cause__).error(f"Request failed with status {exc.status_code} on {request.method} {request.url.path}: {exc.__cause__}")
+    return await http_exception_handler(request, exc)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, BigInteger, String, TIMESTAMP, ForeignKey, text, Boolean, UniqueConstraint, Enum as SAEnum
+from sqlalchemy import Column, BigInteger, String, Text, TIMESTAMP, ForeignKey, text, Boolean, UniqueConstraint, Index, DDL, event, Enum as SAEnum
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from enum import Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from app.config.db_connection import Base
 
@@ -9,6 +10,21 @@ class UserRole(str, Enum):
     admin = "admin"
 
 
+class UploadType(str, Enum):
+    public = "public"
+    private = "private"
+
+
+class ResumableUploadState(str, Enum):
+    receiving = "receiving"
+    completing = "completing"
+
+
+class Reaction(str, Enum):
+    like = "like"
+    dislike = "dislike"
+
+
 class ApprovalStatus(Enum):
     approve = "approved"
     pending = "pending"
@@ -34,6 +50,7 @@ class User(Base):
     sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")       #Access user sessions
     file_approvals = relationship("FileApproval", back_populates="user")    #Access admin file approvals
     comments = relationship("Comment", back_populates="user")   #Access user comments
+    resumable_uploads = relationship("ResumableUpload", back_populates="user", cascade="all, delete-orphan")   #Access unfinished resumable uploads
 
 
 class FileLike(Base):
@@ -45,7 +62,7 @@ class FileLike(Base):
     
     #FK
     fk_user_id = Column(BigInteger, ForeignKey('user.user_id'), nullable=False)
-    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=False)
+    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=False, index=True)
 
     #Unique constraint to ensure a user can only like a specific upload once
     __table_args__ = (UniqueConstraint('fk_user_id', 'fk_public_upload_id', name='uq_user_upload_like'),)
@@ -64,7 +81,7 @@ class FileDislike(Base):
     
     #FK
     fk_user_id = Column(BigInteger, ForeignKey('user.user_id'), nullable=False)
-    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=False)
+    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=False, index=True)
 
     # Unique constraint to ensure a user can only dislike a specific upload once
     __table_args__ = (UniqueConstraint('fk_user_id', 'fk_public_upload_id', name='uq_user_upload_dislike'),)
@@ -81,6 +98,11 @@ class UserSession(Base):
     session_id = Column(BigInteger, primary_key=True, nullable=False)
     created_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP", nullable=False)
     ip_address = Column(String(45), nullable=False)
+    refresh_token_hash = Column(String(64), nullable=True)     #SHA-256 of the current refresh token, replaced on every refresh
+    previous_refresh_token_hash = Column(String(64), nullable=True)      #SHA-256 of the refresh token rotated out by the last refresh
+    refreshed_at = Column(TIMESTAMP, nullable=True)
+    expires_at = Column(TIMESTAMP, nullable=True)      #Expiration of the current refresh token
+    revoked_at = Column(TIMESTAMP, nullable=True)
 
     #FK
     fk_user_id = Column(BigInteger, ForeignKey('user.user_id', ondelete="CASCADE"), nullable=False)
@@ -89,6 +111,16 @@ class UserSession(Base):
     user = relationship("User", back_populates="sessions")     #Access user who used the session
 
 
+#Session whose access tokens are rejected until they expire. Kept apart from user_session, so revocations outlive
+#sessions removed together with their user
+class RevokedSession(Base):
+    __tablename__ = "revoked_session"
+
+    #PK
+    session_id = Column(BigInteger, primary_key=True, nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)     #Expiration of the last access token issued for the session
+
+
 class FileApproval(Base):
     __tablename__ = "file_approval"
 
@@ -99,7 +131,7 @@ class FileApproval(Base):
     status = Column(SAEnum(ApprovalStatus), default=ApprovalStatus.pending, nullable=False)
 
     #FK
-    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=False)
+    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=False, index=True)
     fk_user_id = Column(BigInteger, ForeignKey('user.user_id'), nullable=False)
 
     #Relationships
@@ -119,11 +151,36 @@ class Comment(Base):
     fk_user_id = Column(BigInteger, ForeignKey('user.user_id'), nullable=False)
     fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=False)
 
+    #Comments of an upload are listed and counted by upload
+    __table_args__ = (Index('ix_comment_upload_comment', 'fk_public_upload_id', 'comment_id'),)
+
     #Relationships
     user = relationship("User", back_populates="comments")    #Access user who wrote a comment
     public_upload = relationship("PublicUpload", back_populates="comments")   #Access public upload that was commented
     
 
+class Blob(Base):
+    __tablename__ = "blob"
+
+    #PK
+    file_hash = Column(String(64), primary_key=True, nullable=False)
+    size_in_bytes = Column(BigInteger, nullable=False)
+    ref_count = Column(BigInteger, server_default="1", nullable=False)     #Number of public and private uploads pointing to the blob
+    created_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP", nullable=False)
+
+
+#Antivirus verdict of a content hash. Verdicts are kept after the blob is removed, so content uploaded again is not rescanned
+class ScanVerdict(Base):
+    __tablename__ = "scan_verdict"
+
+    #PK
+    file_hash = Column(String(64), primary_key=True, nullable=False)
+    infected = Column(Boolean, nullable=False)
+    signature = Column(String(255), nullable=True)     #Name of the detected threat
+    scanner = Column(String(100), nullable=False)
+    scanned_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP", nullable=False)
+
+
 class PublicUpload(Base):
     __tablename__ = "public_upload"
 
@@ -131,25 +188,36 @@ class PublicUpload(Base):
     public_upload_id = Column(BigInteger, primary_key=True, nullable=False)
     title = Column(String(100), nullable=False)
     description = Column(String(255), nullable=True)
-    file_path = Column(String(255), unique=True, nullable=False)
+    file_path = Column(String(255), nullable=False)
     max_download_count = Column(BigInteger, server_default="0", nullable=True)
     download_count = Column(BigInteger, server_default="0", nullable=True)
     expiration_date = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP + INTERVAL '7 days'"), nullable=False)
     virus_free = Column(Boolean, server_default=text("false"), nullable=False)
     uploaded_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP", nullable=False)
     size_in_bytes = Column(BigInteger, nullable=False)
-    file_hash = Column(String(64), unique=True, nullable=False)
     views = Column(BigInteger, server_default="0", nullable=True)
     like_count = Column(BigInteger, server_default="0", nullable=True)
     dislike_count = Column(BigInteger, server_default="0", nullable=True)
     comment_count = Column(BigInteger, server_default="0", nullable=True)
     admin_approved = Column(Boolean, server_default=text("false"), nullable=False)
+    #Full-text search document, maintained by PostgreSQL triggers (see SEARCH_DDL) and unused with other databases
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
 
     #FK
     fk_user_id = Column(BigInteger, ForeignKey('user.user_id'), nullable=False)
+    file_hash = Column(String(64), ForeignKey('blob.file_hash'), nullable=False, index=True)
+
+    #Keyset pagination of file titles, expiration sweeps and download limit sweeps. Only uploads with a download limit
+    #are in the download limit index
+    __table_args__ = (
+        Index('ix_public_upload_title_id', 'title', 'public_upload_id'),
+        Index('ix_public_upload_expiration_date', 'expiration_date'),
+        Index('ix_public_upload_download_limit', 'public_upload_id', postgresql_where=text("max_download_count > 0"), sqlite_where=text("max_download_count > 0"))
+    )
 
     #Relationships
     user = relationship("User", back_populates="public_files")    #Access user who uploaded the file
+    blob = relationship("Blob")     #Access stored file content
     file_likes = relationship("FileLike", back_populates="public_upload")    #Access likes for specific public upload
     file_dislikes = relationship("FileDislike", back_populates="public_upload")    #Access likes for specific public upload
     file_approvals = relationship("FileApproval", back_populates="public_upload")   #Access file approval
@@ -167,7 +235,11 @@ class PublicUploadSubCategory(Base):
     fk_sub_category_id = Column(BigInteger, ForeignKey('sub_category.sub_category_id'), nullable=False)
 
     # Unique constraint to ensure a specific pair is unique
-    __table_args__ = (UniqueConstraint('fk_public_upload_id', 'fk_sub_category_id', name='uq_public_upload_sub_category'),)
+    #Index on (sub-category, upload) serves sub-category listings and browse path resolution
+    __table_args__ = (
+        UniqueConstraint('fk_public_upload_id', 'fk_sub_category_id', name='uq_public_upload_sub_category'),
+        Index('ix_has_sub_category_upload', 'fk_sub_category_id', 'fk_public_upload_id'),
+    )
 
     #Relationships
     public_upload = relationship("PublicUpload", back_populates="sub_categories_association")   #Access public upload that is placed in sub-category
@@ -197,27 +269,73 @@ class PrivateUpload(Base):
     private_upload_id = Column(BigInteger, primary_key=True, nullable=False)
     title = Column(String(100), nullable=False)
     description = Column(String(255), nullable=True)
-    file_path = Column(String(255), unique=True, nullable=False)
+    file_path = Column(String(255), nullable=False)
     max_download_count = Column(BigInteger, server_default="0", nullable=True)
     download_count = Column(BigInteger, server_default="0", nullable=True)
     expiration_date = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP + INTERVAL '7 days'"), nullable=False)
     virus_free = Column(Boolean, server_default=text("false"), nullable=False)
     uploaded_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP", nullable=False)
     size_in_bytes = Column(BigInteger, nullable=False)
-    file_hash = Column(String(64), unique=True, nullable=False)
     views = Column(BigInteger, server_default="0", nullable=True)
     password_protected = Column(Boolean, nullable=False)
     password_hash = Column(String(255), nullable=True)
-    download_link = Column(String(2083), nullable=False)
+    download_link = Column(String(2083), nullable=False, index=True)
 
     #FK
     fk_user_id = Column(BigInteger, ForeignKey('user.user_id'), nullable=False)
+    file_hash = Column(String(64), ForeignKey('blob.file_hash'), nullable=False, index=True)
+
+    #Expiration sweeps and download limit sweeps, only uploads with a download limit are in the download limit index
+    __table_args__ = (
+        Index('ix_private_upload_expiration_date', 'expiration_date'),
+        Index('ix_private_upload_download_limit', 'private_upload_id', postgresql_where=text("max_download_count > 0"), sqlite_where=text("max_download_count > 0"))
+    )
 
     #Relationships
     user = relationship("User", back_populates="private_files")    #Access user who uploaded the file
+    blob = relationship("Blob")     #Access stored file content
     downloads = relationship("FileDownload", back_populates="private_upload")    #Access file downloads
 
 
+class ResumableUpload(Base):
+    __tablename__ = "resumable_upload"
+
+    #PK
+    resumable_upload_id = Column(BigInteger, primary_key=True, nullable=False)
+    upload_key = Column(String(64), unique=True, nullable=False)
+    title = Column(String(100), nullable=False)
+    description = Column(String(255), nullable=True)
+    public = Column(Boolean, nullable=False)
+    max_download_count = Column(BigInteger, nullable=True)
+    file_expiration_date = Column(TIMESTAMP, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(BigInteger, nullable=False)
+    file_hash = Column(String(64), nullable=False)
+    created_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP", nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+    state = Column(SAEnum(ResumableUploadState), default=ResumableUploadState.receiving, nullable=False)     #completing while the combined file is verified, chunks are refused meanwhile
+
+    #FK
+    fk_user_id = Column(BigInteger, ForeignKey('user.user_id', ondelete="CASCADE"), nullable=False)
+
+    #Relationships
+    user = relationship("User", back_populates="resumable_uploads")    #Access user who started the upload
+    chunks = relationship("ResumableUploadChunk", back_populates="resumable_upload", cascade="all, delete-orphan")   #Access received chunks
+
+
+class ResumableUploadChunk(Base):
+    __tablename__ = "resumable_upload_chunk"
+
+    #PK
+    fk_resumable_upload_id = Column(BigInteger, ForeignKey('resumable_upload.resumable_upload_id', ondelete="CASCADE"), primary_key=True, nullable=False)
+    chunk_index = Column(BigInteger, primary_key=True, nullable=False)
+    size_in_bytes = Column(BigInteger, nullable=False)
+    checksum = Column(String(64), nullable=False)
+
+    #Relationships
+    resumable_upload = relationship("ResumableUpload", back_populates="chunks")   #Access resumable upload the chunk belongs to
+
+
 class FileDownload(Base):
     __tablename__ = "file_download"
 
@@ -228,8 +346,8 @@ class FileDownload(Base):
     ip_address = Column(String(45), nullable=False)
 
     #FK
-    fk_private_upload_id = Column(BigInteger, ForeignKey('private_upload.private_upload_id'), nullable=True)
-    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=True)
+    fk_private_upload_id = Column(BigInteger, ForeignKey('private_upload.private_upload_id'), nullable=True, index=True)
+    fk_public_upload_id = Column(BigInteger, ForeignKey('public_upload.public_upload_id'), nullable=True, index=True)
 
     #Relationships
     private_upload = relationship("PrivateUpload", back_populates="downloads")   #Access private upload that was downloaded
@@ -246,4 +364,101 @@ class Category(Base):
     created_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP", nullable=False)
 
     #Relationships
-    sub_categories = relationship("SubCategory", back_populates="categories")   #Access sub-categories
\ No newline at end of file
+    sub_categories = relationship("SubCategory", back_populates="categories")   #Access sub-categories
+
+
+#PostgreSQL full-text search over public uploads. search_vector holds weighted title (A), sub-category and category names
+#(B) and description (C) terms. Triggers keep it current when an upload is written, when it is placed in or removed from
+#a sub-category and when a category or sub-category is renamed, so only the touched uploads are re-indexed
+SEARCH_TEXT_CONFIG = "simple"
+
+SEARCH_DDL = [
+    "ALTER TABLE public_upload ADD COLUMN IF NOT EXISTS search_vector tsvector",
+
+    """CREATE OR REPLACE FUNCTION public_upload_category_names(upload_id BIGINT) RETURNS TEXT AS $$
+        SELECT coalesce(string_agg(sub_category.name || ' ' || category.name, ' '), '')
+        FROM has
+        JOIN sub_category ON sub_category.sub_category_id = has.fk_sub_category_id
+        JOIN category ON category.category_id = sub_category.fk_category_id
+        WHERE has.fk_public_upload_id = upload_id
+    $$ LANGUAGE sql STABLE""",
+
+    f"""CREATE OR REPLACE FUNCTION public_upload_search_vector(title TEXT, description TEXT, category_names TEXT) RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(category_names, '')), 'B')
+            || setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(description, '')), 'C')
+    $$ LANGUAGE sql IMMUTABLE""",
+
+    """CREATE OR REPLACE FUNCTION refresh_public_upload_search_vectors(upload_ids BIGINT[]) RETURNS void AS $$
+        UPDATE public_upload
+        SET search_vector = public_upload_search_vector(title, description, public_upload_category_names(public_upload_id))
+        WHERE public_upload_id = ANY(upload_ids)
+    $$ LANGUAGE sql""",
+
+    """CREATE OR REPLACE FUNCTION public_upload_search_vector_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := public_upload_search_vector(NEW.title, NEW.description, public_upload_category_names(NEW.public_upload_id));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+
+    """CREATE OR REPLACE FUNCTION has_search_vector_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM refresh_public_upload_search_vectors(ARRAY[OLD.fk_public_upload_id]);
+        END IF;
+        IF TG_OP IN ('UPDATE', 'INSERT') THEN
+            PERFORM refresh_public_upload_search_vectors(ARRAY[NEW.fk_public_upload_id]);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+
+    """CREATE OR REPLACE FUNCTION sub_category_search_vector_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM refresh_public_upload_search_vectors(ARRAY(
+            SELECT fk_public_upload_id FROM has WHERE fk_sub_category_id = NEW.sub_category_id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+
+    """CREATE OR REPLACE FUNCTION category_search_vector_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM refresh_public_upload_search_vectors(ARRAY(
+            SELECT has.fk_public_upload_id FROM has
+            JOIN sub_category ON sub_category.sub_category_id = has.fk_sub_category_id
+            WHERE sub_category.fk_category_id = NEW.category_id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+
+    "DROP TRIGGER IF EXISTS public_upload_search_vector_update ON public_upload",
+    """CREATE TRIGGER public_upload_search_vector_update BEFORE INSERT OR UPDATE OF title, description ON public_upload
+        FOR EACH ROW EXECUTE FUNCTION public_upload_search_vector_trigger()""",
+
+    "DROP TRIGGER IF EXISTS has_search_vector_update ON has",
+    """CREATE TRIGGER has_search_vector_update AFTER INSERT OR UPDATE OR DELETE ON has
+        FOR EACH ROW EXECUTE FUNCTION has_search_vector_trigger()""",
+
+    "DROP TRIGGER IF EXISTS sub_category_search_vector_update ON sub_category",
+    """CREATE TRIGGER sub_category_search_vector_update AFTER UPDATE OF name, fk_category_id ON sub_category
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name OR OLD.fk_category_id IS DISTINCT FROM NEW.fk_category_id)
+        EXECUTE FUNCTION sub_category_search_vector_trigger()""",
+
+    "DROP TRIGGER IF EXISTS category_search_vector_update ON category",
+    """CREATE TRIGGER category_search_vector_update AFTER UPDATE OF name ON category
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE FUNCTION category_search_vector_trigger()""",
+
+    "CREATE INDEX IF NOT EXISTS ix_public_upload_search_vector ON public_upload USING GIN (search_vector)",
+
+    #Uploads stored before search was added
+    """UPDATE public_upload
+        SET search_vector = public_upload_search_vector(title, description, public_upload_category_names(public_upload_id))
+        WHERE search_vector IS NULL"""
+]
+
+for statement in SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -0,0 +1,39 @@
+from starlette.responses import JSONResponse, Response
+from datetime import date, datetime
+import json
+
+#orjson is optional, responses are encoded by the standard library encoder without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+#Encode plain data - dicts, lists, strings, numbers, None and datetimes - into the same JSON FastAPI produces for it
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=encode_default).encode("utf-8")
+
+
+#Response of data read from our own database. Returning it from an endpoint skips jsonable_encoder and validation by the
+#response_model, which then only documents the response, so content must already have the shape of the model
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+#Response of an already encoded JSON body
+class EncodedJSONResponse(Response):
+    media_type = "application/json"
+
+
+#Encoded {"<field>": [items...], "next_cursor": ...} page joined from encoded items
+def encode_page(field: str, encoded_items: list, next_cursor: str) -> bytes:
+    return b"".join((b'{"', field.encode(), b'":[', b",".join(encoded_items), b'],"next_cursor":', dumps(next_cursor), b"}"))
@@ -35,6 +35,12 @@ class UserDelete(BaseModel):
     class Config:
         extra = Extra.forbid
 
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+    class Config:
+        extra = Extra.forbid
+
 class UserList(BaseModel):
     usernames: List[str]
 
@@ -64,6 +70,14 @@ class FileCreate(BaseModel):
     class Config:
         extra = Extra.forbid
 
+class ResumableUploadCreate(FileCreate):
+    total_size: int
+    file_hash: str
+    chunk_size: Optional[int] = None
+
+    class Config:
+        extra = Extra.forbid
+
 class FileTitleUpdate(BaseModel):
     user_id: int
     new_title: str
@@ -72,6 +86,12 @@ class FileTitleUpdate(BaseModel):
     class Config:
         extra = Extra.forbid
 
+class CommentCreate(BaseModel):
+    content: str
+
+    class Config:
+        extra = Extra.forbid
+
 class FileDelete(BaseModel):
     user_id: int
     password: str
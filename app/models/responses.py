@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Extra, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
+import app.models.database as database
 
 class UserBase(BaseModel):
     username: str
@@ -48,6 +49,59 @@ class CategorieList(BaseModel):
         orm_mode = True
         extra = Extra.forbid
 
+class CategoryList(BaseModel):
+    categories: List[CategorieList]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        extra = Extra.forbid
+
+class Token(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+
+    class Config:
+        extra = Extra.forbid
+
+class UserList(BaseModel):
+    usernames: List[str]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        extra = Extra.forbid
+
+class SearchResult(BaseModel):
+    upload_id: int
+    title: str
+    description: Optional[str] = None
+    rank: float
+
+    class Config:
+        extra = Extra.forbid
+
+class SearchResults(BaseModel):
+    results: List[SearchResult]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        extra = Extra.forbid
+
+class RankedFile(BaseModel):
+    upload_id: int
+    title: str
+    score: float
+
+    class Config:
+        extra = Extra.forbid
+
+class RankedFiles(BaseModel):
+    category_name: Optional[str] = None
+    uploads: List[RankedFile]
+
+    class Config:
+        extra = Extra.forbid
+
 class File(FileBase):
     id: int
     user_id: int
@@ -60,6 +114,7 @@ class File(FileBase):
 
 class TitleList(BaseModel):
     titles: List[str]
+    next_cursor: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -70,4 +125,129 @@ class FileTitleUpdated(BaseModel):
 
     class Config:
         orm_mode = True
-        extra = Extra.forbid
\ No newline at end of file
+        extra = Extra.forbid
+
+class UploadedFile(BaseModel):
+    upload_id: int
+    upload_type: database.UploadType
+    title: str
+    description: Optional[str] = Field(None)
+    size_in_bytes: int
+    file_hash: str
+    expiration_date: datetime
+    virus_free: bool
+    download_link: Optional[str] = Field(None)
+
+    class Config:
+        extra = Extra.forbid
+
+class ResumableUploadStatus(BaseModel):
+    upload_key: str
+    total_size: int
+    chunk_size: int
+    received_offset: int
+    received_chunks: List[int]
+    expires_at: datetime
+
+    class Config:
+        extra = Extra.forbid
+class FileDetails(BaseModel):
+    upload_id: int
+    title: str
+    description: Optional[str] = Field(None)
+    size_in_bytes: int
+    file_hash: str
+    uploaded_at: datetime
+    expiration_date: datetime
+    virus_free: bool
+    views: int
+    download_count: int
+    max_download_count: Optional[int] = Field(None)
+    like_count: int
+    dislike_count: int
+    comment_count: int
+
+    class Config:
+        extra = Extra.forbid
+
+class BreadcrumbItem(BaseModel):
+    level: str
+    name: str
+
+    class Config:
+        extra = Extra.forbid
+
+class BrowsedFile(BaseModel):
+    file: FileDetails
+    breadcrumb: List[BreadcrumbItem]
+
+    class Config:
+        extra = Extra.forbid
+
+class Reactions(BaseModel):
+    upload_id: int
+    reaction: Optional[database.Reaction] = None
+    like_count: int
+    dislike_count: int
+
+    class Config:
+        extra = Extra.forbid
+
+class Comment(BaseModel):
+    comment_id: int
+    user_id: int
+    content: str
+    created_at: datetime
+
+    class Config:
+        extra = Extra.forbid
+
+class CommentList(BaseModel):
+    comments: List[Comment]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        extra = Extra.forbid
+
+class FileStats(BaseModel):
+    upload_id: int
+    upload_type: database.UploadType
+    views: int
+    download_count: int
+
+    class Config:
+        extra = Extra.forbid
+
+class PoolMetrics(BaseModel):
+    pool: str
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    checkout_timeouts: int
+    slow_checkouts: int
+    checkout_wait_ms_sum: float
+    checkout_wait_ms_buckets: Dict[str, int]
+    connections_opened: int
+    connections_closed: int
+    connections_invalidated: int
+
+    class Config:
+        extra = Extra.forbid
+
+class SweepMetrics(BaseModel):
+    runs: int
+    paused_runs: int
+    batches: int
+    failed_batches: int
+    removed_uploads: Dict[str, int]
+    released_blobs: int
+    backlog: Dict[str, Optional[int]]
+    last_run_at: Optional[datetime] = None
+    last_run_seconds: Optional[float] = None
+    last_run_removed: int
+    last_run_uploads_per_second: float
+
+    class Config:
+        extra = Extra.forbid
@@ -0,0 +1,75 @@
+from app.services import async_user_service as user_service, async_category_service as category_service
+from app.config.db_connection import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Header, Query, Request
+from app.services.pagination_service import PAGE_SIZE, MAX_PAGE_SIZE
+import app.models.responses as responseModel
+import app.models.requests as requestModel
+
+#Variants of user and category endpoints running on the asyncio engine. Requests waiting on the database stay on the
+#event loop instead of holding a threadpool worker, so slow queries do not exhaust the threadpool
+router = APIRouter(prefix="/async")
+
+
+@router.post("/user", response_model=responseModel.User, status_code=201,
+        summary="Create a new user (async)", 
+        description="Asynchronous variant of POST /user. This endpoint allows you to create a new user by providing a username, email, password and role(optional). If the username or email is already in use, a 409 error is returned.",
+        tags=["User Management"])
+async def create_user(user: requestModel.UserCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await user_service.create_user(db=db, request=request, user=user)
+
+
+@router.get("/user/{username}", response_model=responseModel.User,
+        summary="Retrieve user information (async)", 
+        description="Asynchronous variant of GET /user/{username}. Results include user username, email, account creation date. If the user does not exist, a 404 error is returned.",
+        tags=["User Management"])
+async def read_user(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await user_service.get_user_account_data(db=db, username=username)
+
+
+@router.patch("/user/{username}", response_model=responseModel.User, status_code=200, 
+        summary="Update user password or email (async)", 
+        description="Asynchronous variant of PATCH /user/{username}. Update the password or email address of a user by providing the username, email, new_email(optional), old password, and new password(optional). If the user is not found, a 404 error is returned.",
+        tags=["User Management"])
+async def update_user_credentials(username: str, data: requestModel.UserUpdatePassword, db: AsyncSession = Depends(get_async_db)):
+    return await user_service.update_user(db=db, username=username, data=data)
+
+
+@router.delete("/users/{username}", status_code=204, 
+        summary="Delete a user (async)", 
+        description="Asynchronous variant of DELETE /users/{username}. Delete a user from the database using their username, email, and password. If the user does not exist, a 404 error is returned.",
+        tags=["User Management"])
+async def delete_user(username: str, db: AsyncSession = Depends(get_async_db), data: requestModel.UserDelete = None):
+    return await user_service.remove_user(db=db, username=username, data=data)
+
+
+@router.post("/admin/categories/", response_model=responseModel.NewCategory, status_code=201,
+        summary="Create a new category (async)", 
+        description="Asynchronous variant of POST /admin/categories/. Create a new category by providing a name and an optional description, a 409 error is returned if the category already exists.",
+        tags=["Category Management"])
+async def create_category(category: requestModel.CategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    return await category_service.create_category(db=db, category=category)
+
+
+@router.get("/categories/", response_model=responseModel.CategoryList, status_code=200,
+        summary="List categories (async)", 
+        description="Asynchronous variant of GET /categories/. Returns one page of categories ordered by name, with an ETag honoured by If-None-Match.",
+        tags=["Category Management"])
+async def list_categories(cursor: str = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), if_none_match: str = Header(None, alias="If-None-Match"), db: AsyncSession = Depends(get_async_db)):
+    return await category_service.get_categories(db=db, cursor=cursor, limit=limit, if_none_match=if_none_match)
+
+
+@router.get("/categories/{category_name}", response_model=responseModel.SubCategories, status_code=200,
+        summary="Retrieve all specific category sub-categories (async)", 
+        description="Asynchronous variant of GET /categories/{category_name}. If the category is not found, a 404 error is returned.",
+        tags=["Category Management"])
+async def read_category(category_name: str, if_none_match: str = Header(None, alias="If-None-Match"), db: AsyncSession = Depends(get_async_db)):
+    return await category_service.get_category_with_subcategories(db=db, category_name=category_name, if_none_match=if_none_match)
+
+
+@router.patch("/admin/categories/{category_name}", response_model=responseModel.NewCategory,
+        summary="Update category name or description (async)", 
+        description="Asynchronous variant of PATCH /admin/categories/{category_name}. Update the name or description of an existing category.",
+        tags=["Category Management"])
+async def update_category(category_name: str, category_update: requestModel.CategoryUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await category_service.update_category(db=db, category_name=category_name, data=category_update)
@@ -0,0 +1,128 @@
+from app.crud import async_shared_crud as shared_crud, async_category_crud as category_crud
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.validators import category_validator, shared_validator, validation_engine
+import app.models.requests as requestModel
+from app.cache.category_tree_cache import category_tree_cache, build_category_tree
+from app.services import pagination_service, etag_service
+from app.models.json_responses import EncodedJSONResponse, encode_page
+from app.config.logger import logger
+from fastapi import HTTPException
+import bisect
+
+
+#Category tree from the worker cache, loaded with a single query on a miss. Cache hits do not touch the database session,
+#so no pooled connection is checked out
+async def get_category_tree(db: AsyncSession):
+    tree = category_tree_cache.get()
+    if tree is None:
+        generation = category_tree_cache.generation
+        tree = build_category_tree(await category_crud.get_category_tree(db=db))
+        category_tree_cache.install(tree, generation)
+    return tree
+
+
+#Create new category - validate inputs, check for existing category and create a new category object with fields: category_name and description
+async def create_category(db: AsyncSession, category: requestModel.CategoryCreate):
+    try:
+        logger.info("\nCREATING CATEGORY") 
+        validation_engine.validate_model(category, category_validator.CATEGORY_CREATE_RULES)
+
+        db_category = await category_crud.create_category(db=db, category=category)
+        if db_category is None:
+            logger.warning("\nCATEGORY CANNOT BE CREATED AS THERE IS AN EXISTING CATEGORY WITH THE SAME NAME")
+            raise HTTPException(status_code=409, detail="Category already exists")
+        
+        ###Add check based on if user has jwt and if jwt role is admin, then create new category###
+
+        await category_crud.notify_category_change(db=db)
+        await shared_crud.commit(db=db)
+        category_tree_cache.invalidate()
+
+        logger.info("\nCATEGORY HAS BEEN CREATED")
+
+        return db_category
+    except Exception as ex:
+        logger.error(f"\nCATEGORY HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        await shared_crud.rollback(db=db)
+        raise
+
+
+#Parse one page of category objects ordered by name, starting after the category stored in cursor. The page is joined from
+#category objects encoded when the tree was cached. A page the client already has is answered with 304 from the cached tree
+async def get_categories(db: AsyncSession, cursor: str, limit: int, if_none_match: str = None):
+    try:
+        logger.info("\nPARSING PAGE OF CATEGORIES")
+        after = pagination_service.decode_cursor(cursor, str)
+        tree = (await get_category_tree(db=db))
+
+        etag = etag_service.make_etag(tree.version, cursor, limit)
+        if etag_service.etag_matches(if_none_match, etag):
+            logger.info("\nCATEGORIES NOT MODIFIED")
+            return etag_service.not_modified(etag, etag_service.CATEGORY_CACHE_CONTROL)
+
+        start = 0 if after is None else bisect.bisect_right(tree.names, after[0])
+        names, next_cursor = pagination_service.build_page(tree.names[start:start + limit + 1], limit, lambda name: (name,))
+
+        logger.info("\nCATEGORIES PARSED SUCCESSFULLY")
+        body = encode_page("categories", tree.categories[start:start + len(names)], next_cursor)
+        return EncodedJSONResponse(body, headers=etag_service.cache_headers(etag, etag_service.CATEGORY_CACHE_CONTROL))
+    except Exception as ex:
+        logger.error(f"\nCATEGORIES HAVE NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Parse category name with sub-categories, the response and its entity tag are computed when the tree is cached
+async def get_category_with_subcategories(db: AsyncSession, category_name: str, if_none_match: str = None):
+    try:
+        logger.info("\nPARSING SPECIFIC CATEGORY WITH ALL SUB-CATEGORIES")
+        category_validator.validate_category_name(category_name=category_name)
+
+        tree = await get_category_tree(db=db)
+        category = tree.by_name.get(category_name)
+
+        if category is None:
+            logger.warning(f"\nCANNOT PARSE SPECIFIC CATEGORY OBJECT - CATEGORY WITH NAME: {category_name} NOT FOUND")
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        etag = tree.etags[category_name]
+        if etag_service.etag_matches(if_none_match, etag):
+            logger.info("\nSUB-CATEGORIES NOT MODIFIED")
+            return etag_service.not_modified(etag, etag_service.CATEGORY_CACHE_CONTROL)
+
+        logger.info("\nSUB-CATEGORIES PARSED SUCCESSFULLY")
+    
+        return EncodedJSONResponse(category, headers=etag_service.cache_headers(etag, etag_service.CATEGORY_CACHE_CONTROL))
+    except Exception as ex:
+        logger.error(f"\nCATEGORY HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Update category name or description
+async def update_category(db: AsyncSession, category_name: str, data: requestModel.CategoryUpdate):
+    try:
+        logger.info("\nUPDATING CATEGORY ACCOUNT DATA")
+
+        if data.new_name is None and data.new_description is None:
+            logger.warning("\nCANNOT UPDATE CATEGORY DATA - NO new_name OR new_description PROVIDED")
+            raise shared_validator.ValidationException("No new_name or new_description provided")
+
+        validation_engine.validate_model(data, category_validator.CATEGORY_UPDATE_RULES, category_name=category_name)
+
+        ###Add check based on if user has jwt and if jwt role is admin, then change category data###
+
+        updated_category = await category_crud.update_category(db=db, category_name=category_name, new_name=data.new_name, new_description=data.new_description)
+        if updated_category is None:
+            logger.warning(f"\nCANNOT UPDATE CATEGORY DATA - CATEGORY WITH NAME: {category_name} NOT FOUND")
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        await category_crud.notify_category_change(db=db)
+        await shared_crud.commit(db)
+        category_tree_cache.invalidate()
+
+        logger.info("\nSUCCESFULLY UPDATED CATEGORY DATA")
+        
+        return updated_category
+    except Exception as ex:
+        logger.error(f"\nCATEGORY DATE HAS NOT BEEN CHANGED, EXCEPTION OCCURED: {ex}")
+        await shared_crud.rollback(db)
+        raise
\ No newline at end of file
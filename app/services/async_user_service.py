@@ -0,0 +1,145 @@
+from app.validators import shared_validator, user_session_validator, user_validator, validation_engine
+from app.crud import async_user_crud as user_crud, async_shared_crud as shared_crud, async_user_session_crud as session_crud
+from sqlalchemy.ext.asyncio import AsyncSession
+import app.models.requests as requestModel
+from app.services.session_service import publish_revocations
+from app.models.json_responses import FastJSONResponse
+from app.config.logger import logger
+from fastapi import HTTPException
+from fastapi import Request
+from app import auth
+
+
+#Check if provided email and password belong to the user, db_user is a get_credentials row. Callers release their
+#connection first, verification takes a while
+async def credentials_match(db_user, email: str, password: str) -> bool:
+    return db_user.email == email and await auth.async_verify_password(password, db_user.password_hash)
+
+
+#Create a new user - validate inputs, roles, jwt access token, hash the password and save freshly created user
+async def create_user(db: AsyncSession, request: Request, user: requestModel.UserCreate):
+    try:
+        logger.info("\nCREATING USER ACCOUNT")
+        validation_engine.validate_model(user, user_validator.USER_CREATE_RULES)
+        
+        if user.role:
+            logger.info(f"USER PROVIDED ROLE: {user.role.value}") 
+        else:
+            logger.info("GOT EMPTY USER ROLE, PROCEEDING FURTHER") 
+
+        #Check role if user.role.value == databaseModel.UserRole.admin.value:
+        #Add admin validation check here in the future
+
+        user_session_validator.validate_ip(request.client.host)
+
+        password_hash = await auth.async_hash_password(user.password)
+
+        db_user = await user_crud.create(db=db, user=user, password_hash=password_hash)
+        if db_user is None:
+            logger.warning("\nUSER ACCOUNT CANNOT BE CREATED AS THERE IS AN EXISTING USER WITH THE SAME USERNAME OR EMAIL") 
+            raise HTTPException(status_code=409, detail="Username or email already in use")
+
+        await session_crud.create(db=db, user_id=db_user.user_id, user_ip=request.client.host)
+        logger.info("\nUSER ACCOUNT HAS BEEN CREATED")
+    
+        await shared_crud.commit(db)
+        
+        return db_user
+    except Exception as ex:
+        logger.error(f"\nUSER ACCOUNT HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        await shared_crud.rollback(db)
+        raise
+
+
+#Parse user account specific data - email and account creation date. Method requires user username to parse account data.
+#The identity comes from our own database, so it is encoded directly instead of through the User response model
+async def get_user_account_data(db: AsyncSession, username: str):
+    try:
+        logger.info("\nGETTING USER ACCOUNT DATA") 
+        shared_validator.validate_sql_malicious_input(username)
+
+        db_user = await user_crud.get_by_username_email_id(db=db, username=username)
+        if db_user is None:
+            logger.warning(f"\nCANNOT GET USER ACCOUNT DATA - USER: {username} HAS NOT BEEN FOUND") 
+            raise HTTPException(status_code=404, detail="User not found")
+    
+        logger.info("\nUSER ACCOUNT DATA HAS BEEN PARSED") 
+        return FastJSONResponse({"username": db_user.username, "created_at": db_user.created_at, "email": db_user.email})
+    except Exception as ex:
+        logger.error(f"USER: {username} DATA CANNOT BE PARSED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Update user account data - email or password by given username, current email, password, optional values: new_email and new_password (one of them is required) 
+async def update_user(db: AsyncSession, username: str, data: requestModel.UserUpdatePassword):
+    try:
+        logger.info("\nUPDATING USER ACCOUNT DATA")
+
+        if data.new_email is None and data.new_password is None:
+            logger.warning("CANNOT UPDATE USER ACCOUNT DATA - NO new_email OR new_password PROVIDED")
+            raise shared_validator.ValidationException("No new_email or new_password provided")
+
+        validation_engine.validate_model(data, user_validator.USER_UPDATE_RULES, username=username)
+
+        if data.password == data.new_password:
+            logger.warning("CANNOT UPDATE USER ACCOUNT DATA - PROVIDED new_password IS THE SAME AS PROVIDED password")
+            raise shared_validator.ValidationException("Old and new passwords must be different")
+        elif data.email == data.new_email:
+            logger.warning("CANNOT UPDATE USER ACCOUNT DATA - PROVIDED new_email IS THE SAME AS PROVIDED email")
+            raise shared_validator.ValidationException("Old and new email addresses must be different")
+
+        db_user = await user_crud.get_credentials(db=db, username=username)
+        await shared_crud.release_connection(db)
+        if db_user is None or not await credentials_match(db_user=db_user, email=data.email, password=data.password):
+            logger.warning("CANNOT UPDATE USER ACCOUNT DATA - USER WITH PROVIDED CREDENTIALS NOT FOUND")
+            raise HTTPException(status_code=404, detail="User not found")
+
+        #Only the user whose password hash is still the verified one is changed
+        new_password_hash = await auth.async_hash_password(data.new_password) if data.new_password is not None else None
+        db_user = await user_crud.update(db=db, username=username, email=data.email, password_hash=db_user.password_hash, new_password=new_password_hash, new_email=data.new_email)
+
+        if db_user is None:
+            logger.warning("CANNOT UPDATE USER ACCOUNT DATA - USER WITH PROVIDED CREDENTIALS NOT FOUND")
+            raise HTTPException(status_code=404, detail="User not found")
+
+        #Tokens issued with the old password stop being accepted
+        session_ids = await session_crud.revoke(db=db, revoked_until=auth.revocation_expiration(), user_id=db_user.user_id) if new_password_hash is not None else []
+
+        await shared_crud.commit(db)
+        publish_revocations(session_ids)
+
+        logger.info("SUCCESFULLY UPDATED USER ACCOUNT DATA")
+        
+        return db_user
+    except Exception as ex:
+        logger.error(f"\nUSER ACCOUNT HAS NOT BEEN CHANGED, EXCEPTION OCCURED: {ex}")
+        await shared_crud.rollback(db)
+        raise
+
+
+#Remove user by finding exact user with provided credentials - username, email and password
+async def remove_user(db: AsyncSession, username: str, data: requestModel.UserDelete):
+    try:
+        logger.info("\nREMOVING USER ACCOUNT")
+        validation_engine.validate_model(data, user_validator.USER_DELETE_RULES, username=username)
+    
+        db_user = await user_crud.get_credentials(db=db, username=username)
+        await shared_crud.release_connection(db)
+        if db_user is not None and not await credentials_match(db_user=db_user, email=data.email, password=data.password):
+            db_user = None
+
+        if db_user is None:
+            logger.warning("CANNOT REMOVE USER ACCOUNT - USER WITH PROVIDED CREDENTIALS NOT FOUND")
+            raise HTTPException(status_code=404, detail="User not found")
+
+        #Verify user JWT token
+        session_ids = await session_crud.revoke(db=db, revoked_until=auth.revocation_expiration(), user_id=db_user.user_id)
+        await user_crud.delete(db=db, user_id=db_user.user_id)
+        await shared_crud.commit(db)
+        publish_revocations(session_ids)
+        logger.info("\nUSER ACCOUNT REMOVED")
+
+    except Exception as ex:
+        logger.error(f"\nUSER ACCOUNT HAS NOT BEEN REMOVED, EXCEPTION OCCURED: {ex}")
+        await shared_crud.rollback(db)
+        raise
\ No newline at end of file
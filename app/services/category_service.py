@@ -1,76 +1,99 @@
 from app.crud import shared_crud, category_crud, sub_category_crud
-from app.validators import category_validator, shared_validator
+from app.validators import category_validator, shared_validator, validation_engine
 import app.models.requests as requestModel
+from app.cache.category_tree_cache import category_tree_cache, build_category_tree
+from app.services import pagination_service, etag_service
+from app.models.json_responses import EncodedJSONResponse, encode_page
 from app.config.logger import logger
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+import bisect
+
+
+#Category tree from the worker cache, loaded with a single query on a miss. Cache hits do not touch the database session,
+#so no pooled connection is checked out
+def get_category_tree(db: Session):
+    tree = category_tree_cache.get()
+    if tree is None:
+        generation = category_tree_cache.generation
+        tree = build_category_tree(category_crud.get_category_tree(db=db))
+        category_tree_cache.install(tree, generation)
+    return tree
 
 
 #Create new category - validate inputs, check for existing category and create a new category object with fields: category_name and description
 def create_category(db: Session, category: requestModel.CategoryCreate):
     try:
         logger.info("\nCREATING CATEGORY") 
-        category_validator.validate_category_name(category_name=category.name)
-
-        if category.description:
-            category_validator.validate_category_description(description=category.description)
+        validation_engine.validate_model(category, category_validator.CATEGORY_CREATE_RULES)
 
-        existing_category = category_crud.get_category_by_name(db=db, name=category.name)
-        if existing_category:
+        db_category = category_crud.create_category(db=db, category=category)
+        if db_category is None:
+            logger.warning("\nCATEGORY CANNOT BE CREATED AS THERE IS AN EXISTING CATEGORY WITH THE SAME NAME")
             raise HTTPException(status_code=409, detail="Category already exists")
-
-        category = category_crud.create_category(db=db, category=category)
-
-        shared_crud.flush(db=db)
         
         ###Add check based on if user has jwt and if jwt role is admin, then create new category###
 
+        category_crud.notify_category_change(db=db)
         shared_crud.commit(db=db)
+        category_tree_cache.invalidate()
 
         logger.info("\nCATEGORY HAS BEEN CREATED")
 
-        return category
+        return db_category
     except Exception as ex:
-        logger.exception(f"\nCATEGORY HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        logger.error(f"\nCATEGORY HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
         shared_crud.rollback(db=db)
         raise
 
 
-#Parse all category objects
-def get_categories(db: Session):
+#Parse one page of category objects ordered by name, starting after the category stored in cursor. The page is joined from
+#category objects encoded when the tree was cached. A page the client already has is answered with 304 from the cached tree
+def get_categories(db: Session, cursor: str, limit: int, if_none_match: str = None):
     try:
-        logger.info("\nPARSING ALL CATEGORIES")
-        categories = category_crud.get_all_categories(db=db)
+        logger.info("\nPARSING PAGE OF CATEGORIES")
+        after = pagination_service.decode_cursor(cursor, str)
+        tree = get_category_tree(db=db)
+
+        etag = etag_service.make_etag(tree.version, cursor, limit)
+        if etag_service.etag_matches(if_none_match, etag):
+            logger.info("\nCATEGORIES NOT MODIFIED")
+            return etag_service.not_modified(etag, etag_service.CATEGORY_CACHE_CONTROL)
+
+        start = 0 if after is None else bisect.bisect_right(tree.names, after[0])
+        names, next_cursor = pagination_service.build_page(tree.names[start:start + limit + 1], limit, lambda name: (name,))
 
         logger.info("\nCATEGORIES PARSED SUCCESSFULLY")
-        return categories
+        body = encode_page("categories", tree.categories[start:start + len(names)], next_cursor)
+        return EncodedJSONResponse(body, headers=etag_service.cache_headers(etag, etag_service.CATEGORY_CACHE_CONTROL))
     except Exception as ex:
-        logger.exception(f"\nCATEGORIES HAVE NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
+        logger.error(f"\nCATEGORIES HAVE NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
         raise
 
 
-#Parse category name with sub-categories
-def get_category_with_subcategories(db: Session, category_name: str):
+#Parse category name with sub-categories, the response and its entity tag are computed when the tree is cached
+def get_category_with_subcategories(db: Session, category_name: str, if_none_match: str = None):
     try:
         logger.info("\nPARSING SPECIFIC CATEGORY WITH ALL SUB-CATEGORIES")
         category_validator.validate_category_name(category_name=category_name)
 
-        db_category = category_crud.get_category_by_name(db=db, name=category_name)
+        tree = get_category_tree(db=db)
+        category = tree.by_name.get(category_name)
 
-        if db_category is None:
+        if category is None:
             logger.warning(f"\nCANNOT PARSE SPECIFIC CATEGORY OBJECT - CATEGORY WITH NAME: {category_name} NOT FOUND")
             raise HTTPException(status_code=404, detail="Category not found")
 
-        sub_categories_list = sub_category_crud.get_sub_categories_by_category_id(db=db, category_id=db_category.category_id)
+        etag = tree.etags[category_name]
+        if etag_service.etag_matches(if_none_match, etag):
+            logger.info("\nSUB-CATEGORIES NOT MODIFIED")
+            return etag_service.not_modified(etag, etag_service.CATEGORY_CACHE_CONTROL)
 
         logger.info("\nSUB-CATEGORIES PARSED SUCCESSFULLY")
     
-        return {
-            "category_name": db_category.name,
-            "sub_categories": sub_categories_list
-        }
+        return EncodedJSONResponse(category, headers=etag_service.cache_headers(etag, etag_service.CATEGORY_CACHE_CONTROL))
     except Exception as ex:
-        logger.exception(f"\nCATEGORY HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        logger.error(f"\nCATEGORY HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
         raise
 
 
@@ -79,40 +102,57 @@ def update_category(db: Session, category_name: str, data: requestModel.Category
     try:
         logger.info("\nUPDATING CATEGORY ACCOUNT DATA")
 
-        if data.new_name is None and data.new_description is None:
-            raise shared_validator.ValidationException("No new_name or new_description provided")
-
         if data.new_name is None and data.new_description is None:
             logger.warning("\nCANNOT UPDATE CATEGORY DATA - NO new_name OR new_description PROVIDED")
             raise shared_validator.ValidationException("No new_name or new_description provided")
 
-        category_validator.validate_category_name(category_name)
-        existing_category = category_crud.get_category_by_name(db=db, name=category_name)
-
-        if not existing_category:
-            logger.warning(f"\nCANNOT UPDATE CATEGORY DATA - CATEGORY WITH NAME: {category_name} NOT FOUND")
-            raise HTTPException(status_code=404, detail="Category not found")
-
-        if data.new_name:
-            category_validator.validate_category_name(data.new_name)
-            existing_new_category = category_crud.get_category_by_name(db=db, name=data.new_name)
-            if existing_new_category and data.new_name != category_name:
-                logger.warning("\nCANNOT UPDATE CATEGORY NAME - CATEGORY WITH PROVIDED new_name ALREADY EXISTS")
-                raise shared_validator.ValidationException("Category with provided new_name aready exists")
-
-        if data.new_description:
-            category_validator.validate_category_description(data.new_description)
+        validation_engine.validate_model(data, category_validator.CATEGORY_UPDATE_RULES, category_name=category_name)
 
         ###Add check based on if user has jwt and if jwt role is admin, then change category data###
 
         updated_category = category_crud.update_category(db=db, category_name=category_name, new_name=data.new_name, new_description=data.new_description)
+        if updated_category is None:
+            logger.warning(f"\nCANNOT UPDATE CATEGORY DATA - CATEGORY WITH NAME: {category_name} NOT FOUND")
+            raise HTTPException(status_code=404, detail="Category not found")
 
+        category_crud.notify_category_change(db=db)
         shared_crud.commit(db)
+        category_tree_cache.invalidate()
 
         logger.info("\nSUCCESFULLY UPDATED CATEGORY DATA")
         
         return updated_category
     except Exception as ex:
-        logger.exception(f"\nCATEGORY DATE HAS NOT BEEN CHANGED, EXCEPTION OCCURED: {ex}")
+        logger.error(f"\nCATEGORY DATE HAS NOT BEEN CHANGED, EXCEPTION OCCURED: {ex}")
         shared_crud.rollback(db)
-        raise
\ No newline at end of file
+        raise
+
+
+#Remove category by name, categories which still have sub-categories cannot be removed
+def delete_category(db: Session, category_name: str):
+    try:
+        logger.info("\nREMOVING CATEGORY")
+        category_validator.validate_category_name(category_name)
+
+        db_category = category_crud.get_category_by_name(db=db, name=category_name)
+        if db_category is None:
+            logger.warning(f"\nCANNOT REMOVE CATEGORY - CATEGORY WITH NAME: {category_name} NOT FOUND")
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        if sub_category_crud.get_sub_categories_by_category_id(db=db, category_id=db_category.category_id):
+            logger.warning(f"\nCANNOT REMOVE CATEGORY - CATEGORY WITH NAME: {category_name} HAS SUB-CATEGORIES")
+            raise HTTPException(status_code=409, detail="Category has sub-categories")
+
+        ###Add check based on if user has jwt and if jwt role is admin, then delete category###
+
+        category_crud.delete_category_by_name(db=db, category_name=category_name)
+
+        category_crud.notify_category_change(db=db)
+        shared_crud.commit(db)
+        category_tree_cache.invalidate()
+
+        logger.info("\nCATEGORY REMOVED")
+    except Exception as ex:
+        logger.error(f"\nCATEGORY HAS NOT BEEN REMOVED, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        raise
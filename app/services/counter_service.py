@@ -0,0 +1,177 @@
+from app.config.db_connection import SessionLocal
+from app.crud import download_crud, shared_crud
+import app.models.database as db_models
+from app.config.logger import logger
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from datetime import datetime
+import threading
+import os
+
+#Pending counters are written at least this often, which bounds the amount of counts lost on a crash
+COUNTER_FLUSH_INTERVAL_SECONDS = float(os.getenv("STREAMABIT_COUNTER_FLUSH_INTERVAL_SECONDS", 5))
+
+#Number of pending events which triggers an early flush
+COUNTER_FLUSH_THRESHOLD = int(os.getenv("STREAMABIT_COUNTER_FLUSH_THRESHOLD", 1000))
+
+#Upper bound of events kept in memory while the database is unavailable, oldest download entries are dropped beyond it
+MAX_PENDING_EVENTS = 50 * COUNTER_FLUSH_THRESHOLD
+
+
+def new_delta():
+    return {"views": 0, "download_count": 0}
+
+
+#Skip queued downloads of uploads removed before the flush, their rows would violate file_download foreign keys
+def drop_removed_upload_downloads(db: Session, downloads: list) -> list:
+    kept_downloads = downloads
+
+    for upload_type, key in ((db_models.UploadType.public, "fk_public_upload_id"), (db_models.UploadType.private, "fk_private_upload_id")):
+        upload_ids = {download[key] for download in kept_downloads if download[key] is not None}
+        if not upload_ids:
+            continue
+
+        existing_ids = download_crud.get_existing_upload_ids(db=db, upload_type=upload_type, upload_ids=upload_ids)
+        kept_downloads = [download for download in kept_downloads if download[key] is None or download[key] in existing_ids]
+
+    return kept_downloads
+
+
+#In-process write-behind buffer for views, download_count and file_download rows. Request handlers only touch memory,
+#a background thread writes accumulated deltas as one batched UPDATE per upload table plus one multi-row INSERT
+class CounterAccumulator:
+    def __init__(self, flush_interval: float, flush_threshold: int, max_pending_events: int):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_pending_events = max_pending_events
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pending_events = 0
+        self._deltas = {upload_type: defaultdict(new_delta) for upload_type in db_models.UploadType}
+        self._downloads = []
+        self._in_flight = {upload_type: {} for upload_type in db_models.UploadType}
+
+    def _add_event(self):
+        self._pending_events += 1
+        if self._pending_events >= self.flush_threshold:
+            self._flush_requested.set()
+
+    def record_view(self, upload_type: db_models.UploadType, upload_id: int):
+        with self._lock:
+            self._deltas[upload_type][upload_id]["views"] += 1
+            self._add_event()
+
+    #Queue file_download row, successful downloads also increase download_count
+    def record_download(self, upload_type: db_models.UploadType, upload_id: int, ip_address: str, successful: bool):
+        download = {
+            "download_date": datetime.utcnow(),
+            "successful": successful,
+            "ip_address": ip_address,
+            "fk_public_upload_id": upload_id if upload_type == db_models.UploadType.public else None,
+            "fk_private_upload_id": upload_id if upload_type == db_models.UploadType.private else None
+        }
+
+        with self._lock:
+            self._downloads.append(download)
+            if successful:
+                self._deltas[upload_type][upload_id]["download_count"] += 1
+            self._add_event()
+
+    #Counter deltas of the upload which are not yet written to the database, including a flush in progress
+    def get_pending(self, upload_type: db_models.UploadType, upload_id: int) -> dict:
+        with self._lock:
+            pending = new_delta()
+            for deltas in (self._deltas[upload_type], self._in_flight[upload_type]):
+                delta = deltas.get(upload_id)
+                if delta:
+                    pending["views"] += delta["views"]
+                    pending["download_count"] += delta["download_count"]
+            return pending
+
+    def _take_pending(self):
+        with self._lock:
+            deltas, downloads = self._deltas, self._downloads
+            self._deltas = {upload_type: defaultdict(new_delta) for upload_type in db_models.UploadType}
+            self._downloads = []
+            self._pending_events = 0
+            self._in_flight = {upload_type: dict(deltas[upload_type]) for upload_type in db_models.UploadType}
+            return deltas, downloads
+
+    #Put back events of a failed flush so they are retried, keeping memory bounded while the database is down
+    def _restore_pending(self, deltas: dict, downloads: list):
+        with self._lock:
+            for upload_type, upload_deltas in deltas.items():
+                for upload_id, delta in upload_deltas.items():
+                    pending = self._deltas[upload_type][upload_id]
+                    pending["views"] += delta["views"]
+                    pending["download_count"] += delta["download_count"]
+
+            self._downloads = downloads + self._downloads
+            overflow = len(self._downloads) - self.max_pending_events
+            if overflow > 0:
+                logger.error(f"Dropping {overflow} pending file download entries, database writes keep failing")
+                del self._downloads[:overflow]
+
+            self._pending_events += len(downloads)
+            self._in_flight = {upload_type: {} for upload_type in db_models.UploadType}
+
+    #Write all pending events in one transaction
+    def flush(self):
+        with self._flush_lock:
+            deltas, downloads = self._take_pending()
+            if not downloads and not any(deltas.values()):
+                return
+
+            db = SessionLocal()
+            try:
+                for upload_type, upload_deltas in deltas.items():
+                    if upload_deltas:
+                        download_crud.add_counter_deltas(db=db, upload_type=upload_type, deltas=upload_deltas)
+
+                downloads = drop_removed_upload_downloads(db=db, downloads=downloads)
+                if downloads:
+                    download_crud.create_many(db=db, downloads=downloads)
+
+                shared_crud.commit(db)
+                logger.info(f"Flushed counters of {sum(len(d) for d in deltas.values())} uploads and {len(downloads)} file downloads")
+            except Exception as ex:
+                logger.exception(f"Counter flush failed, events will be retried: {ex}")
+                shared_crud.rollback(db)
+                self._restore_pending(deltas, downloads)
+                return
+            finally:
+                db.close()
+
+            with self._lock:
+                self._in_flight = {upload_type: {} for upload_type in db_models.UploadType}
+
+    def _run(self):
+        while not self._stopping:
+            self._flush_requested.wait(timeout=self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+            self._thread.start()
+
+    #Stop flush thread and write everything that is still pending
+    def stop(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._flush_requested.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+counters = CounterAccumulator(
+    flush_interval=COUNTER_FLUSH_INTERVAL_SECONDS,
+    flush_threshold=COUNTER_FLUSH_THRESHOLD,
+    max_pending_events=MAX_PENDING_EVENTS
+)
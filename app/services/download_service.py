@@ -0,0 +1,115 @@
+from app.storage.file_response import RangeFileResponse
+from app.services import counter_service, trending_service
+from app.crud import file_crud, shared_crud
+import app.models.database as db_models
+from app.storage import blob_store
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException, Request
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from datetime import datetime
+from app import auth
+
+
+#Queue a download attempt for the write-behind counter flush, called after the response is sent so the transfer is never
+#blocked. Only successful full downloads or downloads starting at the first byte increase download_count, so parallel
+#segment downloads of one file are counted once
+def record_download(upload_type: db_models.UploadType, upload_id: int, ip_address: str, successful: bool):
+    counter_service.counters.record_download(upload_type=upload_type, upload_id=upload_id, ip_address=ip_address, successful=successful)
+    if successful and upload_type == db_models.UploadType.public:
+        trending_service.record_download(upload_id)
+
+
+def get_download_recorder(upload_type: db_models.UploadType, upload_id: int, ip_address: str):
+    async def on_complete(successful: bool, start: int):
+        if successful and start != 0:
+            return
+        record_download(upload_type, upload_id, ip_address, successful)
+
+    return on_complete
+
+
+#Check if upload can still be downloaded - it has not expired and its download limit is not reached
+def check_download_availability(db_upload, upload_type: db_models.UploadType, upload_id: int, ip_address: str):
+    if db_upload.expiration_date is not None and db_upload.expiration_date < datetime.utcnow():
+        logger.warning(f"\nCANNOT DOWNLOAD FILE - {upload_type.value.upper()} UPLOAD WITH ID: {upload_id} HAS EXPIRED")
+        record_download(upload_type, upload_id, ip_address, successful=False)
+        raise HTTPException(status_code=410, detail="File has expired")
+
+    pending = counter_service.counters.get_pending(upload_type=upload_type, upload_id=upload_id)
+    download_count = (db_upload.download_count or 0) + pending["download_count"]
+
+    if db_upload.max_download_count and download_count >= db_upload.max_download_count:
+        logger.warning(f"\nCANNOT DOWNLOAD FILE - {upload_type.value.upper()} UPLOAD WITH ID: {upload_id} REACHED DOWNLOAD LIMIT")
+        record_download(upload_type, upload_id, ip_address, successful=False)
+        raise HTTPException(status_code=410, detail="Download limit reached")
+
+
+def build_file_response(db_upload, upload_type: db_models.UploadType, upload_id: int, request: Request):
+    file_path = blob_store.get_blob_path(db_upload.file_hash)
+
+    response = RangeFileResponse(
+        file_path=file_path,
+        size=db_upload.size_in_bytes,
+        etag=f'"{db_upload.file_hash}"',
+        filename=db_upload.title,
+        request_headers=request.headers,
+        on_complete=get_download_recorder(upload_type, upload_id, request.client.host)
+    )
+    response.headers["x-virus-free"] = "true" if db_upload.virus_free else "false"
+
+    return response
+
+
+#Serve approved public upload bytes, supports single byte ranges for resumable and parallel segment downloads
+def download_public_file(db: Session, request: Request, file_id: int):
+    try:
+        logger.info("\nDOWNLOADING PUBLIC FILE")
+        upload_type = db_models.UploadType.public
+
+        db_upload = file_crud.get_upload(db=db, upload_type=upload_type, upload_id=file_id)
+        if db_upload is None or not db_upload.admin_approved:
+            logger.warning(f"\nCANNOT DOWNLOAD FILE - PUBLIC UPLOAD WITH ID: {file_id} NOT FOUND OR NOT APPROVED")
+            raise HTTPException(status_code=404, detail="File not found")
+
+        check_download_availability(db_upload=db_upload, upload_type=upload_type, upload_id=file_id, ip_address=request.client.host)
+
+        return build_file_response(db_upload=db_upload, upload_type=upload_type, upload_id=file_id, request=request)
+    except Exception as ex:
+        logger.error(f"\nPUBLIC FILE CANNOT BE DOWNLOADED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Private upload by its download link, its connection is returned right away. The loaded upload is all the rest of the
+#request needs, run in a threadpool thread
+def get_private_upload(db: Session, download_link: str):
+    db_upload = file_crud.get_private_upload_by_link(db=db, download_link=download_link)
+    shared_crud.release_connection(db)
+    return db_upload
+
+
+#Serve private upload bytes by its download link, password protected uploads require X-Download-Password header. The
+#password is verified by the password executor without holding a request thread or a connection
+async def download_private_file(db: Session, request: Request, download_link: str, password: str):
+    try:
+        logger.info("\nDOWNLOADING PRIVATE FILE")
+        upload_type = db_models.UploadType.private
+
+        db_upload = await run_in_threadpool(get_private_upload, db=db, download_link=download_link)
+        if db_upload is None:
+            logger.warning("\nCANNOT DOWNLOAD FILE - PRIVATE UPLOAD WITH PROVIDED DOWNLOAD LINK NOT FOUND")
+            raise HTTPException(status_code=404, detail="File not found")
+
+        upload_id = db_upload.private_upload_id
+
+        if db_upload.password_protected and not await auth.async_verify_password(password or "", db_upload.password_hash):
+            logger.warning(f"\nCANNOT DOWNLOAD FILE - INCORRECT PASSWORD FOR PRIVATE UPLOAD WITH ID: {upload_id}")
+            record_download(upload_type, upload_id, request.client.host, successful=False)
+            raise HTTPException(status_code=403, detail="Incorrect file password")
+
+        check_download_availability(db_upload=db_upload, upload_type=upload_type, upload_id=upload_id, ip_address=request.client.host)
+
+        return build_file_response(db_upload=db_upload, upload_type=upload_type, upload_id=upload_id, request=request)
+    except Exception as ex:
+        logger.error(f"\nPRIVATE FILE CANNOT BE DOWNLOADED, EXCEPTION OCCURED: {ex}")
+        raise
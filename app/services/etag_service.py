@@ -0,0 +1,42 @@
+from starlette.responses import Response
+import hashlib
+import os
+
+#Cache-Control of category responses. The tree changes rarely, so clients and the CDN may reuse it for a while
+CATEGORY_CACHE_CONTROL = os.getenv("STREAMABIT_CATEGORY_CACHE_CONTROL", "public, max-age=60")
+
+#Cache-Control of file details. Counters change with every view, so stored copies are revalidated on every use
+FILE_CACHE_CONTROL = os.getenv("STREAMABIT_FILE_CACHE_CONTROL", "public, no-cache")
+
+
+def hash_parts(*parts) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+#Strong entity tag of a representation identified by parts - encoded bodies or plain values of the response. Equal
+#parts give the same tag in every worker
+def make_etag(*parts) -> str:
+    return f'"{hash_parts(*parts)}"'
+
+
+#If-None-Match uses weak comparison, so W/ prefixed tags of a CDN which compressed the response still match
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
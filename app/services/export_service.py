@@ -0,0 +1,111 @@
+from app.config.db_connection import SessionLocal
+from fastapi.responses import StreamingResponse
+from app.crud import file_crud, user_crud
+from app.config.logger import logger
+from datetime import datetime
+from enum import Enum
+import json
+import zlib
+import csv
+import io
+import os
+
+#Rows fetched from the server-side cursor per round trip, every batch becomes one chunk of the response body
+EXPORT_BATCH_SIZE = int(os.getenv("STREAMABIT_EXPORT_BATCH_SIZE", 1000))
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv"
+}
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_ndjson(columns: list, rows: list) -> str:
+    return "".join(json.dumps(dict(zip(columns, map(export_value, row))), separators=(",", ":")) + "\n" for row in rows)
+
+
+def encode_csv(rows: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows([export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+#Response body generator. Starlette sends every chunk before asking for the next one, so the next batch is only fetched
+#from the cursor once the client has taken the previous one and memory stays bounded by one batch. The session belongs
+#to the stream and is closed when the body is finished or the client goes away
+def generate_export(db, partitions, columns: list, format: ExportFormat, compress: bool):
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    exported_rows = 0
+
+    def frame(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    try:
+        if format == ExportFormat.csv:
+            yield frame(encode_csv([columns]))
+
+        for rows in partitions:
+            chunk = frame(encode_ndjson(columns, rows) if format == ExportFormat.ndjson else encode_csv(rows))
+            exported_rows += len(rows)
+            if chunk:
+                yield chunk
+
+        if compressor:
+            yield compressor.flush()
+
+        logger.info(f"Export finished, exported rows: {exported_rows}")
+    except Exception as ex:
+        logger.error(f"Export interrupted after {exported_rows} rows: {ex}")
+        raise
+    finally:
+        db.close()
+
+
+#Start the export query before the response is created, so failures still produce an error status instead of a cut body
+def stream_export(name: str, stream_rows, columns: list, format: ExportFormat, compress: bool):
+    logger.info(f"\nEXPORTING {name.upper()} AS {format.value.upper()}")
+    db = SessionLocal()
+    try:
+        partitions = stream_rows(db=db, batch_size=EXPORT_BATCH_SIZE)
+    except Exception:
+        db.close()
+        raise
+
+    filename = f"{name}.{format.value}"
+    media_type = MEDIA_TYPES[format]
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        generate_export(db=db, partitions=partitions, columns=columns, format=format, compress=compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def export_users(format: ExportFormat, compress: bool):
+    columns = ["user_id", "username", "email", "role", "created_at"]
+    return stream_export(name="users", stream_rows=user_crud.stream_users, columns=columns, format=format, compress=compress)
+
+
+def export_public_uploads(format: ExportFormat, compress: bool):
+    columns = [
+        "upload_id", "title", "description", "size_in_bytes", "file_hash", "uploaded_at", "expiration_date", "admin_approved",
+        "virus_free", "views", "download_count", "max_download_count", "like_count", "dislike_count", "comment_count", "user_id"
+    ]
+    return stream_export(name="files", stream_rows=file_crud.stream_public_uploads, columns=columns, format=format, compress=compress)
@@ -0,0 +1,362 @@
+from app.crud import blob_crud, file_crud, shared_crud, user_crud
+from app.services import counter_service, pagination_service, trending_service, scan_service, etag_service
+from app.validators import file_validator, shared_validator
+from starlette.concurrency import run_in_threadpool
+import app.models.requests as requestModel
+import app.models.database as db_models
+from app.storage import blob_store, upload_stream
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from app.models.json_responses import FastJSONResponse
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from app import auth
+import os
+
+
+#Convert public or private upload object into UploadedFile response fields
+def to_uploaded_file(db_upload):
+    if isinstance(db_upload, db_models.PublicUpload):
+        upload_id = db_upload.public_upload_id
+        upload_type = db_models.UploadType.public
+        download_link = None
+    else:
+        upload_id = db_upload.private_upload_id
+        upload_type = db_models.UploadType.private
+        download_link = db_upload.download_link
+
+    return {
+        "upload_id": upload_id,
+        "upload_type": upload_type,
+        "title": db_upload.title,
+        "description": db_upload.description,
+        "size_in_bytes": db_upload.size_in_bytes,
+        "file_hash": db_upload.file_hash,
+        "expiration_date": db_upload.expiration_date,
+        "virus_free": db_upload.virus_free,
+        "download_link": download_link
+    }
+
+
+#Remove a stored file, used to clean up after a failed upload
+def remove_stored_file(file_path: str):
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+#Check if content with client declared hash is already stored, so the upload body only has to be hashed for verification
+def is_blob_stored(db: Session, file_hash: str) -> bool:
+    try:
+        return blob_crud.exists(db=db, file_hash=file_hash) and blob_store.blob_exists(file_hash)
+    finally:
+        #End the read transaction so no pooled connection is held while the body is streamed
+        shared_crud.commit(db)
+
+
+#Stream multipart request body to storage and register received file as a public or private upload of the user.
+#File bytes are written while they arrive, request body is never held in memory as a whole. When the client declares
+#content hash in X-Content-SHA256 header and such content is already stored, received bytes are hashed but not written
+async def upload_file(db: Session, request: Request, user_id: int):
+    declared_hash = request.headers.get("X-Content-SHA256")
+    store_file = True
+
+    if declared_hash:
+        file_validator.validate_file_hash(declared_hash, field_name="X-Content-SHA256")
+        store_file = not await run_in_threadpool(is_blob_stored, db=db, file_hash=declared_hash)
+
+    fields, received_file = await upload_stream.receive_multipart_upload(request, store_file=store_file)
+
+    if declared_hash and received_file.file_hash != declared_hash:
+        logger.warning("\nFILE UPLOAD REJECTED - RECEIVED FILE HASH DOES NOT MATCH X-Content-SHA256")
+        remove_stored_file(received_file.temp_path)
+        raise HTTPException(status_code=422, detail="Uploaded file hash does not match X-Content-SHA256")
+
+    try:
+        file = requestModel.FileCreate(**fields)
+    except ValidationError as ex:
+        logger.warning(f"\nFILE UPLOAD REJECTED - INVALID FILE METADATA: {ex}")
+        remove_stored_file(received_file.temp_path)
+        raise HTTPException(status_code=422, detail=ex.errors())
+
+    return await run_in_threadpool(create_upload, db=db, user_id=user_id, file=file, received_file=received_file)
+
+
+#Reference received content in the blob store and create an upload entry pointing to it. Content which is already
+#stored is shared between uploads, received copy is dropped. A failed upload removes the received file unless the caller
+#keeps it, a kept file moved into the blob store is moved back. A kept file dropped as a duplicate of stored content is gone
+def create_upload(db: Session, user_id: int, file: requestModel.FileCreate, received_file: upload_stream.ReceivedFile, keep_received_file: bool = False):
+    blob_created = False
+
+    try:
+        logger.info("\nCREATING FILE UPLOAD")
+        shared_validator.validate_sql_malicious_input(file.title, file.description)
+
+        db_user = user_crud.get_by_username_email_id(db=db, user_id=user_id)
+        if db_user is None:
+            logger.warning(f"\nFILE UPLOAD CANNOT BE CREATED - USER WITH ID: {user_id} NOT FOUND")
+            raise HTTPException(status_code=404, detail="User not found")
+
+        blob_crud.acquire(db=db, file_hash=received_file.file_hash, size_in_bytes=received_file.size_in_bytes)
+
+        if received_file.temp_path is None and not blob_store.blob_exists(received_file.file_hash):
+            logger.warning("\nFILE UPLOAD CANNOT BE CREATED - DECLARED CONTENT IS NO LONGER STORED")
+            raise HTTPException(status_code=409, detail="File content is no longer stored, upload it again without X-Content-SHA256")
+
+        blob_created = blob_store.store_blob(temp_path=received_file.temp_path, file_hash=received_file.file_hash)
+
+        upload_params = {
+            "db": db,
+            "user_id": user_id,
+            "file": file,
+            "file_path": blob_store.get_blob_path(received_file.file_hash),
+            "file_hash": received_file.file_hash,
+            "size_in_bytes": received_file.size_in_bytes
+        }
+
+        if file.public:
+            db_upload = file_crud.create_public_upload(**upload_params)
+        else:
+            db_upload = file_crud.create_private_upload(**upload_params)
+
+        scanned = scan_service.apply_stored_verdict(db=db, db_upload=db_upload)
+
+        shared_crud.flush(db)
+        shared_crud.commit(db)
+
+        #virus_free is set by the scan pipeline, the upload does not wait for the scan
+        if not scanned:
+            scan_service.queue_scan(received_file.file_hash)
+
+        logger.info("\nFILE UPLOAD HAS BEEN CREATED")
+
+        return to_uploaded_file(db_upload)
+    except Exception as ex:
+        logger.error(f"\nFILE UPLOAD HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        if not keep_received_file:
+            remove_stored_file(received_file.temp_path)
+        if blob_created and keep_received_file:
+            blob_store.unstore_blob(received_file.file_hash, received_file.temp_path)
+        elif blob_created:
+            remove_stored_file(blob_store.get_blob_path(received_file.file_hash))
+        raise
+
+
+#Release blob references of removed uploads and commit. Blobs left without references are detached before the commit
+#and their bytes are freed only once the commit succeeds
+def commit_releasing_blobs(db: Session, file_hashes: list) -> int:
+    released_hashes = blob_crud.release(db=db, file_hashes=file_hashes)
+    detached_blobs = [(file_hash, blob_store.detach_blob(file_hash)) for file_hash in released_hashes]
+
+    try:
+        shared_crud.commit(db)
+    except Exception:
+        for file_hash, detached_path in detached_blobs:
+            blob_store.reattach_blob(file_hash, detached_path)
+        raise
+
+    for _, detached_path in detached_blobs:
+        blob_store.remove_detached_blob(detached_path)
+
+    return len(released_hashes)
+
+
+def delete_owned_upload(db: Session, upload_type: db_models.UploadType, upload_id: int, user_id: int):
+    db_upload = file_crud.get_upload(db=db, upload_type=upload_type, upload_id=upload_id)
+    if db_upload is None:
+        logger.warning(f"\nCANNOT REMOVE FILE UPLOAD - {upload_type.value.upper()} UPLOAD WITH ID: {upload_id} NOT FOUND")
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if db_upload.fk_user_id != user_id:
+        logger.warning("\nCANNOT REMOVE FILE UPLOAD - UPLOAD BELONGS TO ANOTHER USER")
+        raise HTTPException(status_code=403, detail="User has no access to the file")
+
+    file_hashes = file_crud.delete_uploads(db=db, upload_type=upload_type, upload_ids=[upload_id])
+    commit_releasing_blobs(db=db, file_hashes=file_hashes)
+    if upload_type == db_models.UploadType.public:
+        trending_service.discard_uploads([upload_id])
+
+
+#Remove upload owned by the user, stored bytes are freed when the last upload referencing them is removed. The password
+#is verified by the password executor, database work runs in the threadpool
+async def remove_upload(db: Session, upload_type: db_models.UploadType, upload_id: int, data: requestModel.FileDelete):
+    try:
+        logger.info("\nREMOVING FILE UPLOAD")
+        shared_validator.validate_sql_malicious_input(data.password)
+
+        db_user = await run_in_threadpool(auth.read_credentials, db=db, user_id=data.user_id)
+        if db_user is None or not await auth.async_verify_password(data.password, db_user.password_hash):
+            logger.warning("\nCANNOT REMOVE FILE UPLOAD - USER NOT FOUND OR PASSWORD INCORRECT")
+            raise HTTPException(status_code=404, detail="User not found or password incorrect")
+
+        await run_in_threadpool(delete_owned_upload, db=db, upload_type=upload_type, upload_id=upload_id, user_id=db_user.user_id)
+
+        logger.info("\nFILE UPLOAD REMOVED")
+    except Exception as ex:
+        logger.error(f"\nFILE UPLOAD HAS NOT BEEN REMOVED, EXCEPTION OCCURED: {ex}")
+        await run_in_threadpool(shared_crud.rollback, db)
+        raise
+
+
+def save_upload_title(db: Session, upload_type: db_models.UploadType, upload_id: int, user_id: int, new_title: str):
+    db_upload = file_crud.get_upload(db=db, upload_type=upload_type, upload_id=upload_id)
+    if db_upload is None:
+        logger.warning(f"\nCANNOT UPDATE FILE TITLE - {upload_type.value.upper()} UPLOAD WITH ID: {upload_id} NOT FOUND")
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if db_upload.fk_user_id != user_id:
+        logger.warning("\nCANNOT UPDATE FILE TITLE - UPLOAD BELONGS TO ANOTHER USER")
+        raise HTTPException(status_code=403, detail="User has no access to the file")
+
+    file_crud.update_title(db=db, db_upload=db_upload, new_title=new_title)
+    shared_crud.commit(db)
+    return {"title": new_title}
+
+
+#Change title of an upload owned by the user. The password is verified by the password executor, database work runs in
+#the threadpool
+async def update_upload_title(db: Session, upload_type: db_models.UploadType, upload_id: int, data: requestModel.FileTitleUpdate):
+    try:
+        logger.info("\nUPDATING FILE TITLE")
+        file_validator.validate_title(data.new_title)
+        shared_validator.validate_sql_malicious_input(data.password)
+
+        db_user = await run_in_threadpool(auth.read_credentials, db=db, user_id=data.user_id)
+        if db_user is None or not await auth.async_verify_password(data.password, db_user.password_hash):
+            logger.warning("\nCANNOT UPDATE FILE TITLE - USER NOT FOUND OR PASSWORD INCORRECT")
+            raise HTTPException(status_code=404, detail="User not found or password incorrect")
+
+        updated_title = await run_in_threadpool(save_upload_title, db=db, upload_type=upload_type, upload_id=upload_id, user_id=db_user.user_id, new_title=data.new_title)
+
+        logger.info("\nFILE TITLE UPDATED")
+        return updated_title
+    except Exception as ex:
+        logger.error(f"\nFILE TITLE HAS NOT BEEN UPDATED, EXCEPTION OCCURED: {ex}")
+        await run_in_threadpool(shared_crud.rollback, db)
+        raise
+
+
+#Stored counters of the upload with deltas which are still waiting for the write-behind flush
+def get_upload_counters(db_upload, upload_type: db_models.UploadType, upload_id: int) -> dict:
+    pending = counter_service.counters.get_pending(upload_type=upload_type, upload_id=upload_id)
+
+    return {
+        "views": (db_upload.views or 0) + pending["views"],
+        "download_count": (db_upload.download_count or 0) + pending["download_count"]
+    }
+
+
+#Parse one page of approved public upload titles ordered by title, starting after the upload stored in cursor
+def get_public_titles(db: Session, cursor: str, limit: int):
+    try:
+        logger.info("\nPARSING PAGE OF PUBLIC FILE TITLES")
+        after = pagination_service.decode_cursor(cursor, str, int)
+
+        rows = file_crud.get_public_titles_page(db=db, after=after, limit=limit)
+        rows, next_cursor = pagination_service.build_page(rows, limit, lambda row: (row.title, row.public_upload_id))
+
+        logger.info("\nPUBLIC FILE TITLES PARSED SUCCESSFULLY")
+        return FastJSONResponse({"titles": [row.title for row in rows], "next_cursor": next_cursor})
+    except Exception as ex:
+        logger.error(f"\nPUBLIC FILE TITLES HAVE NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Convert the public upload into FileDetails response fields
+def public_file_details(db_upload) -> dict:
+    upload_id = db_upload.public_upload_id
+    counters = get_upload_counters(db_upload=db_upload, upload_type=db_models.UploadType.public, upload_id=upload_id)
+
+    return {
+        "upload_id": upload_id,
+        "title": db_upload.title,
+        "description": db_upload.description,
+        "size_in_bytes": db_upload.size_in_bytes,
+        "file_hash": db_upload.file_hash,
+        "uploaded_at": db_upload.uploaded_at,
+        "expiration_date": db_upload.expiration_date,
+        "virus_free": db_upload.virus_free,
+        "views": counters["views"],
+        "download_count": counters["download_count"],
+        "max_download_count": db_upload.max_download_count,
+        "like_count": db_upload.like_count or 0,
+        "dislike_count": db_upload.dislike_count or 0,
+        "comment_count": db_upload.comment_count or 0
+    }
+
+
+#Record a view of the public upload and convert it into FileDetails response fields
+def view_public_file(db_upload):
+    upload_id = db_upload.public_upload_id
+
+    counter_service.counters.record_view(upload_type=db_models.UploadType.public, upload_id=upload_id)
+    trending_service.record_view(upload_id)
+    return public_file_details(db_upload=db_upload)
+
+
+#Get approved public upload details, every read counts as a view. The entity tag is computed from the response values, a
+#client whose copy is still current gets 304 before the response is encoded. Such revalidations are cache hits rather
+#than views - counting them would change the details and so the tag on every request
+def get_public_file(db: Session, file_id: int, if_none_match: str = None):
+    try:
+        logger.info("\nRETRIEVING PUBLIC FILE DETAILS")
+        upload_type = db_models.UploadType.public
+
+        db_upload = file_crud.get_upload(db=db, upload_type=upload_type, upload_id=file_id)
+        if db_upload is None or not db_upload.admin_approved:
+            logger.warning(f"\nCANNOT RETRIEVE FILE DETAILS - PUBLIC UPLOAD WITH ID: {file_id} NOT FOUND OR NOT APPROVED")
+            raise HTTPException(status_code=404, detail="File not found")
+
+        if if_none_match is not None:
+            etag = etag_service.make_etag(*public_file_details(db_upload=db_upload).values())
+            if etag_service.etag_matches(if_none_match, etag):
+                logger.info("\nFILE DETAILS NOT MODIFIED")
+                return etag_service.not_modified(etag, etag_service.FILE_CACHE_CONTROL)
+
+        details = view_public_file(db_upload=db_upload)
+        etag = etag_service.make_etag(*details.values())
+        return FastJSONResponse(details, headers=etag_service.cache_headers(etag, etag_service.FILE_CACHE_CONTROL))
+    except Exception as ex:
+        logger.error(f"\nFILE DETAILS CANNOT BE RETRIEVED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Resolve /category/sub-category/file browse path to an approved, unexpired public upload with one query and return its
+#details with the breadcrumb of the path. Every read counts as a view
+def browse_public_file(db: Session, category_name: str, sub_category_name: str, file_title: str):
+    try:
+        logger.info("\nRESOLVING FILE BROWSE PATH")
+
+        row = file_crud.get_public_upload_by_path(db=db, category_name=category_name, sub_category_name=sub_category_name, title=file_title)
+        if row is None:
+            logger.warning(f"\nCANNOT RESOLVE FILE BROWSE PATH - {category_name}/{sub_category_name}/{file_title} NOT FOUND")
+            raise HTTPException(status_code=404, detail="File not found")
+
+        db_upload, category_name, sub_category_name = row
+        return {
+            "file": view_public_file(db_upload=db_upload),
+            "breadcrumb": [
+                {"level": "category", "name": category_name},
+                {"level": "sub_category", "name": sub_category_name},
+                {"level": "file", "name": db_upload.title}
+            ]
+        }
+    except Exception as ex:
+        logger.error(f"\nFILE BROWSE PATH CANNOT BE RESOLVED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Get view and download counters of an upload, counts which are not flushed yet are included
+def get_upload_stats(db: Session, upload_type: db_models.UploadType, upload_id: int):
+    try:
+        logger.info("\nRETRIEVING FILE COUNTERS")
+
+        db_upload = file_crud.get_upload(db=db, upload_type=upload_type, upload_id=upload_id)
+        if db_upload is None:
+            logger.warning(f"\nCANNOT RETRIEVE FILE COUNTERS - {upload_type.value.upper()} UPLOAD WITH ID: {upload_id} NOT FOUND")
+            raise HTTPException(status_code=404, detail="File not found")
+
+        return {"upload_id": upload_id, "upload_type": upload_type, **get_upload_counters(db_upload=db_upload, upload_type=upload_type, upload_id=upload_id)}
+    except Exception as ex:
+        logger.error(f"\nFILE COUNTERS CANNOT BE RETRIEVED, EXCEPTION OCCURED: {ex}")
+        raise
@@ -0,0 +1,42 @@
+from app.validators import shared_validator
+from app.config.logger import logger
+from typing import Callable
+import base64
+import json
+import os
+
+#Page size used when the client does not provide limit, and the largest limit a client may ask for
+PAGE_SIZE = int(os.getenv("STREAMABIT_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("STREAMABIT_MAX_PAGE_SIZE", 500))
+
+
+#Continuation token holding the sort key of the last returned row. Clients treat it as an opaque string
+def encode_cursor(*key) -> str:
+    payload = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+#Sort key stored in the cursor, types lists expected type of every key part. None when no cursor is provided
+def decode_cursor(cursor: str, *types) -> tuple:
+    if cursor is None:
+        return None
+
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+
+    if not isinstance(key, list) or len(key) != len(types) or not all(type(part) is expected for part, expected in zip(key, types)):
+        logger.warning(f"Invalid pagination cursor provided: {cursor}")
+        raise shared_validator.ValidationException("Invalid cursor")
+
+    return tuple(key)
+
+
+#Split limit + 1 fetched rows into the page and the cursor of the next page, which is None on the last page
+def build_page(rows: list, limit: int, sort_key: Callable) -> tuple:
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    return page, encode_cursor(*sort_key(page[-1]))
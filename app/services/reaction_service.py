@@ -0,0 +1,116 @@
+from app.crud import comment_crud, reaction_crud, shared_crud, user_crud
+from app.config.db_connection import SessionLocal
+from app.services import pagination_service, trending_service
+from app.validators import file_validator
+import app.models.requests as requestModel
+import app.models.database as db_models
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+import os
+
+#How often like, dislike and comment counters are recounted and how many uploads are recounted per transaction
+REACTION_RECONCILE_INTERVAL_SECONDS = float(os.getenv("STREAMABIT_REACTION_RECONCILE_INTERVAL_SECONDS", 3600))
+REACTION_RECONCILE_BATCH_SIZE = int(os.getenv("STREAMABIT_REACTION_RECONCILE_BATCH_SIZE", 1000))
+
+
+def check_user_exists(db: Session, user_id: int):
+    if user_crud.get_by_username_email_id(db=db, user_id=user_id) is None:
+        logger.warning(f"\nUSER WITH ID: {user_id} HAS NOT BEEN FOUND")
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+#Like, dislike (reaction) or remove the reaction (None) of a user to an approved public upload
+def set_reaction(db: Session, user_id: int, upload_id: int, reaction: db_models.Reaction):
+    try:
+        logger.info(f"\nSETTING FILE REACTION: {reaction.value.upper() if reaction else 'NONE'}")
+        check_user_exists(db=db, user_id=user_id)
+
+        counts = reaction_crud.set_reaction(db=db, user_id=user_id, upload_id=upload_id, reaction=reaction)
+        if counts is None:
+            logger.warning(f"\nCANNOT SET FILE REACTION - PUBLIC UPLOAD WITH ID: {upload_id} NOT FOUND OR NOT APPROVED")
+            raise HTTPException(status_code=404, detail="File not found")
+
+        shared_crud.commit(db)
+        if reaction == db_models.Reaction.like and counts.added:
+            trending_service.record_like(upload_id)
+
+        logger.info("\nFILE REACTION HAS BEEN SET")
+        return {"upload_id": upload_id, "reaction": reaction, "like_count": counts.like_count, "dislike_count": counts.dislike_count}
+    except Exception as ex:
+        logger.error(f"\nFILE REACTION HAS NOT BEEN SET, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        raise
+
+
+#Add a comment of a user to an approved public upload
+def add_comment(db: Session, user_id: int, upload_id: int, data: requestModel.CommentCreate):
+    try:
+        logger.info("\nCREATING FILE COMMENT")
+        file_validator.validate_comment_content(data.content)
+        check_user_exists(db=db, user_id=user_id)
+
+        db_comment = comment_crud.create(db=db, user_id=user_id, upload_id=upload_id, content=data.content)
+        if db_comment is None:
+            logger.warning(f"\nCANNOT CREATE FILE COMMENT - PUBLIC UPLOAD WITH ID: {upload_id} NOT FOUND OR NOT APPROVED")
+            raise HTTPException(status_code=404, detail="File not found")
+
+        shared_crud.commit(db)
+
+        logger.info("\nFILE COMMENT HAS BEEN CREATED")
+        return {"comment_id": db_comment.comment_id, "user_id": db_comment.fk_user_id, "content": db_comment.content, "created_at": db_comment.created_at}
+    except Exception as ex:
+        logger.error(f"\nFILE COMMENT HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        raise
+
+
+#Parse one page of upload comments, newest first, starting after the comment stored in cursor
+def get_comments(db: Session, upload_id: int, cursor: str, limit: int):
+    try:
+        logger.info("\nPARSING PAGE OF FILE COMMENTS")
+        before = pagination_service.decode_cursor(cursor, int)
+
+        rows = comment_crud.get_comments_page(db=db, upload_id=upload_id, before_id=before[0] if before else None, limit=limit)
+        rows, next_cursor = pagination_service.build_page(rows, limit, lambda row: (row.comment_id,))
+
+        logger.info("\nFILE COMMENTS PARSED SUCCESSFULLY")
+        return {
+            "comments": [{"comment_id": row.comment_id, "user_id": row.fk_user_id, "content": row.content, "created_at": row.created_at} for row in rows],
+            "next_cursor": next_cursor
+        }
+    except Exception as ex:
+        logger.error(f"\nFILE COMMENTS HAVE NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Periodic job - walk all public uploads in id order and repair like, dislike and comment counters which differ from the
+#stored reactions. Every batch is a separate short transaction, so row locks are held only for one batch
+def reconcile_reaction_counters():
+    logger.info("Reconciling reaction counters")
+    db = SessionLocal()
+    after_id = 0
+    checked = 0
+    repaired = 0
+
+    try:
+        while True:
+            upload_ids = reaction_crud.get_upload_id_batch(db=db, after_id=after_id, batch_size=REACTION_RECONCILE_BATCH_SIZE)
+            if not upload_ids:
+                break
+
+            repaired_ids = reaction_crud.recount_reaction_counters(db=db, first_id=upload_ids[0], last_id=upload_ids[-1])
+            shared_crud.commit(db)
+
+            if repaired_ids:
+                logger.warning(f"Repaired drifted reaction counters of public uploads: {repaired_ids}")
+            checked += len(upload_ids)
+            repaired += len(repaired_ids)
+            after_id = upload_ids[-1]
+
+        logger.info(f"Reaction counters reconciled, checked uploads: {checked}, repaired uploads: {repaired}")
+    except Exception:
+        shared_crud.rollback(db)
+        raise
+    finally:
+        db.close()
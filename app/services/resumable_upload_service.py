@@ -0,0 +1,375 @@
+from app.crud import resumable_upload_crud, shared_crud, user_crud
+from app.validators import file_validator, shared_validator
+from app.config.db_connection import SessionLocal
+from starlette.concurrency import run_in_threadpool
+import app.models.requests as requestModel
+import app.models.database as db_models
+from app.services import file_service
+from app.storage import upload_stream
+from fastapi import HTTPException, Request
+from datetime import datetime, timedelta
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from app.config import storage
+import secrets
+import time
+import os
+
+
+#Path of the preallocated file which chunks of the resumable upload are written into
+def get_partial_path(db_resumable_upload: db_models.ResumableUpload):
+    return os.path.join(storage.PARTIAL_DIR, db_resumable_upload.upload_key)
+
+
+def get_chunk_count(db_resumable_upload: db_models.ResumableUpload):
+    return -(-db_resumable_upload.total_size // db_resumable_upload.chunk_size)
+
+
+def get_new_expiration():
+    return datetime.utcnow() + timedelta(seconds=storage.RESUMABLE_UPLOAD_TTL_SECONDS)
+
+
+#Build upload status - received offset is the size of the contiguous prefix of received chunks
+def get_status(db: Session, db_resumable_upload: db_models.ResumableUpload):
+    received_chunks = resumable_upload_crud.get_received_chunks(db=db, resumable_upload_id=db_resumable_upload.resumable_upload_id)
+
+    received_offset = 0
+    for expected_index, (chunk_index, size_in_bytes) in enumerate(received_chunks):
+        if chunk_index != expected_index:
+            break
+        received_offset += size_in_bytes
+
+    return {
+        "upload_key": db_resumable_upload.upload_key,
+        "total_size": db_resumable_upload.total_size,
+        "chunk_size": db_resumable_upload.chunk_size,
+        "received_offset": received_offset,
+        "received_chunks": [chunk_index for chunk_index, _ in received_chunks],
+        "expires_at": db_resumable_upload.expires_at
+    }
+
+
+#Resumable upload by its key, uploads past their expiration are gone even before the cleanup job removes them
+def get_existing_upload(db: Session, upload_key: str):
+    db_resumable_upload = resumable_upload_crud.get_by_key(db=db, upload_key=upload_key)
+
+    if db_resumable_upload is None or db_resumable_upload.expires_at <= datetime.utcnow():
+        logger.warning("\nRESUMABLE UPLOAD NOT FOUND OR ALREADY EXPIRED")
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    return db_resumable_upload
+
+
+#Remove resumable upload entry and its partial file
+def discard_upload(db: Session, db_resumable_upload: db_models.ResumableUpload):
+    partial_path = get_partial_path(db_resumable_upload)
+    resumable_upload_crud.delete(db=db, db_resumable_upload=db_resumable_upload)
+    shared_crud.commit(db)
+    file_service.remove_stored_file(partial_path)
+
+
+#Create resumable upload session - validate file metadata and sizes, preallocate partial file which chunks are written into
+def create_resumable_upload(db: Session, user_id: int, data: requestModel.ResumableUploadCreate):
+    partial_path = None
+
+    try:
+        logger.info("\nCREATING RESUMABLE UPLOAD")
+        shared_validator.validate_sql_malicious_input(data.title, data.description)
+        file_validator.validate_file_hash(data.file_hash)
+
+        chunk_size = data.chunk_size or storage.RESUMABLE_CHUNK_SIZE
+        file_validator.validate_resumable_upload_size(total_size=data.total_size, chunk_size=chunk_size)
+
+        db_user = user_crud.get_by_username_email_id(db=db, user_id=user_id)
+        if db_user is None:
+            logger.warning(f"\nRESUMABLE UPLOAD CANNOT BE CREATED - USER WITH ID: {user_id} NOT FOUND")
+            raise HTTPException(status_code=404, detail="User not found")
+
+        db_resumable_upload = resumable_upload_crud.create(
+            db=db,
+            user_id=user_id,
+            upload_key=secrets.token_urlsafe(32),
+            data=data,
+            chunk_size=chunk_size,
+            expires_at=get_new_expiration()
+        )
+
+        partial_path = get_partial_path(db_resumable_upload)
+        with open(partial_path, "wb") as partial_file:
+            partial_file.truncate(data.total_size)
+
+        shared_crud.flush(db)
+        shared_crud.commit(db)
+
+        logger.info("\nRESUMABLE UPLOAD HAS BEEN CREATED")
+
+        return get_status(db=db, db_resumable_upload=db_resumable_upload)
+    except Exception as ex:
+        logger.error(f"\nRESUMABLE UPLOAD HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        file_service.remove_stored_file(partial_path)
+        raise
+
+
+#Parse resumable upload status, used by clients to find out which chunks still have to be sent
+def get_resumable_upload_status(db: Session, upload_key: str):
+    try:
+        logger.info("\nPARSING RESUMABLE UPLOAD STATUS")
+        db_resumable_upload = get_existing_upload(db=db, upload_key=upload_key)
+
+        return get_status(db=db, db_resumable_upload=db_resumable_upload)
+    except Exception as ex:
+        logger.error(f"\nRESUMABLE UPLOAD STATUS HAS NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Check the chunk and remove its entry before its range is (re-)written, so bytes which are only partly overwritten when
+#the request fails are never treated as received. Chunks of an upload which is being completed are refused
+def prepare_chunk(db: Session, upload_key: str, chunk_index: int):
+    db_resumable_upload = get_existing_upload(db=db, upload_key=upload_key)
+
+    if chunk_index < 0 or chunk_index >= get_chunk_count(db_resumable_upload):
+        logger.warning(f"\nCHUNK CANNOT BE RECEIVED - CHUNK INDEX: {chunk_index} OUT OF BOUNDS")
+        raise HTTPException(status_code=400, detail="Chunk index out of bounds")
+
+    receiving = db_models.ResumableUploadState.receiving
+    if not resumable_upload_crud.set_state(db=db, resumable_upload_id=db_resumable_upload.resumable_upload_id, from_state=receiving, to_state=receiving, expires_at=get_new_expiration()):
+        logger.warning("\nCHUNK CANNOT BE RECEIVED - UPLOAD IS BEING COMPLETED")
+        raise HTTPException(status_code=409, detail="Upload is being completed")
+
+    offset = chunk_index * db_resumable_upload.chunk_size
+    expected_size = min(db_resumable_upload.chunk_size, db_resumable_upload.total_size - offset)
+    partial_path = get_partial_path(db_resumable_upload)
+
+    resumable_upload_crud.delete_chunk(db=db, resumable_upload_id=db_resumable_upload.resumable_upload_id, chunk_index=chunk_index)
+
+    #End the transaction so no pooled connection is held while chunk bytes are streamed
+    shared_crud.commit(db)
+
+    return db_resumable_upload, partial_path, offset, expected_size
+
+
+def record_chunk(db: Session, db_resumable_upload: db_models.ResumableUpload, chunk_index: int, size_in_bytes: int, checksum: str):
+    resumable_upload_crud.record_chunk(
+        db=db,
+        db_resumable_upload=db_resumable_upload,
+        chunk_index=chunk_index,
+        size_in_bytes=size_in_bytes,
+        checksum=checksum,
+        expires_at=get_new_expiration()
+    )
+    shared_crud.commit(db)
+
+    return get_status(db=db, db_resumable_upload=db_resumable_upload)
+
+
+#Stream a single chunk into its place in the partial file. Chunk is recorded only if its size and SHA-256 checksum match,
+#otherwise the client has to re-send it
+async def upload_chunk(db: Session, request: Request, upload_key: str, chunk_index: int, checksum: str):
+    try:
+        logger.info(f"\nRECEIVING RESUMABLE UPLOAD CHUNK: {chunk_index}")
+        file_validator.validate_file_hash(checksum, field_name="X-Chunk-SHA256")
+
+        db_resumable_upload, partial_path, offset, expected_size = await run_in_threadpool(prepare_chunk, db=db, upload_key=upload_key, chunk_index=chunk_index)
+
+        received_chunk = await upload_stream.receive_file_range(
+            request=request,
+            file_path=partial_path,
+            offset=offset,
+            max_size=expected_size
+        )
+
+        if received_chunk.size_in_bytes != expected_size:
+            logger.warning(f"\nCHUNK REJECTED - EXPECTED {expected_size} BYTES, RECEIVED {received_chunk.size_in_bytes}")
+            raise HTTPException(status_code=400, detail=f"Chunk {chunk_index} must be exactly {expected_size} bytes long")
+
+        if received_chunk.file_hash != checksum:
+            logger.warning(f"\nCHUNK REJECTED - CHECKSUM MISMATCH FOR CHUNK: {chunk_index}")
+            raise HTTPException(status_code=422, detail="Chunk checksum mismatch")
+
+        status = await run_in_threadpool(record_chunk, db=db, db_resumable_upload=db_resumable_upload, chunk_index=chunk_index, size_in_bytes=expected_size, checksum=checksum)
+
+        logger.info("\nRESUMABLE UPLOAD CHUNK HAS BEEN RECEIVED")
+        return status
+    except Exception as ex:
+        logger.error(f"\nRESUMABLE UPLOAD CHUNK HAS NOT BEEN RECEIVED, EXCEPTION OCCURED: {ex}")
+        await run_in_threadpool(shared_crud.rollback, db)
+        raise
+
+
+#Claim the upload for completion in a short transaction. The state change locks the upload row, chunks are checked after
+#it, so a chunk prepared concurrently is either seen as missing or refused. Returns upload fields needed after the commit
+def claim_upload(db: Session, upload_key: str):
+    db_resumable_upload = get_existing_upload(db=db, upload_key=upload_key)
+
+    claimed = resumable_upload_crud.set_state(
+        db=db,
+        resumable_upload_id=db_resumable_upload.resumable_upload_id,
+        from_state=db_models.ResumableUploadState.receiving,
+        to_state=db_models.ResumableUploadState.completing,
+        expires_at=get_new_expiration()
+    )
+    if not claimed:
+        logger.warning("\nRESUMABLE UPLOAD CANNOT BE COMPLETED - ALREADY BEING COMPLETED")
+        raise HTTPException(status_code=409, detail="Upload is already being completed")
+
+    status = get_status(db=db, db_resumable_upload=db_resumable_upload)
+    if status["received_offset"] != db_resumable_upload.total_size:
+        logger.warning("\nRESUMABLE UPLOAD CANNOT BE COMPLETED - NOT ALL CHUNKS RECEIVED")
+        raise HTTPException(status_code=409, detail="Not all chunks have been received")
+
+    upload = {
+        "resumable_upload_id": db_resumable_upload.resumable_upload_id,
+        "file_hash": db_resumable_upload.file_hash,
+        "chunk_size": db_resumable_upload.chunk_size,
+        "partial_path": get_partial_path(db_resumable_upload)
+    }
+    shared_crud.commit(db)
+    return upload
+
+
+#Return a claimed upload to receiving, so the client can re-send chunks or retry completion
+def release_upload(db: Session, resumable_upload_id: int):
+    resumable_upload_crud.set_state(
+        db=db,
+        resumable_upload_id=resumable_upload_id,
+        from_state=db_models.ResumableUploadState.completing,
+        to_state=db_models.ResumableUploadState.receiving,
+        expires_at=get_new_expiration()
+    )
+    shared_crud.commit(db)
+
+
+#Undo the claim of an upload whose completion failed. An upload whose partial file was dropped as a duplicate of stored
+#content cannot be resumed, so it is discarded instead of returned to receiving
+def restore_upload(db: Session, upload_key: str, upload: dict):
+    if os.path.exists(upload["partial_path"]):
+        release_upload(db=db, resumable_upload_id=upload["resumable_upload_id"])
+        return
+
+    logger.warning("\nRESUMABLE UPLOAD DISCARDED - PARTIAL FILE WAS CONSUMED BY A FAILED COMPLETION")
+    db_resumable_upload = resumable_upload_crud.get_by_key(db=db, upload_key=upload_key)
+    if db_resumable_upload is not None:
+        discard_upload(db=db, db_resumable_upload=db_resumable_upload)
+
+
+#Indexes of received chunks whose bytes in the partial file no longer match their recorded checksum
+def find_corrupted_chunks(db: Session, upload: dict) -> list:
+    chunks = resumable_upload_crud.get_received_chunks(db=db, resumable_upload_id=upload["resumable_upload_id"], with_checksums=True)
+    shared_crud.commit(db)
+
+    return [
+        chunk_index for chunk_index, size_in_bytes, checksum in chunks
+        if upload_stream.hash_stored_range(upload["partial_path"], chunk_index * upload["chunk_size"], size_in_bytes) != checksum
+    ]
+
+
+#Finalize resumable upload - all chunks must be present and the combined SHA-256 must match the declared file hash.
+#The upload is claimed and the transaction committed before the file is hashed, so no pooled connection is held while it
+#is read. When the combined hash does not match, chunks are verified one by one and only corrupted ones have to be re-sent.
+#Partial file already holds chunks at their final positions, so it is moved into storage without copying
+def complete_resumable_upload(db: Session, upload_key: str):
+    upload = None
+    completed = False
+
+    try:
+        logger.info("\nCOMPLETING RESUMABLE UPLOAD")
+        upload = claim_upload(db=db, upload_key=upload_key)
+
+        file_hash = upload_stream.hash_stored_file(upload["partial_path"])
+
+        if file_hash != upload["file_hash"]:
+            corrupted_chunks = find_corrupted_chunks(db=db, upload=upload)
+            db_resumable_upload = get_existing_upload(db=db, upload_key=upload_key)
+
+            if corrupted_chunks:
+                logger.warning(f"\nRESUMABLE UPLOAD CANNOT BE COMPLETED - CORRUPTED CHUNKS: {corrupted_chunks}")
+                for chunk_index in corrupted_chunks:
+                    resumable_upload_crud.delete_chunk(db=db, resumable_upload_id=upload["resumable_upload_id"], chunk_index=chunk_index)
+                shared_crud.commit(db)
+                raise HTTPException(status_code=409, detail=f"Corrupted chunks have to be re-sent: {', '.join(map(str, corrupted_chunks))}")
+
+            logger.warning("\nRESUMABLE UPLOAD REJECTED - COMBINED FILE HASH DOES NOT MATCH DECLARED file_hash")
+            completed = True
+            discard_upload(db=db, db_resumable_upload=db_resumable_upload)
+            raise HTTPException(status_code=422, detail="Uploaded file hash does not match declared file_hash")
+
+        db_resumable_upload = get_existing_upload(db=db, upload_key=upload_key)
+        file = requestModel.FileCreate(
+            title=db_resumable_upload.title,
+            public=db_resumable_upload.public,
+            max_downloads=db_resumable_upload.max_download_count,
+            expiration_date=db_resumable_upload.file_expiration_date,
+            description=db_resumable_upload.description
+        )
+        received_file = upload_stream.ReceivedFile(
+            temp_path=upload["partial_path"],
+            file_name=db_resumable_upload.title,
+            file_hash=file_hash,
+            size_in_bytes=db_resumable_upload.total_size
+        )
+        user_id = db_resumable_upload.fk_user_id
+
+        resumable_upload_crud.delete(db=db, db_resumable_upload=db_resumable_upload)
+
+        uploaded_file = file_service.create_upload(db=db, user_id=user_id, file=file, received_file=received_file, keep_received_file=True)
+        completed = True
+
+        logger.info("\nRESUMABLE UPLOAD HAS BEEN COMPLETED")
+        return uploaded_file
+    except Exception as ex:
+        logger.error(f"\nRESUMABLE UPLOAD HAS NOT BEEN COMPLETED, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        if upload is not None and not completed:
+            restore_upload(db=db, upload_key=upload_key, upload=upload)
+        raise
+
+
+#Abort resumable upload by the client, received chunks are removed
+def abort_resumable_upload(db: Session, upload_key: str):
+    try:
+        logger.info("\nABORTING RESUMABLE UPLOAD")
+        db_resumable_upload = get_existing_upload(db=db, upload_key=upload_key)
+        discard_upload(db=db, db_resumable_upload=db_resumable_upload)
+        logger.info("\nRESUMABLE UPLOAD HAS BEEN ABORTED")
+    except Exception as ex:
+        logger.error(f"\nRESUMABLE UPLOAD HAS NOT BEEN ABORTED, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        raise
+
+
+#Garbage collect resumable uploads which received no chunks until their expiration, in bounded batches.
+#Also removes leftovers of interrupted single request uploads from TEMP_DIR
+def collect_abandoned_uploads():
+    removed_uploads = 0
+    db = SessionLocal()
+
+    try:
+        while True:
+            expired_uploads = resumable_upload_crud.get_expired(db=db, now=datetime.utcnow(), limit=storage.RESUMABLE_UPLOAD_GC_BATCH_SIZE)
+            if not expired_uploads:
+                break
+
+            partial_paths = [get_partial_path(db_resumable_upload) for db_resumable_upload in expired_uploads]
+            for db_resumable_upload in expired_uploads:
+                resumable_upload_crud.delete(db=db, db_resumable_upload=db_resumable_upload)
+            shared_crud.commit(db)
+
+            for partial_path in partial_paths:
+                file_service.remove_stored_file(partial_path)
+            removed_uploads += len(expired_uploads)
+    except Exception:
+        shared_crud.rollback(db)
+        raise
+    finally:
+        db.close()
+
+    removed_temp_files = 0
+    stale_before = time.time() - storage.RESUMABLE_UPLOAD_TTL_SECONDS
+    for entry in os.scandir(storage.TEMP_DIR):
+        if entry.is_file() and entry.stat().st_mtime < stale_before:
+            file_service.remove_stored_file(entry.path)
+            removed_temp_files += 1
+
+    if removed_uploads or removed_temp_files:
+        logger.info(f"Removed {removed_uploads} abandoned resumable uploads and {removed_temp_files} stale temporary files")
@@ -0,0 +1,169 @@
+from app.storage.virus_scanner import Scanner, load_scanner, scan_file
+from concurrent.futures import ProcessPoolExecutor
+from app.config.db_connection import SessionLocal
+from app.crud import scan_crud, shared_crud
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from app.storage import blob_store
+import multiprocessing
+import threading
+import queue
+import os
+
+#Scanner processes, files are scanned at most this many at a time
+SCAN_WORKERS = int(os.getenv("STREAMABIT_SCAN_WORKERS", 2))
+
+#Hashes waiting for a scan, uploads beyond it are picked up by the backlog job
+SCAN_QUEUE_SIZE = int(os.getenv("STREAMABIT_SCAN_QUEUE_SIZE", 1000))
+
+#How often stored content without a verdict is queued, covers queue overflows and scans lost on restart
+SCAN_BACKLOG_INTERVAL_SECONDS = float(os.getenv("STREAMABIT_SCAN_BACKLOG_INTERVAL_SECONDS", 300))
+
+
+#Store the verdict of a scan, or set virus_free from a verdict which is already stored
+def record_verdict(file_hash: str, scanner: Scanner, result):
+    db = SessionLocal()
+    try:
+        if result is None:
+            verdict = scan_crud.get_verdict(db=db, file_hash=file_hash)
+            scan_crud.apply_verdict(db=db, file_hash=file_hash, virus_free=not verdict.infected)
+        else:
+            scan_crud.save_verdict(db=db, file_hash=file_hash, infected=result.infected, signature=result.signature, scanner=scanner.name)
+        shared_crud.commit(db)
+    except Exception:
+        shared_crud.rollback(db)
+        raise
+    finally:
+        db.close()
+
+
+#Background antivirus scanning. Content hashes are queued after uploads are committed, dispatcher threads take them one
+#at a time and scan the stored blob in a bounded process pool, so scans never run on request threads or hold the GIL.
+#Verdicts are stored by content hash, content which already has a verdict is never scanned again
+class ScanPipeline:
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._scanner = None
+        self._executor = None
+        self._threads = []
+
+    #Queue content for a scan unless it is already queued or being scanned, returns False when the queue is full
+    def submit(self, file_hash: str) -> bool:
+        with self._lock:
+            if file_hash in self._queued:
+                return True
+            try:
+                self._queue.put_nowait(file_hash)
+            except queue.Full:
+                logger.warning(f"Scan queue is full, {file_hash} is left for the scan backlog job")
+                return False
+            self._queued.add(file_hash)
+            return True
+
+    def free_slots(self) -> int:
+        return self._queue.maxsize - self._queue.qsize()
+
+    #Scan content unless it already has a verdict. Returns (record, result) - whether a verdict has to be recorded and the
+    #result of a new scan, None when the stored verdict is applied
+    def _scan(self, file_hash: str) -> tuple:
+        db = SessionLocal()
+        try:
+            verdict = scan_crud.get_verdict(db=db, file_hash=file_hash)
+        finally:
+            db.close()
+
+        if verdict is not None:
+            return True, None
+
+        file_path = blob_store.get_blob_path(file_hash)
+        if not os.path.exists(file_path):
+            logger.info(f"Blob {file_hash} was removed before it was scanned")
+            return False, None
+
+        return True, self._executor.submit(scan_file, self._scanner, file_path).result()
+
+    def _run(self):
+        while True:
+            file_hash = self._queue.get()
+            if file_hash is None:
+                return
+
+            try:
+                try:
+                    record, result = self._scan(file_hash)
+                finally:
+                    #Released before the verdict is stored, so an upload of the same content committed in the meantime
+                    #queues it again and its upload gets the verdict applied
+                    with self._lock:
+                        self._queued.discard(file_hash)
+
+                if record:
+                    record_verdict(file_hash=file_hash, scanner=self._scanner, result=result)
+                    if result is not None and result.infected:
+                        logger.warning(f"Infected content detected: {file_hash}, signature: {result.signature}")
+            except Exception as ex:
+                logger.exception(f"Scan of {file_hash} failed, it is retried by the scan backlog job: {ex}")
+
+    def start(self):
+        if not self._threads:
+            self._scanner = load_scanner()
+            #Spawned workers do not inherit threads and connections of the application process
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._threads = [threading.Thread(target=self._run, name=f"scan-dispatch-{index}", daemon=True) for index in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+            logger.info(f"Scan pipeline started, scanner: {self._scanner.name}, workers: {self.workers}")
+
+    #Finish running scans, hashes still queued are scanned after the next start by the backlog job
+    def stop(self):
+        if self._threads:
+            with self._lock:
+                while True:
+                    try:
+                        self._queued.discard(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+            self._executor.shutdown()
+            self._executor = None
+
+
+scan_pipeline = ScanPipeline(workers=SCAN_WORKERS, queue_size=SCAN_QUEUE_SIZE)
+
+
+#Set virus_free of a new upload from a stored verdict. Returns False when the content has to be scanned, it is queued
+#by queue_scan once the upload is committed
+def apply_stored_verdict(db: Session, db_upload) -> bool:
+    verdict = scan_crud.get_verdict(db=db, file_hash=db_upload.file_hash)
+    if verdict is None:
+        return False
+    db_upload.virus_free = not verdict.infected
+    return True
+
+
+def queue_scan(file_hash: str):
+    scan_pipeline.submit(file_hash)
+
+
+#Periodic job - queue stored content which has no verdict yet, as much as fits into the queue
+def queue_scan_backlog():
+    free_slots = scan_pipeline.free_slots()
+    if free_slots <= 0:
+        return
+
+    db = SessionLocal()
+    try:
+        file_hashes = scan_crud.get_unscanned_hashes(db=db, limit=free_slots)
+    finally:
+        db.close()
+
+    queued = sum(scan_pipeline.submit(file_hash) for file_hash in file_hashes)
+    if queued:
+        logger.info(f"Queued {queued} unscanned blobs")
@@ -0,0 +1,60 @@
+from app.cache.search_index import InvertedIndex, search_index, tokenize
+from app.services import pagination_service
+from app.crud import search_crud
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+
+MAX_QUERY_LENGTH = 100
+
+
+def get_search_index(db: Session) -> InvertedIndex:
+    index = search_index.get()
+    if index is None:
+        generation = search_index.generation
+        index = InvertedIndex.build(*search_crud.get_search_documents(db=db))
+        search_index.install(index, generation)
+    return index
+
+
+#Ranked page from the in-process index. Index matches are checked against the database in batches, so uploads which
+#were removed, rejected or have expired since the index was built are skipped
+def search_in_process(db: Session, query_text: str, after: tuple, limit: int) -> list:
+    matches = get_search_index(db).search(tokenize(query_text))
+    if after is not None:
+        matches = [match for match in matches if match < after]
+
+    rows = []
+    for start in range(0, len(matches), limit + 1):
+        batch = matches[start:start + limit + 1]
+        visible = search_crud.get_visible_uploads(db=db, upload_ids=[upload_id for _, upload_id in batch])
+
+        for rank, upload_id in batch:
+            upload = visible.get(upload_id)
+            if upload is not None:
+                rows.append({"upload_id": upload_id, "title": upload.title, "description": upload.description, "rank": rank})
+        if len(rows) > limit:
+            break
+
+    return rows[:limit + 1]
+
+
+#Search approved, unexpired public uploads by title, description and sub-category/category names. PostgreSQL answers
+#from its full-text index, other databases from the in-process index
+def search_public_uploads(db: Session, query_text: str, cursor: str, limit: int):
+    try:
+        logger.info("\nSEARCHING PUBLIC UPLOADS")
+        after = pagination_service.decode_cursor(cursor, float, int)
+
+        if db.get_bind().dialect.name == "postgresql":
+            rows = search_crud.search_public_uploads(db=db, query_text=query_text, after=after, limit=limit)
+            rows = [{"upload_id": row.public_upload_id, "title": row.title, "description": row.description, "rank": row.rank} for row in rows]
+        else:
+            rows = search_in_process(db=db, query_text=query_text, after=after, limit=limit)
+
+        results, next_cursor = pagination_service.build_page(rows, limit, lambda row: (row["rank"], row["upload_id"]))
+
+        logger.info("\nSEARCH RESULTS PARSED SUCCESSFULLY")
+        return {"results": results, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(f"\nSEARCH HAS FAILED, EXCEPTION OCCURED: {ex}")
+        raise
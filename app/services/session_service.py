@@ -0,0 +1,126 @@
+from app.cache.revocation_filter import revocation_filter
+from app.crud import user_crud, shared_crud, user_session_crud as session_crud
+from app.config.db_connection import SessionLocal
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from datetime import datetime
+from app import auth
+import secrets
+import os
+
+#How often revocations made by other workers are loaded into the revocation filter. Access tokens of a session revoked
+#by another worker are accepted by this one for at most this long
+REVOCATION_SYNC_SECONDS = float(os.getenv("STREAMABIT_REVOCATION_SYNC_SECONDS", 10))
+
+
+def invalid_refresh_token() -> HTTPException:
+    return HTTPException(status_code=401, detail="Invalid refresh token", headers={"WWW-Authenticate": "Bearer"})
+
+
+#Revoke one session or all sessions of a user within the current transaction, returns ids which have to be passed to
+#publish_revocations once it is committed
+def revoke_sessions(db: Session, session_id: int = None, user_id: int = None) -> list:
+    return session_crud.revoke(db=db, revoked_until=auth.revocation_expiration(), session_id=session_id, user_id=user_id)
+
+
+#Reject access tokens of committed revocations on this worker right away, other workers pick them up on their next sync
+def publish_revocations(session_ids: list):
+    if session_ids:
+        revocation_filter.add(session_ids)
+
+
+#Open a session for an authenticated user and issue its access and refresh tokens
+def open_session(db: Session, db_user, user_ip: str):
+    db_session = session_crud.create(db=db, user_id=db_user.user_id, user_ip=user_ip, expires_at=auth.refresh_token_expiration())
+    shared_crud.flush(db)
+
+    refresh_token, db_session.refresh_token_hash = auth.create_refresh_token(db_session.session_id)
+    access_token = auth.create_session_access_token(user_id=db_user.user_id, role=db_user.role.value, session_id=db_session.session_id)
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+#Check if refresh_token_hash belongs to the token the last refresh of the live session rotated out
+def is_rotated_token(db_session, refresh_token_hash: str) -> bool:
+    if db_session is None or db_session.revoked_at is not None or db_session.previous_refresh_token_hash is None:
+        return False
+    if db_session.expires_at is None or db_session.expires_at <= datetime.utcnow():
+        return False
+    return secrets.compare_digest(db_session.previous_refresh_token_hash, refresh_token_hash)
+
+
+#Exchange a refresh token for a new access and refresh token pair. Every refresh token is accepted once - presenting the one
+#which was rotated out by the last refresh means it was stolen, so the whole session is revoked. Any other token which does
+#not match is rejected without touching the session, so a guessed session id cannot be used to log its user out
+def refresh_session(db: Session, refresh_token: str):
+    try:
+        logger.info("\nREFRESHING USER SESSION")
+        parsed = auth.parse_refresh_token(refresh_token)
+        if parsed is None:
+            logger.warning("\nCANNOT REFRESH USER SESSION - MALFORMED REFRESH TOKEN")
+            raise invalid_refresh_token()
+
+        session_id, refresh_token_hash = parsed
+        new_refresh_token, new_refresh_token_hash = auth.create_refresh_token(session_id)
+        rotated = session_crud.rotate_refresh_token(db=db, session_id=session_id, refresh_token_hash=refresh_token_hash,
+                                                    new_refresh_token_hash=new_refresh_token_hash, expires_at=auth.refresh_token_expiration())
+
+        db_session = session_crud.get(db=db, session_id=session_id)
+        if not rotated:
+            if is_rotated_token(db_session, refresh_token_hash):
+                logger.warning(f"\nREFRESH TOKEN OF SESSION {session_id} WAS REUSED, REVOKING SESSION")
+                session_ids = revoke_sessions(db=db, session_id=session_id)
+                shared_crud.commit(db)
+                publish_revocations(session_ids)
+            else:
+                logger.warning("\nCANNOT REFRESH USER SESSION - SESSION NOT FOUND, EXPIRED, REVOKED OR TOKEN DOES NOT MATCH")
+            raise invalid_refresh_token()
+
+        db_user = user_crud.get_by_username_email_id(db=db, user_id=db_session.fk_user_id)
+        if db_user is None:
+            logger.warning("\nCANNOT REFRESH USER SESSION - USER NOT FOUND")
+            raise invalid_refresh_token()
+
+        shared_crud.commit(db)
+
+        logger.info("\nUSER SESSION HAS BEEN REFRESHED")
+        access_token = auth.create_session_access_token(user_id=db_user.user_id, role=db_user.role.value, session_id=session_id)
+        return {"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
+    except Exception as ex:
+        logger.error(f"\nUSER SESSION HAS NOT BEEN REFRESHED, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        raise
+
+
+#Log out of the session the access token belongs to, its access and refresh tokens stop being accepted
+def close_session(db: Session, claims: auth.TokenClaims):
+    try:
+        logger.info("\nLOGGING USER OUT")
+        session_ids = revoke_sessions(db=db, session_id=claims.session_id)
+        shared_crud.commit(db)
+        publish_revocations(session_ids)
+
+        logger.info("\nUSER HAS BEEN LOGGED OUT")
+    except Exception as ex:
+        logger.error(f"\nUSER HAS NOT BEEN LOGGED OUT, EXCEPTION OCCURED: {ex}")
+        shared_crud.rollback(db)
+        raise
+
+
+#Periodic job - load revocations of all workers into the revocation filter and remove the ones which expired
+def sync_revoked_sessions():
+    generation = revocation_filter.generation
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        revocation_filter.install(session_crud.get_revoked_session_ids(db=db, now=now), generation)
+
+        removed = session_crud.delete_expired_revocations(db=db, now=now)
+        shared_crud.commit(db)
+        if removed:
+            logger.info(f"Removed {removed} expired session revocations")
+    except Exception:
+        shared_crud.rollback(db)
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,167 @@
+from app.services import file_service, trending_service
+from app.config.db_connection import SessionLocal
+from app.crud import file_crud, shared_crud
+import app.models.database as db_models
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from datetime import datetime
+import threading
+import time
+import os
+
+#How often expired uploads and uploads which reached their download limit are removed
+SWEEP_INTERVAL_SECONDS = float(os.getenv("STREAMABIT_SWEEP_INTERVAL_SECONDS", 600))
+
+#Uploads removed per transaction, pause between transactions and transactions per run. Together they cap the rate of
+#row deletes and freed files, the rest of the backlog is left for following runs
+SWEEP_BATCH_SIZE = int(os.getenv("STREAMABIT_SWEEP_BATCH_SIZE", 200))
+SWEEP_BATCH_PAUSE_SECONDS = float(os.getenv("STREAMABIT_SWEEP_BATCH_PAUSE_SECONDS", 1))
+SWEEP_MAX_BATCHES = int(os.getenv("STREAMABIT_SWEEP_MAX_BATCHES", 50))
+
+#UTC hours "start-end" (e.g. "8-22", "22-6") of peak traffic, during which batches hold SWEEP_PEAK_BATCH_SIZE uploads.
+#Empty disables peak hours, peak batch size 0 pauses sweeping during them
+SWEEP_PEAK_HOURS = os.getenv("STREAMABIT_SWEEP_PEAK_HOURS", "")
+SWEEP_PEAK_BATCH_SIZE = int(os.getenv("STREAMABIT_SWEEP_PEAK_BATCH_SIZE", 0))
+
+#Batches give up instead of waiting longer than this for row locks held by requests (PostgreSQL)
+SWEEP_LOCK_TIMEOUT_MS = int(os.getenv("STREAMABIT_SWEEP_LOCK_TIMEOUT_MS", 2000))
+
+
+def parse_peak_hours(value: str):
+    if not value:
+        return None
+    start, end = value.split("-")
+    return int(start) % 24, int(end) % 24
+
+
+PEAK_HOURS = parse_peak_hours(SWEEP_PEAK_HOURS)
+
+
+def is_peak_hour(now: datetime) -> bool:
+    if PEAK_HOURS is None:
+        return False
+    start, end = PEAK_HOURS
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+#Counters of the sweeper of this worker
+class SweepMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.paused_runs = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.removed_uploads = {upload_type.value: 0 for upload_type in db_models.UploadType}
+        self.released_blobs = 0
+        self.backlog = {upload_type.value: None for upload_type in db_models.UploadType}
+        self.last_run_at = None
+        self.last_run_seconds = None
+        self.last_run_removed = 0
+
+    def observe_batch(self, upload_type: db_models.UploadType, removed: int, released: int):
+        with self._lock:
+            self.batches += 1
+            self.removed_uploads[upload_type.value] += removed
+            self.released_blobs += released
+
+    def observe_run(self, started_at: datetime, seconds: float, removed: int, backlog: dict, paused: bool):
+        with self._lock:
+            self.runs += 1
+            if paused:
+                self.paused_runs += 1
+            self.backlog.update(backlog)
+            self.last_run_at = started_at
+            self.last_run_seconds = seconds
+            self.last_run_removed = removed
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            throughput = self.last_run_removed / self.last_run_seconds if self.last_run_seconds else 0.0
+            return {
+                "runs": self.runs,
+                "paused_runs": self.paused_runs,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "removed_uploads": dict(self.removed_uploads),
+                "released_blobs": self.released_blobs,
+                "backlog": dict(self.backlog),
+                "last_run_at": self.last_run_at,
+                "last_run_seconds": self.last_run_seconds,
+                "last_run_removed": self.last_run_removed,
+                "last_run_uploads_per_second": round(throughput, 3)
+            }
+
+
+sweep_metrics = SweepMetrics()
+
+
+#Ids of up to limit expired or exhausted uploads, expired ones first
+def get_sweepable_upload_ids(db: Session, upload_type: db_models.UploadType, now: datetime, limit: int) -> list:
+    upload_ids = file_crud.get_expired_upload_ids(db=db, upload_type=upload_type, now=now, limit=limit)
+    if len(upload_ids) < limit:
+        exhausted_ids = file_crud.get_exhausted_upload_ids(db=db, upload_type=upload_type, limit=limit)
+        upload_ids = list(dict.fromkeys([*upload_ids, *exhausted_ids]))[:limit]
+    return upload_ids
+
+
+#Remove one batch of uploads with their dependent rows in a short transaction and free bytes of blobs left without
+#references once it is committed. Returns the number of removed uploads
+def sweep_batch(db: Session, upload_type: db_models.UploadType, upload_ids: list) -> int:
+    try:
+        shared_crud.set_lock_timeout(db=db, timeout_ms=SWEEP_LOCK_TIMEOUT_MS)
+        file_hashes = file_crud.delete_uploads(db=db, upload_type=upload_type, upload_ids=upload_ids)
+        released = file_service.commit_releasing_blobs(db=db, file_hashes=file_hashes)
+    except Exception:
+        sweep_metrics.increment("failed_batches")
+        shared_crud.rollback(db)
+        raise
+
+    if upload_type == db_models.UploadType.public:
+        trending_service.discard_uploads(upload_ids)
+    sweep_metrics.observe_batch(upload_type=upload_type, removed=len(file_hashes), released=released)
+    return len(file_hashes)
+
+
+#Periodic job - remove expired uploads and uploads which reached their download limit in bounded, paced batches and
+#record the remaining backlog. A batch failing on a lock timeout ends the run, its uploads are retried by the next one
+def sweep_uploads():
+    started_at = datetime.utcnow()
+    started = time.monotonic()
+    peak = is_peak_hour(started_at)
+    batch_size = SWEEP_PEAK_BATCH_SIZE if peak else SWEEP_BATCH_SIZE
+    removed = 0
+    batches = 0
+    db = SessionLocal()
+
+    try:
+        for upload_type in db_models.UploadType:
+            while batch_size > 0 and batches < SWEEP_MAX_BATCHES:
+                upload_ids = get_sweepable_upload_ids(db=db, upload_type=upload_type, now=datetime.utcnow(), limit=batch_size)
+                #End the read transaction, nothing is held while batches are paced
+                shared_crud.rollback(db)
+                if not upload_ids:
+                    break
+
+                removed += sweep_batch(db=db, upload_type=upload_type, upload_ids=upload_ids)
+                batches += 1
+                time.sleep(SWEEP_BATCH_PAUSE_SECONDS)
+
+        backlog = {upload_type.value: file_crud.count_sweepable_uploads(db=db, upload_type=upload_type, now=datetime.utcnow()) for upload_type in db_models.UploadType}
+        shared_crud.rollback(db)
+    finally:
+        db.close()
+
+    seconds = time.monotonic() - started
+    sweep_metrics.observe_run(started_at=started_at, seconds=seconds, removed=removed, backlog=backlog, paused=batch_size <= 0)
+    logger.info(f"Upload sweep finished in {seconds:.1f}s{' (peak hours)' if peak else ''}, removed uploads: {removed}, backlog: {backlog}")
+
+
+def get_sweep_metrics() -> dict:
+    return sweep_metrics.snapshot()
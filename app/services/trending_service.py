@@ -0,0 +1,71 @@
+from app.cache.trending_ranking import trending_ranking, RankedUpload, VIEW_WEIGHT, DOWNLOAD_WEIGHT, LIKE_WEIGHT
+from app.config.db_connection import SessionLocal
+from app.crud import trending_crud
+from app.config.logger import logger
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import timezone
+import os
+
+#How often eligible uploads are reloaded - approvals, removals, expirations and category changes become visible within it
+TRENDING_REFRESH_SECONDS = float(os.getenv("STREAMABIT_TRENDING_REFRESH_SECONDS", 300))
+
+
+#Reload eligible uploads into the ranking and confirm their scores from stored counter totals, which include events
+#flushed by every worker
+def load_trending_ranking(db: Session):
+    uploads, category_names = trending_crud.get_trending_candidates(db=db)
+
+    categories = defaultdict(list)
+    for upload_id, category_name in category_names:
+        categories[upload_id].append(category_name)
+
+    ranked_uploads = []
+    totals = {}
+    for row in uploads:
+        ranked_uploads.append(RankedUpload(upload_id=row.public_upload_id, title=row.title, expiration_date=row.expiration_date, categories=tuple(categories[row.public_upload_id])))
+        total = (row.views or 0) * VIEW_WEIGHT + (row.download_count or 0) * DOWNLOAD_WEIGHT + (row.like_count or 0) * LIKE_WEIGHT
+        totals[row.public_upload_id] = (total, row.uploaded_at.replace(tzinfo=timezone.utc).timestamp())
+
+    trending_ranking.load(ranked_uploads, totals)
+
+
+#Periodic job - reload eligible uploads of the trending ranking and confirm their scores
+def refresh_trending_ranking():
+    db = SessionLocal()
+    try:
+        load_trending_ranking(db=db)
+    finally:
+        db.close()
+
+
+def record_view(upload_id: int):
+    trending_ranking.record(upload_id, VIEW_WEIGHT)
+
+
+def record_download(upload_id: int):
+    trending_ranking.record(upload_id, DOWNLOAD_WEIGHT)
+
+
+def record_like(upload_id: int):
+    trending_ranking.record(upload_id, LIKE_WEIGHT)
+
+
+def discard_uploads(upload_ids: list):
+    trending_ranking.discard(upload_ids)
+
+
+#Best ranked approved public uploads, of one category or of all categories (None)
+def get_top_uploads(db: Session, category_name: str, limit: int):
+    try:
+        logger.info(f"\nPARSING TOP PUBLIC UPLOADS OF CATEGORY: {category_name}" if category_name else "\nPARSING TRENDING PUBLIC UPLOADS")
+        if not trending_ranking.loaded:
+            load_trending_ranking(db=db)
+
+        uploads = trending_ranking.top(category_name, limit)
+
+        logger.info("\nTOP PUBLIC UPLOADS PARSED SUCCESSFULLY")
+        return {"category_name": category_name, "uploads": uploads}
+    except Exception as ex:
+        logger.error(f"\nTOP PUBLIC UPLOADS HAVE NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
+        raise
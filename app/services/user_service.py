@@ -1,53 +1,68 @@
-from app.validators import shared_validator, user_session_validator, user_validator
+from app.validators import shared_validator, user_session_validator, user_validator, validation_engine
 from app.crud import user_crud, shared_crud, user_session_crud as session_crud
+from app.services import pagination_service, session_service
 import app.models.requests as requestModel
+from app.models.json_responses import FastJSONResponse
 from app.config.logger import logger
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from fastapi import HTTPException
 from fastapi import Request
+from app import auth
 
-#Create a new user - validate inputs, roles, jwt access token, hash the password and save freshly created user
-def create_user(db: Session, request: Request, user: requestModel.UserCreate):
+
+#Check if provided email and password belong to the user, db_user is a get_credentials row. Callers release
+#their connection first, verification takes a while
+async def credentials_match(db_user, email: str, password: str) -> bool:
+    return db_user.email == email and await auth.async_verify_password(password, db_user.password_hash)
+
+
+#Account data of a committed user, read in the threadpool so serializing the response does not load expired attributes
+#on the event loop
+def account_data(db_user) -> dict:
+    return {"username": db_user.username, "created_at": db_user.created_at, "email": db_user.email}
+
+
+def save_user(db: Session, user: requestModel.UserCreate, password_hash: str, user_ip: str):
+    db_user = user_crud.create(db=db, user=user, password_hash=password_hash)
+    if db_user is None:
+        logger.warning("\nUSER ACCOUNT CANNOT BE CREATED AS THERE IS AN EXISTING USER WITH THE SAME USERNAME OR EMAIL") 
+        raise HTTPException(status_code=409, detail="Username or email already in use")
+
+    session_crud.create(db=db, user_id=db_user.user_id, user_ip=user_ip)
+    logger.info("\nUSER ACCOUNT HAS BEEN CREATED")
+
+    shared_crud.commit(db)
+    return account_data(db_user)
+
+
+#Create a new user - validate inputs, roles, jwt access token, hash the password and save freshly created user. The
+#password is hashed by the password executor, database work runs in the threadpool
+async def create_user(db: Session, request: Request, user: requestModel.UserCreate):
     try:
         logger.info("\nCREATING USER ACCOUNT")
-        user_validator.validate_username(user.username)
-        user_validator.validate_email(user.email)
-        user_validator.validate_password(user.password)
+        validation_engine.validate_model(user, user_validator.USER_CREATE_RULES)
         
         if user.role:
             logger.info(f"USER PROVIDED ROLE: {user.role.value}") 
-            user_validator.validate_role(user.role.value)
         else:
             logger.info("GOT EMPTY USER ROLE, PROCEEDING FURTHER") 
 
         #Check role if user.role.value == databaseModel.UserRole.admin.value:
         #Add admin validation check here in the future
 
-        existing_user = user_crud.get_by_username_email_id(db=db, username=user.username, email=user.email)
-        if existing_user:
-            logger.warning("\nUSER ACCOUNT CANNOT BE CREATED AS THERE IS AN EXISTING USER WITH THE SAME USERNAME OR EMAIL") 
-            raise HTTPException(status_code=409, detail="Username or email already in use")
-    
-        #Hash and salt password in the future
-
-        user = user_crud.create(db=db, user=user)
-
-        shared_crud.flush(db)
-
         user_session_validator.validate_ip(request.client.host)
-        session_crud.create(db=db, user_id=user.user_id, user_ip=request.client.host)
-        logger.info("\nUSER ACCOUNT HAS BEEN CREATED")
-    
-        shared_crud.commit(db)
-        
-        return user
+
+        password_hash = await auth.async_hash_password(user.password)
+        return await run_in_threadpool(save_user, db=db, user=user, password_hash=password_hash, user_ip=request.client.host)
     except Exception as ex:
-        logger.exception(f"\nUSER ACCOUNT HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
-        shared_crud.rollback(db)
+        logger.error(f"\nUSER ACCOUNT HAS NOT BEEN CREATED, EXCEPTION OCCURED: {ex}")
+        await run_in_threadpool(shared_crud.rollback, db)
         raise
 
 
 #Parse user account specific data - email and account creation date. Method requires user username to parse account data.
+#The identity comes from our own database, so it is encoded directly instead of through the User response model
 def get_user_account_data(db: Session, username: str):
     try:
         logger.info("\nGETTING USER ACCOUNT DATA") 
@@ -59,14 +74,46 @@ def get_user_account_data(db: Session, username: str):
             raise HTTPException(status_code=404, detail="User not found")
     
         logger.info("\nUSER ACCOUNT DATA HAS BEEN PARSED") 
-        return db_user
+        return FastJSONResponse({"username": db_user.username, "created_at": db_user.created_at, "email": db_user.email})
+    except Exception as ex:
+        logger.error(f"USER: {username} DATA CANNOT BE PARSED, EXCEPTION OCCURED: {ex}")
+        raise
+
+
+#Parse one page of usernames ordered by username, starting after the username stored in cursor
+def get_usernames(db: Session, cursor: str, limit: int):
+    try:
+        logger.info("\nPARSING PAGE OF USERNAMES")
+        after = pagination_service.decode_cursor(cursor, str)
+
+        rows = user_crud.get_usernames_page(db=db, after_username=after[0] if after else None, limit=limit)
+        usernames, next_cursor = pagination_service.build_page(rows, limit, lambda username: (username,))
+
+        logger.info("\nUSERNAMES PARSED SUCCESSFULLY")
+        return FastJSONResponse({"usernames": usernames, "next_cursor": next_cursor})
     except Exception as ex:
-        logger.exception(f"USER: {username} DATA CANNOT BE PARSED, EXCEPTION OCCURED: {ex}")
+        logger.error(f"\nUSERNAMES HAVE NOT BEEN PARSED, EXCEPTION OCCURED: {ex}")
         raise
 
 
+#Only the user whose password hash is still the verified one is changed
+def save_user_update(db: Session, username: str, data: requestModel.UserUpdatePassword, password_hash: str, new_password_hash: str):
+    db_user = user_crud.update(db=db, username=username, email=data.email, password_hash=password_hash, new_password=new_password_hash, new_email=data.new_email)
+
+    if db_user is None:
+        logger.warning("CANNOT UPDATE USER ACCOUNT DATA - USER WITH PROVIDED CREDENTIALS NOT FOUND")
+        raise HTTPException(status_code=404, detail="User not found")
+
+    #Tokens issued with the old password stop being accepted
+    session_ids = session_service.revoke_sessions(db=db, user_id=db_user.user_id) if new_password_hash is not None else []
+
+    shared_crud.commit(db)
+    session_service.publish_revocations(session_ids)
+    return account_data(db_user)
+
+
 #Update user account data - email or password by given username, current email, password, optional values: new_email and new_password (one of them is required) 
-def update_user(db: Session, username: str, data: requestModel.UserUpdatePassword):
+async def update_user(db: Session, username: str, data: requestModel.UserUpdatePassword):
     try:
         logger.info("\nUPDATING USER ACCOUNT DATA")
 
@@ -74,14 +121,7 @@ def update_user(db: Session, username: str, data: requestModel.UserUpdatePasswor
             logger.warning("CANNOT UPDATE USER ACCOUNT DATA - NO new_email OR new_password PROVIDED")
             raise shared_validator.ValidationException("No new_email or new_password provided")
 
-        user_validator.validate_username(username)
-        user_validator.validate_email(data.email)
-        user_validator.validate_password(data.password)
-
-        if data.new_email:
-            user_validator.validate_email(data.new_email)
-        if data.new_password:
-            user_validator.validate_password(data.new_password)
+        validation_engine.validate_model(data, user_validator.USER_UPDATE_RULES, username=username)
 
         if data.password == data.new_password:
             logger.warning("CANNOT UPDATE USER ACCOUNT DATA - PROVIDED new_password IS THE SAME AS PROVIDED password")
@@ -90,52 +130,78 @@ def update_user(db: Session, username: str, data: requestModel.UserUpdatePasswor
             logger.warning("CANNOT UPDATE USER ACCOUNT DATA - PROVIDED new_email IS THE SAME AS PROVIDED email")
             raise shared_validator.ValidationException("Old and new email addresses must be different")
 
-        #Hash old password and send it to get_authenticated_user to check if such user with such hashed password exists
-        db_user = user_crud.get_authenticated_user(db=db, username=username, email=data.email, password_hash=data.password)
-
-        shared_crud.flush(db)
-
-        if db_user is None:
+        db_user = await run_in_threadpool(auth.read_credentials, db=db, username=username)
+        if db_user is None or not await credentials_match(db_user=db_user, email=data.email, password=data.password):
             logger.warning("CANNOT UPDATE USER ACCOUNT DATA - USER WITH PROVIDED CREDENTIALS NOT FOUND")
             raise HTTPException(status_code=404, detail="User not found")
-        
-        #Add new password hashing
-        user_crud.update(db=db, usr_id=db_user.user_id, new_password=data.new_password, new_email=data.new_email)
 
-        shared_crud.commit(db)
+        new_password_hash = await auth.async_hash_password(data.new_password) if data.new_password is not None else None
+        user_data = await run_in_threadpool(save_user_update, db=db, username=username, data=data, password_hash=db_user.password_hash, new_password_hash=new_password_hash)
 
         logger.info("SUCCESFULLY UPDATED USER ACCOUNT DATA")
         
-        return db_user
+        return user_data
     except Exception as ex:
-        logger.exception(f"\nUSER ACCOUNT HAS NOT BEEN CHANGED, EXCEPTION OCCURED: {ex}")
-        shared_crud.rollback(db)
+        logger.error(f"\nUSER ACCOUNT HAS NOT BEEN CHANGED, EXCEPTION OCCURED: {ex}")
+        await run_in_threadpool(shared_crud.rollback, db)
         raise
 
 
+def delete_user_account(db: Session, user_id: int):
+    session_ids = session_service.revoke_sessions(db=db, user_id=user_id)
+    user_crud.delete(db=db, user_id=user_id)
+    shared_crud.commit(db)
+    session_service.publish_revocations(session_ids)
+
+
 #Remove user by finding exact user with provided credentials - username, email and password
-def remove_user(db: Session, username: str, data: requestModel.UserDelete):
+async def remove_user(db: Session, username: str, data: requestModel.UserDelete):
     try:
         logger.info("\nREMOVING USER ACCOUNT")
-        user_validator.validate_username(username)
-        user_validator.validate_email(data.email)
-        user_validator.validate_password(data.password)
+        validation_engine.validate_model(data, user_validator.USER_DELETE_RULES, username=username)
     
-        #Pass hashed password
-        db_user = user_crud.get_authenticated_user(db=db, username=username, email=data.email, password_hash=data.password)
-
-        shared_crud.flush(db)
+        db_user = await run_in_threadpool(auth.read_credentials, db=db, username=username)
+        if db_user is not None and not await credentials_match(db_user=db_user, email=data.email, password=data.password):
+            db_user = None
 
         if db_user is None:
             logger.warning("CANNOT REMOVE USER ACCOUNT - USER WITH PROVIDED CREDENTIALS NOT FOUND")
             raise HTTPException(status_code=404, detail="User not found")
 
         #Verify user JWT token
-        user_crud.delete(db=db, user_id=db_user.user_id)
-        shared_crud.commit(db)
+        await run_in_threadpool(delete_user_account, db=db, user_id=db_user.user_id)
         logger.info("\nUSER ACCOUNT REMOVED")
 
     except Exception as ex:
-        logger.exception(f"\nUSER ACCOUNT HAS NOT BEEN REMOVED, EXCEPTION OCCURED: {ex}")
-        shared_crud.rollback(db)
-        raise
\ No newline at end of file
+        logger.error(f"\nUSER ACCOUNT HAS NOT BEEN REMOVED, EXCEPTION OCCURED: {ex}")
+        await run_in_threadpool(shared_crud.rollback, db)
+        raise
+
+
+def start_session(db: Session, db_user, user_ip: str):
+    tokens = session_service.open_session(db=db, db_user=db_user, user_ip=user_ip)
+    shared_crud.commit(db)
+    return tokens
+
+
+#Log user in with username and password and issue access and refresh tokens of a new session. Passwords stored with an
+#outdated work factor are rehashed on the way
+async def login_user(db: Session, request: Request, username: str, password: str):
+    try:
+        logger.info("\nLOGGING USER IN")
+        shared_validator.validate_sql_malicious_input(username)
+        user_session_validator.validate_ip(request.client.host)
+
+        db_user = await auth.authenticate_user(db=db, username=username, password=password)
+        if db_user is None:
+            logger.warning("\nCANNOT LOG USER IN - USERNAME OR PASSWORD INCORRECT")
+            raise HTTPException(status_code=401, detail="Incorrect username or password", headers={"WWW-Authenticate": "Bearer"})
+
+        tokens = await run_in_threadpool(start_session, db=db, db_user=db_user, user_ip=request.client.host)
+
+        logger.info("\nUSER HAS BEEN LOGGED IN")
+        return tokens
+    except Exception as ex:
+        logger.error(f"\nUSER HAS NOT BEEN LOGGED IN, EXCEPTION OCCURED: {ex}")
+        await run_in_threadpool(shared_crud.rollback, db)
+        raise
@@ -0,0 +1,66 @@
+from app.config.logger import logger
+from app.config import storage
+import uuid
+import os
+
+
+#Content addressed location of a blob - files are fanned out into sub-directories by the first hash characters
+def get_blob_path(file_hash: str) -> str:
+    return os.path.join(storage.BLOBS_DIR, file_hash[:2], file_hash[2:4], file_hash)
+
+
+def blob_exists(file_hash: str) -> bool:
+    return os.path.exists(get_blob_path(file_hash))
+
+
+#Move a received file into its blob location. If the blob is already stored the received copy is dropped instead,
+#so each content is kept on disk only once. Returns True when the received file became the stored blob
+def store_blob(temp_path: str, file_hash: str) -> bool:
+    blob_path = get_blob_path(file_hash)
+
+    if os.path.exists(blob_path):
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        logger.info("Blob already stored, received copy dropped")
+        return False
+
+    if not temp_path:
+        raise FileNotFoundError(f"Blob {file_hash} is not stored and no received file was provided")
+
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    os.replace(temp_path, blob_path)
+    logger.info("Blob stored")
+    return True
+
+
+#Move blob out of its content addressed location before the database transaction which released it is committed.
+#A concurrent upload of the same content can then safely store a fresh copy. Returns path of the detached file
+def detach_blob(file_hash: str):
+    blob_path = get_blob_path(file_hash)
+
+    if not os.path.exists(blob_path):
+        return None
+
+    detached_path = os.path.join(storage.TEMP_DIR, f"{uuid.uuid4().hex}.detached")
+    os.replace(blob_path, detached_path)
+    return detached_path
+
+
+#Put detached blob back, used when the transaction which released it was rolled back
+def reattach_blob(file_hash: str, detached_path: str):
+    if detached_path and os.path.exists(detached_path):
+        blob_path = get_blob_path(file_hash)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(detached_path, blob_path)
+
+
+def remove_detached_blob(detached_path: str):
+    if detached_path and os.path.exists(detached_path):
+        os.remove(detached_path)
+
+
+#Move a blob stored by a failed upload back to its received file, so the caller can retry with it
+def unstore_blob(file_hash: str, temp_path: str):
+    blob_path = get_blob_path(file_hash)
+    if os.path.exists(blob_path):
+        os.replace(blob_path, temp_path)
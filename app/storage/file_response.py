@@ -0,0 +1,135 @@
+from starlette.types import Receive, Scope, Send
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from app.config.logger import logger
+from app.config import storage
+from urllib.parse import quote
+from typing import Callable
+import re
+import os
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+#Parse single byte range header value against file size. Returns (start, end) inclusive, None when the header has to be
+#ignored (missing, malformed - including a last byte before the first one - or multiple ranges) and raises ValueError
+#when the range cannot be satisfied
+def parse_range(range_header: str, size: int):
+    if not range_header:
+        return None
+
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+
+    first, last = match.group(1), match.group(2)
+
+    if not first:
+        suffix_length = int(last)
+        if suffix_length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix_length, 0), size - 1
+
+    start = int(first)
+
+    #RFC 9110 makes a range with last < first invalid, the header is ignored and the full file is served
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+
+    end = int(last) if last else size - 1
+
+    return start, min(end, size - 1)
+
+
+#Streams a byte range of a stored file. Transfer is handed off in the following order of preference:
+#reverse proxy (X-Accel-Redirect when STREAMABIT_ACCEL_REDIRECT_PREFIX is configured), ASGI zero-copy send extension
+#(server calls sendfile), positional reads from a thread. on_complete is called with transfer outcome and served range
+class RangeFileResponse(Response):
+    chunk_size = 256 * 1024
+
+    def __init__(self, file_path: str, size: int, etag: str, filename: str, request_headers, on_complete: Callable = None, media_type: str = "application/octet-stream"):
+        self.file_path = file_path
+        self.size = size
+        self.on_complete = on_complete
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        self.body = None
+
+        self.start, self.end = 0, size - 1
+        content_range = None
+
+        if_range = request_headers.get("if-range")
+        byte_range = None
+        if if_range is None or if_range == etag:
+            try:
+                byte_range = parse_range(request_headers.get("range"), size)
+            except ValueError:
+                self.status_code = 416
+                content_range = f"bytes */{size}"
+
+        if byte_range is not None:
+            self.start, self.end = byte_range
+            self.status_code = 206
+            content_range = f"bytes {self.start}-{self.end}/{size}"
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "content-disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+            "content-length": str(0 if self.status_code == 416 else self.end - self.start + 1),
+        }
+        if content_range:
+            headers["content-range"] = content_range
+
+        if storage.ACCEL_REDIRECT_PREFIX and self.status_code != 416:
+            #Reverse proxy serves the file itself and handles the Range header on its own
+            relative_path = os.path.relpath(file_path, storage.BLOBS_DIR).replace(os.sep, "/")
+            headers["x-accel-redirect"] = f"{storage.ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative_path}"
+            headers.pop("content-length")
+            headers.pop("content-range", None)
+            self.status_code = 200
+
+        self.init_headers(headers)
+
+    def _read(self, file_descriptor: int, offset: int, count: int) -> bytes:
+        return os.pread(file_descriptor, count, offset)
+
+    async def _send_body(self, scope: Scope, send: Send):
+        count = self.end - self.start + 1
+
+        with open(self.file_path, "rb", buffering=0) as stored_file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": stored_file, "offset": self.start, "count": count, "more_body": False})
+                return
+
+            file_descriptor = stored_file.fileno()
+            offset = self.start
+            while count > 0:
+                chunk = await run_in_threadpool(self._read, file_descriptor, offset, min(self.chunk_size, count))
+                if not chunk:
+                    raise OSError("Stored file is shorter than expected")
+                offset += len(chunk)
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        successful = False
+
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+            if scope["method"] == "HEAD" or self.status_code == 416 or "x-accel-redirect" in self.headers or self.size == 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                await self._send_body(scope, send)
+
+            successful = self.status_code != 416
+        except OSError as ex:
+            #Client went away or stored file became unreadable in the middle of the transfer
+            logger.warning(f"File transfer interrupted: {ex}")
+        finally:
+            if self.on_complete is not None and scope["method"] != "HEAD":
+                await self.on_complete(successful=successful, start=self.start)
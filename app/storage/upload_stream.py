@@ -0,0 +1,224 @@
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException, Request
+from app.config.logger import logger
+from app.config import storage
+from dataclasses import dataclass
+import hashlib
+import uuid
+import os
+
+
+@dataclass
+class ReceivedFile:
+    temp_path: str
+    file_name: str
+    file_hash: str
+    size_in_bytes: int
+
+
+#Writes incoming bytes to a temporary file in storage while computing SHA-256 and byte count.
+#At most one UPLOAD_CHUNK_SIZE buffer is held in memory, hashing and disk writes run outside of the event loop.
+#When file_path is given bytes are written into that existing file starting at offset and the file is never removed by discard.
+#With store disabled bytes are only hashed, used when the content is already stored and only has to be verified
+class HashingFileWriter:
+    def __init__(self, file_name: str, file_path: str = None, offset: int = 0, max_size: int = storage.MAX_UPLOAD_SIZE, store: bool = True):
+        self.file_name = file_name
+        self.size_in_bytes = 0
+        self.max_size = max_size
+        self._hasher = hashlib.sha256()
+        self._buffer = bytearray()
+
+        if not store:
+            self.temp_path = None
+            self._owns_file = False
+            self._file = None
+        elif file_path:
+            self.temp_path = file_path
+            self._owns_file = False
+            self._file = open(file_path, "r+b", buffering=0)
+            self._file.seek(offset)
+        else:
+            self.temp_path = os.path.join(storage.TEMP_DIR, uuid.uuid4().hex)
+            self._owns_file = True
+            self._file = open(self.temp_path, "wb", buffering=0)
+
+    def feed(self, data: bytes):
+        self._buffer += data
+        self.size_in_bytes += len(data)
+
+        if self.max_size and self.size_in_bytes > self.max_size:
+            raise HTTPException(status_code=413, detail="Uploaded file is too large")
+
+    def _write(self, chunk: bytes):
+        self._hasher.update(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+
+    #Flush buffered bytes to disk once a full chunk is collected, or everything that is left when final is set
+    async def drain(self, final: bool = False):
+        while len(self._buffer) >= storage.UPLOAD_CHUNK_SIZE or (final and self._buffer):
+            chunk = bytes(self._buffer[:storage.UPLOAD_CHUNK_SIZE])
+            del self._buffer[:storage.UPLOAD_CHUNK_SIZE]
+            await run_in_threadpool(self._write, chunk)
+
+    async def close(self) -> ReceivedFile:
+        await self.drain(final=True)
+        if self._file is not None:
+            await run_in_threadpool(self._file.close)
+
+        return ReceivedFile(
+            temp_path=self.temp_path,
+            file_name=self.file_name,
+            file_hash=self._hasher.hexdigest(),
+            size_in_bytes=self.size_in_bytes
+        )
+
+    def discard(self):
+        self._buffer.clear()
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self._owns_file and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+#Multipart callbacks state - file part bytes go to the HashingFileWriter, other parts are collected as bounded form fields
+class MultipartUploadReader:
+    def __init__(self, file_field: str, store_file: bool = True):
+        self.file_field = file_field
+        self.store_file = store_file
+        self.fields = {}
+        self.writer = None
+        self._header_field = b""
+        self._header_value = b""
+        self._part_headers = {}
+        self._part_name = None
+        self._part_is_file = False
+        self._field_value = bytearray()
+
+    def on_part_begin(self):
+        self._part_headers = {}
+        self._part_name = None
+        self._part_is_file = False
+        self._field_value = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._part_headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._part_headers.get(b"content-disposition", b""))
+        self._part_name = options.get(b"name", b"").decode("latin-1")
+
+        if self._part_name == self.file_field and b"filename" in options:
+            if self.writer is not None:
+                raise HTTPException(status_code=400, detail="Only one file can be uploaded per request")
+            self._part_is_file = True
+            self.writer = HashingFileWriter(file_name=options[b"filename"].decode("utf-8", errors="replace"), store=self.store_file)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._part_is_file:
+            self.writer.feed(data[start:end])
+        else:
+            self._field_value += data[start:end]
+            if len(self._field_value) > storage.MAX_FORM_FIELD_SIZE:
+                raise HTTPException(status_code=413, detail=f"Form field '{self._part_name}' is too large")
+
+    def on_part_end(self):
+        if not self._part_is_file and self._part_name:
+            self.fields[self._part_name] = self._field_value.decode("utf-8")
+
+
+#Read multipart/form-data request body chunk by chunk, writing the file part straight to storage.
+#Returns collected form fields and the received file which is left in TEMP_DIR for the caller to move or discard.
+#With store_file disabled the file part is only hashed and received file has no temp_path
+async def receive_multipart_upload(request: Request, file_field: str = "file", store_file: bool = True):
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+
+    if content_type != b"multipart/form-data" or not boundary:
+        logger.warning(f"Upload rejected - unsupported content type: {content_type}")
+        raise HTTPException(status_code=415, detail="Upload must be sent as multipart/form-data")
+
+    reader = MultipartUploadReader(file_field=file_field, store_file=store_file)
+    parser = MultipartParser(boundary, callbacks={
+        "on_part_begin": reader.on_part_begin,
+        "on_part_data": reader.on_part_data,
+        "on_part_end": reader.on_part_end,
+        "on_header_field": reader.on_header_field,
+        "on_header_value": reader.on_header_value,
+        "on_header_end": reader.on_header_end,
+        "on_headers_finished": reader.on_headers_finished,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if reader.writer is not None:
+                await reader.writer.drain()
+        parser.finalize()
+
+        if reader.writer is None:
+            logger.warning("Upload rejected - request contains no file part")
+            raise HTTPException(status_code=400, detail=f"Field '{file_field}' is required.")
+
+        received_file = await reader.writer.close()
+    except Exception:
+        if reader.writer is not None:
+            reader.writer.discard()
+        raise
+
+    logger.info(f"Upload received, size_in_bytes: {received_file.size_in_bytes}")
+    return reader.fields, received_file
+
+
+#Stream raw request body into an existing file at the given offset, used for resumable upload chunks
+async def receive_file_range(request: Request, file_path: str, offset: int, max_size: int) -> ReceivedFile:
+    writer = HashingFileWriter(file_name=os.path.basename(file_path), file_path=file_path, offset=offset, max_size=max_size)
+
+    try:
+        async for chunk in request.stream():
+            writer.feed(chunk)
+            await writer.drain()
+
+        return await writer.close()
+    except Exception:
+        writer.discard()
+        raise
+
+
+#Compute SHA-256 of a stored file by reading it once in UPLOAD_CHUNK_SIZE blocks
+def hash_stored_file(file_path: str) -> str:
+    hasher = hashlib.sha256()
+
+    with open(file_path, "rb", buffering=0) as stored_file:
+        while True:
+            block = stored_file.read(storage.UPLOAD_CHUNK_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+
+    return hasher.hexdigest()
+
+
+#Compute SHA-256 of size bytes of a stored file starting at offset, in UPLOAD_CHUNK_SIZE blocks
+def hash_stored_range(file_path: str, offset: int, size: int) -> str:
+    hasher = hashlib.sha256()
+
+    with open(file_path, "rb", buffering=0) as stored_file:
+        stored_file.seek(offset)
+        while size > 0:
+            block = stored_file.read(min(storage.UPLOAD_CHUNK_SIZE, size))
+            if not block:
+                break
+            hasher.update(block)
+            size -= len(block)
+
+    return hasher.hexdigest()
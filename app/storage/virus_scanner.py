@@ -0,0 +1,69 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+import importlib
+import os
+
+#Scanner used by the scanning pipeline as "module:Class", the class is created without arguments
+SCANNER_CLASS = os.getenv("STREAMABIT_SCANNER", "app.storage.virus_scanner:SignatureScanner")
+
+#Size of a single read from a scanned file
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+#EICAR anti-malware test file, detected by every antivirus product
+EICAR_SIGNATURE = rb"X5O!P%@AP[4\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*"
+
+
+@dataclass(frozen=True)
+class ScanResult:
+    infected: bool
+    signature: Optional[str] = None
+
+
+#Scanner interface. Scanners run in worker processes, so instances have to be picklable and scan() must not rely on
+#state of the application process. A subclass without scan() cannot be created, so it fails when the scanner is loaded
+class Scanner(ABC):
+    name = None
+
+    @abstractmethod
+    def scan(self, file_path: str) -> ScanResult:
+        pass
+
+
+#Local scanner matching byte signatures anywhere in the file, reads are chunked and overlap by the longest signature
+#so matches spanning two chunks are found
+class SignatureScanner(Scanner):
+    name = "signature"
+
+    def __init__(self, signatures: dict = None):
+        self.signatures = signatures if signatures is not None else {"EICAR-Test-File": EICAR_SIGNATURE}
+
+    def scan(self, file_path: str) -> ScanResult:
+        overlap = max((len(pattern) for pattern in self.signatures.values()), default=1) - 1
+        tail = b""
+
+        with open(file_path, "rb") as file:
+            while True:
+                chunk = file.read(SCAN_CHUNK_SIZE)
+                if not chunk:
+                    return ScanResult(infected=False)
+
+                data = tail + chunk
+                for signature, pattern in self.signatures.items():
+                    if pattern in data:
+                        return ScanResult(infected=True, signature=signature)
+                tail = data[-overlap:] if overlap else b""
+
+
+#Create the configured scanner, raises TypeError when the class is not a complete Scanner
+def load_scanner(class_path: str = SCANNER_CLASS) -> Scanner:
+    module_name, class_name = class_path.split(":")
+    scanner_class = getattr(importlib.import_module(module_name), class_name)
+    if not isinstance(scanner_class, type) or not issubclass(scanner_class, Scanner):
+        raise TypeError(f"Scanner {class_path} is not a subclass of {Scanner.__module__}:{Scanner.__name__}")
+    return scanner_class()
+
+
+#Entry point of worker processes
+def scan_file(scanner: Scanner, file_path: str) -> ScanResult:
+    return scanner.scan(file_path)
@@ -0,0 +1,37 @@
+from starlette.concurrency import run_in_threadpool
+from app.config.logger import logger
+from typing import Callable
+import asyncio
+
+
+#Runs a blocking job in the threadpool every interval seconds for the lifetime of the application.
+#Failures are logged and do not stop the schedule
+class PeriodicTask:
+    def __init__(self, name: str, interval: float, job: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.job)
+            except Exception as ex:
+                logger.exception(f"Periodic task {self.name} failed: {ex}")
+
+    def start(self):
+        if self._task is None:
+            logger.info(f"Starting periodic task {self.name}, interval: {self.interval}s")
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info(f"Stopped periodic task {self.name}")
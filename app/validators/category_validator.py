@@ -1,4 +1,4 @@
-from app.validators import shared_validator
+from app.validators import shared_validator, validation_engine
 from app.config.logger import logger
 
 MIN_CATEGORY_NAME_LENGTH = 4
@@ -37,4 +37,16 @@ def validate_category_description(description: str):
             logger.warning(f"Category description length out of bounds, provided description: {description}")
             raise shared_validator.ValidationException(f"Category description must be less than {MAX_DESCRIPTION_LENGTH} characters long")
         
-    logger.info("Category description validation passed")
\ No newline at end of file
+    logger.info("Category description validation passed")
+
+
+#Batch rules for validation_engine.validate_model, name of the updated category comes from the path
+CATEGORY_CREATE_RULES = {
+    "name": validate_category_name,
+    "description": validation_engine.optional(validate_category_description)
+}
+CATEGORY_UPDATE_RULES = {
+    "category_name": validate_category_name,
+    "new_name": validation_engine.optional(validate_category_name),
+    "new_description": validation_engine.optional(validate_category_description)
+}
@@ -0,0 +1,72 @@
+import app.validators.shared_validator as shared_validator
+from app.config.logger import logger
+from app.config import storage
+import re
+
+FILE_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+MAX_COMMENT_LENGTH = 255
+MAX_TITLE_LENGTH = 100
+
+
+#Validate that provided value is a lowercase hex encoded SHA-256 digest
+def validate_file_hash(file_hash: str, field_name: str = "file_hash"):
+    logger.info(f"Validating {field_name}")
+
+    if file_hash is None or not FILE_HASH_PATTERN.match(file_hash):
+        logger.warning(f"Provided {field_name} is not a SHA-256 hex digest: {file_hash}")
+        raise shared_validator.ValidationException(f"{field_name} must be a lowercase hex encoded SHA-256 digest")
+
+    logger.info(f"{field_name} validation passed")
+
+
+#Validate resumable upload size and chunk size, total size must fit into MAX_UPLOAD_SIZE if the limit is set
+def validate_resumable_upload_size(total_size: int, chunk_size: int):
+    logger.info("Validating resumable upload size")
+
+    if total_size is None or total_size <= 0:
+        logger.warning(f"Resumable upload total_size is not positive: {total_size}")
+        raise shared_validator.ValidationException("total_size must be greater than 0")
+
+    if storage.MAX_UPLOAD_SIZE and total_size > storage.MAX_UPLOAD_SIZE:
+        logger.warning(f"Resumable upload total_size exceeds limit: {total_size}")
+        raise shared_validator.ValidationException(f"total_size cannot exceed {storage.MAX_UPLOAD_SIZE} bytes")
+
+    if chunk_size < storage.MIN_RESUMABLE_CHUNK_SIZE or chunk_size > storage.MAX_RESUMABLE_CHUNK_SIZE:
+        logger.warning(f"Resumable upload chunk_size out of bounds: {chunk_size}")
+        raise shared_validator.ValidationException(f"chunk_size must be between {storage.MIN_RESUMABLE_CHUNK_SIZE} and {storage.MAX_RESUMABLE_CHUNK_SIZE} bytes")
+
+    logger.info("Resumable upload size validation passed")
+
+
+#Validate comment content - not blank, fits into comment.content column and contains no possible SQL query
+def validate_comment_content(content: str):
+    logger.info("Validating comment content")
+
+    if content is None or not content.strip():
+        logger.warning("Comment content is empty")
+        raise shared_validator.ValidationException("Comment content cannot be empty")
+
+    if len(content) > MAX_COMMENT_LENGTH:
+        logger.warning(f"Comment content length out of bounds: {len(content)}")
+        raise shared_validator.ValidationException(f"Comment content must be less than {MAX_COMMENT_LENGTH} characters long")
+
+    shared_validator.validate_sql_malicious_input(content)
+
+    logger.info("Comment content validation passed")
+
+
+#Validate upload title - not blank, fits into the title column and contains no possible SQL query
+def validate_title(title: str):
+    logger.info("Validating title")
+
+    if title is None or not title.strip():
+        logger.warning("Title is empty")
+        raise shared_validator.ValidationException("Title cannot be empty")
+
+    if len(title) > MAX_TITLE_LENGTH:
+        logger.warning(f"Title length out of bounds: {len(title)}")
+        raise shared_validator.ValidationException(f"Title must be at most {MAX_TITLE_LENGTH} characters long")
+
+    shared_validator.validate_sql_malicious_input(title)
+
+    logger.info("Title validation passed")
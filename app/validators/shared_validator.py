@@ -1,8 +1,8 @@
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi import HTTPException, Request
+from app.validators import validation_engine
 from app.config.logger import logger
-import re
 
 class ValidationException(HTTPException):
     def __init__(self, message: str):
@@ -16,7 +16,7 @@ class ValidationException(HTTPException):
 def letters_numbers_only(input: str) -> bool:
     logger.info("Validating input")
     
-    if re.search(r'[^a-zA-Z0-9]', input):
+    if validation_engine.SPECIAL_CHARACTER_PATTERN.search(input):
         logger.warning(f"Input contains illegal chars, input string: {input}")
         return False
     
@@ -27,33 +27,9 @@ def letters_numbers_only(input: str) -> bool:
 #Perform a check if provided input possibly contains SQL query
 def validate_sql_malicious_input(*args):
     logger.info("Validating input")
-    malicious_patterns = [
-        r"\bselect\b",
-        r"\bdrop\b",
-        r"\binsert\b",
-        r"\bupdate\b",
-        r"\bdelete\b",
-        r"\bunion\b",
-        r"\balter\b",
-        r"\bcreate\b",
-        r"\brename\b",
-        r"\btruncate\b",
-        r"\bgrant\b",
-        r"\brevoke\b",
-        r"\bexec\b",
-        r"\bexecute\b",
-        r"\bxp_\b",
-        r"\bsp_\b",
-        r"\binformation_schema\b",
-        r"\bsysobjects\b",
-        r"\bsyscolumns\b"
-    ]
-
-    pattern = re.compile("|".join(malicious_patterns), re.IGNORECASE)
-    
     for arg in args:
         if arg is not None:
-            if pattern.search(arg):
+            if validation_engine.contains_sql_keyword(arg):
                 logger.warning(f"Input contains possible SQL query: {arg}")
                 raise ValidationException("Possible malicious input detected")
     
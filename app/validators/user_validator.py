@@ -1,7 +1,7 @@
 import app.validators.shared_validator as shared_validator
+from app.validators import validation_engine
 import app.models.database as databaseModel
 from app.config.logger import logger
-import re
 
 MIN_USERNAME_LENGTH = 4
 MAX_USERNAME_LENGTH = 50
@@ -18,15 +18,17 @@ def validate_username(username: str):
     logger.info(f"Validating username format")
 
     if username is not None:
-        
-        shared_validator.validate_sql_malicious_input(username)
+        if validation_engine.contains_sql_keyword(username):
+            logger.warning(f"Input contains possible SQL query: {username}")
+            raise shared_validator.ValidationException("Possible malicious input detected")
 
         username_length = len(username)
         if username_length < MIN_USERNAME_LENGTH or username_length > MAX_USERNAME_LENGTH:
             logger.warning(f"Username length out of bounds, provided username: {username}")
             raise shared_validator.ValidationException(f"Username must be between {MIN_USERNAME_LENGTH} and {MAX_USERNAME_LENGTH} characters long")
     
-        if not shared_validator.letters_numbers_only(username):
+        if validation_engine.SPECIAL_CHARACTER_PATTERN.search(username):
+            logger.warning(f"Input contains illegal chars, input string: {username}")
             raise shared_validator.ValidationException("Username contains special characters")
     
         logger.info("Username validation passed")
@@ -47,8 +49,7 @@ def validate_email(email: str):
             logger.warning(f"Email length out of bounds, provided email: {email}")
             raise shared_validator.ValidationException(f"Email must be between {MIN_EMAIL_LENGTH} and {MAX_EMAIL_LENGTH} characters long")
 
-        email_pattern = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9-]+\.[a-zA-Z]{2,}$')
-        if not email_pattern.match(email):
+        if not validation_engine.EMAIL_PATTERN.match(email):
             logger.warning(f"Provided email is invalid: {email}")
             raise shared_validator.ValidationException("Invalid email format")
         
@@ -76,15 +77,15 @@ def validate_password(password: str):
         logger.warning("Provided password is too long") 
         raise shared_validator.ValidationException(f"Password length cannot exceed {MAX_PASSWORD_LENGTH} characters") 
     
-    if not re.search(r'[A-Z]', password): 
+    if not validation_engine.UPPERCASE_PATTERN.search(password): 
         logger.warning("Password must contain at least one uppercase letter") 
         raise shared_validator.ValidationException("Password must contain at least one uppercase letter") 
     
-    if not re.search(r'[0-9]', password): 
+    if not validation_engine.DIGIT_PATTERN.search(password): 
         logger.warning("Password must contain at least one number") 
         raise shared_validator.ValidationException("Password must contain at least one number") 
     
-    if not re.search(r'[^a-zA-Z0-9]', password): 
+    if not validation_engine.SPECIAL_CHARACTER_PATTERN.search(password): 
         logger.warning("Password must contain at least one special character") 
         raise shared_validator.ValidationException("Password must contain at least one special character") 
     logger.info("Password validation passed") 
@@ -97,8 +98,6 @@ def validate_role(role: str):
     if role:
         shared_validator.validate_sql_malicious_input(role)
 
-        enum_values = [enum.value for enum in databaseModel.UserRole.__members__.values()]
-
         try:
             valid_role = databaseModel.UserRole(role)
         except ValueError:
@@ -109,4 +108,30 @@ def validate_role(role: str):
         logger.warning("No user role provided") 
         raise shared_validator.ValidationException("Missing user role") 
     
-    logger.info("User role validation passed")
\ No newline at end of file
+    logger.info("User role validation passed")
+
+
+#Validate role given as UserRole member or its value
+def validate_role_field(role):
+    validate_role(getattr(role, "value", role))
+
+
+#Batch rules for validation_engine.validate_model, username of update and delete requests comes from the path
+USER_CREATE_RULES = {
+    "username": validate_username,
+    "email": validate_email,
+    "password": validate_password,
+    "role": validation_engine.optional(validate_role_field)
+}
+USER_UPDATE_RULES = {
+    "username": validate_username,
+    "email": validate_email,
+    "password": validate_password,
+    "new_email": validation_engine.optional(validate_email),
+    "new_password": validation_engine.optional(validate_password)
+}
+USER_DELETE_RULES = {
+    "username": validate_username,
+    "email": validate_email,
+    "password": validate_password
+}
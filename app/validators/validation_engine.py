@@ -0,0 +1,36 @@
+from typing import Callable, Dict
+import re
+
+#All patterns are compiled once at import, validators only run them
+
+SQL_KEYWORDS = (
+    "select", "drop", "insert", "update", "delete", "union", "alter", "create", "rename", "truncate",
+    "grant", "revoke", "exec", "execute", "xp_", "sp_", "information_schema", "sysobjects", "syscolumns"
+)
+
+SQL_KEYWORD_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in SQL_KEYWORDS) + r")\b", re.IGNORECASE)
+SPECIAL_CHARACTER_PATTERN = re.compile(r"[^a-zA-Z0-9]")
+UPPERCASE_PATTERN = re.compile(r"[A-Z]")
+DIGIT_PATTERN = re.compile(r"[0-9]")
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9-]+\.[a-zA-Z]{2,}$')
+IPV4_PATTERN = re.compile(r'^(?:(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])\.){3}(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])$')
+IPV6_PATTERN = re.compile(r'^(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}$|^(::(?:[0-9a-fA-F]{1,4}:){0,6}[0-9a-fA-F]{1,4})$')
+
+
+def contains_sql_keyword(value: str) -> bool:
+    return SQL_KEYWORD_PATTERN.search(value) is not None
+
+
+#Wrap a field validator so the field is only checked when a value is provided
+def optional(validator: Callable) -> Callable:
+    def validate(value):
+        if value is not None:
+            validator(value)
+    return validate
+
+
+#Validate a whole request model in one call. rules maps field name to its validator, values passed as keyword arguments
+#(e.g. path parameters) are validated together with model fields. The first failing rule raises its ValidationException
+def validate_model(model, rules: Dict[str, Callable], **values):
+    for field_name, validator in rules.items():
+        validator(values[field_name] if field_name in values else getattr(model, field_name))
@@ -0,0 +1,62 @@
+#Compare sync (threadpool) and async (event loop) variants of the same endpoints under concurrent load.
+#Start the API first (uvicorn app.main:app) and create the user which is read, then run:
+#python benchmarks/async_db_benchmark.py --base-url http://localhost:8000 --username alice1 --concurrency 500
+from statistics import mean, quantiles
+import argparse
+import asyncio
+import time
+import httpx
+
+
+async def run_load(client: httpx.AsyncClient, path: str, concurrency: int, requests_count: int):
+    latencies = []
+    failures = 0
+    remaining = iter(range(requests_count))
+
+    async def worker():
+        nonlocal failures
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    failures += 1
+            except httpx.HTTPError:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "path": path,
+        "requests_per_second": requests_count / elapsed,
+        "mean_ms": mean(latencies) * 1000,
+        "p50_ms": percentiles[49] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "failures": failures
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync and async database endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="alice1")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=10000)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        for path in (f"/user/{args.username}", f"/async/user/{args.username}", "/categories/", "/async/categories/"):
+            #Warm up connections and database pool before measuring
+            await run_load(client, path, min(args.concurrency, 50), 200)
+            result = await run_load(client, path, args.concurrency, args.requests)
+            print(f"{result['path']:<40} {result['requests_per_second']:>9.1f} req/s  mean {result['mean_ms']:>8.1f} ms  "
+                  f"p50 {result['p50_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  failures {result['failures']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+#Response serialization of hot read endpoints - the default path (response_model validation, jsonable_encoder and
+#JSONResponse) against direct encoding of database rows and the pre-encoded category tree. Logging is disabled.
+#python benchmarks/json_benchmark.py --items 50 500 --number 2000
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.logger import logger
+logger.remove()
+
+from app.cache.user_identity_cache import UserIdentity
+from app.cache.category_tree_cache import build_category_tree
+from app.models.json_responses import FastJSONResponse, EncodedJSONResponse, encode_page, orjson
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from fastapi.responses import JSONResponse
+import app.models.responses as responseModel
+import app.models.database as databaseModel
+from datetime import datetime
+import argparse
+import timeit
+
+USER = UserIdentity(user_id=1, username="benchmarkuser", email="benchmark.user@example.com",
+                    role=databaseModel.UserRole.registered_user, created_at=datetime(2024, 5, 17, 12, 30, 15, 123456))
+
+
+#Run a coroutine which never suspends, serialize_response only awaits when validation runs in a threadpool
+def run(coroutine):
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("Coroutine suspended")
+
+
+#Body produced for an endpoint returning content with response_model, the path every endpoint used before
+def default_path(field, content) -> bytes:
+    return JSONResponse(run(serialize_response(field=field, response_content=content, is_coroutine=True))).body
+
+
+def build_benchmarks(items: int) -> list:
+    titles = {"titles": [f"Uploaded file number {index} with a realistic title" for index in range(items)], "next_cursor": "WyJ0aXRsZSIsIDEyM10"}
+    rows = [(index, f"Category {index:05d}", None, f"Sub-category {index % 7}") for index in range(items)]
+    tree = build_category_tree(rows)
+    categories = {"categories": [{"name": name} for name in tree.names], "next_cursor": None}
+    sub_categories = {"category_name": "Music", "sub_categories": [{"name": f"Sub-category {index}"} for index in range(items)]}
+    encoded_sub_categories = build_category_tree([(1, "Music", None, sub_category["name"]) for sub_category in sub_categories["sub_categories"]]).by_name["Music"]
+
+    user_field = create_response_field(name="user", type_=responseModel.User)
+    title_field = create_response_field(name="titles", type_=responseModel.TitleList)
+    category_field = create_response_field(name="categories", type_=responseModel.CategoryList)
+    sub_category_field = create_response_field(name="sub_categories", type_=responseModel.SubCategories)
+
+    return [
+        ("user, default", lambda: default_path(user_field, USER)),
+        ("user, direct", lambda: FastJSONResponse({"username": USER.username, "created_at": USER.created_at, "email": USER.email}).body),
+        (f"{items} titles, default", lambda: default_path(title_field, titles)),
+        (f"{items} titles, direct", lambda: FastJSONResponse(titles).body),
+        (f"{items} categories, default", lambda: default_path(category_field, categories)),
+        (f"{items} categories, pre-encoded", lambda: EncodedJSONResponse(encode_page("categories", tree.categories, None)).body),
+        (f"{items} sub-categories, default", lambda: default_path(sub_category_field, sub_categories)),
+        (f"{items} sub-categories, pre-encoded", lambda: EncodedJSONResponse(encoded_sub_categories).body),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("--items", type=int, nargs="+", default=[50, 500], help="items per list response")
+    parser.add_argument("--number", type=int, default=2000, help="responses per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per benchmark, the best one is reported")
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson is not None else 'json'}")
+    for items in args.items:
+        for name, benchmark in build_benchmarks(items):
+            best = min(timeit.repeat(benchmark, number=args.number, repeat=args.repeat))
+            print(f"{name:<36} {best / args.number * 1e6:>10.2f} us/response")
+
+
+if __name__ == "__main__":
+    main()
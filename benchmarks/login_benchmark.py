@@ -0,0 +1,54 @@
+#Password verification throughput, the CPU cost of a login. Verifications run in a password executor of 1..--max-workers
+#threads for every bcrypt work factor, logins per second are reported in total and per busy core.
+#python benchmarks/login_benchmark.py --rounds 10 12 --logins 64
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.logger import logger
+logger.remove()
+
+#No tokens are signed, auth only needs a key to import
+os.environ.setdefault("STREAMABIT_JWT_SECRET", "login-benchmark")
+
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from app import auth
+import argparse
+import time
+
+PASSWORD = "Benchmark1!password"
+
+
+def measure(context: CryptContext, password_hash: str, workers: int, logins: int) -> float:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(lambda _: context.verify_and_update(PASSWORD, password_hash), range(logins)))
+        elapsed = time.perf_counter() - started
+
+    assert all(valid for valid, _ in results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login password verification throughput")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[auth.PASSWORD_HASH_ROUNDS])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--max-workers", type=int, default=auth.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'workers':>7} {'logins/s':>10} {'logins/s/core':>14} {'ms/login':>9}")
+    for rounds in args.rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+        password_hash = context.hash(PASSWORD)
+
+        workers = 1
+        while workers <= args.max_workers:
+            throughput = measure(context, password_hash, workers, args.logins)
+            per_core = throughput / min(workers, os.cpu_count() or 1)
+            print(f"{rounds:>6} {workers:>7} {throughput:>10.1f} {per_core:>14.1f} {1000 / per_core:>9.1f}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#Microbenchmarks of input validators against their implementations at a baseline revision, which are loaded from git.
+#Logging is disabled so only validation work is measured.
+#python benchmarks/validator_benchmark.py --number 20000 --baseline <revision>
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.logger import logger
+logger.remove()
+
+from app.validators import category_validator, shared_validator, user_session_validator, user_validator, validation_engine
+import app.models.requests as requestModel
+import subprocess
+import argparse
+import timeit
+import types
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_MODULES = ("shared_validator", "user_validator", "user_session_validator", "category_validator")
+
+USER = requestModel.UserCreate(username="benchmarkuser", email="benchmark.user@example.com", password="Benchmark1!password")
+CATEGORY_UPDATE = requestModel.CategoryUpdate(new_name="Documents", new_description="Text documents, spreadsheets and presentations")
+LONG_TEXT = "A description of an uploaded file which is long enough to look like real user input " * 3
+
+
+def get_root_revision() -> str:
+    return subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=REPOSITORY, check=True, capture_output=True, text=True).stdout.split()[0]
+
+
+#Validator modules exactly as they were at revision. Baseline validators call the baseline shared_validator
+def load_baseline(revision: str) -> dict:
+    modules = {}
+    for name in BASELINE_MODULES:
+        source = subprocess.run(["git", "show", f"{revision}:app/validators/{name}.py"], cwd=REPOSITORY, check=True, capture_output=True, text=True).stdout
+        module = types.ModuleType(f"baseline_{name}")
+        exec(compile(source, f"{revision}:app/validators/{name}.py", "exec"), module.__dict__)
+        modules[name] = module
+
+    for module in modules.values():
+        if hasattr(module, "shared_validator"):
+            module.shared_validator = modules["shared_validator"]
+    return modules
+
+
+#Validation of a created user as the baseline service ran it, field by field
+def baseline_create_user_validation(baseline: dict, user):
+    baseline["user_validator"].validate_username(user.username)
+    baseline["user_validator"].validate_email(user.email)
+    baseline["user_validator"].validate_password(user.password)
+
+
+def baseline_category_update_validation(baseline: dict, category_name: str, data):
+    baseline["category_validator"].validate_category_name(category_name)
+    baseline["category_validator"].validate_category_name(data.new_name)
+    baseline["category_validator"].validate_category_description(data.new_description)
+
+
+def get_benchmarks(baseline: dict) -> list:
+    return [
+        ("baseline sql keyword check (long text)", lambda: baseline["shared_validator"].validate_sql_malicious_input(LONG_TEXT)),
+        ("sql keyword check (long text)", lambda: shared_validator.validate_sql_malicious_input(LONG_TEXT)),
+        ("baseline validate_username", lambda: baseline["user_validator"].validate_username(USER.username)),
+        ("validate_username", lambda: user_validator.validate_username(USER.username)),
+        ("baseline validate_email", lambda: baseline["user_validator"].validate_email(USER.email)),
+        ("validate_email", lambda: user_validator.validate_email(USER.email)),
+        ("baseline validate_password", lambda: baseline["user_validator"].validate_password(USER.password)),
+        ("validate_password", lambda: user_validator.validate_password(USER.password)),
+        ("baseline validate_ip ipv4", lambda: baseline["user_session_validator"].validate_ip("192.168.100.200")),
+        ("validate_ip ipv4", lambda: user_session_validator.validate_ip("192.168.100.200")),
+        ("baseline validate_ip ipv6", lambda: baseline["user_session_validator"].validate_ip("2001:0db8:85a3:0000:0000:8a2e:0370:7334")),
+        ("validate_ip ipv6", lambda: user_session_validator.validate_ip("2001:0db8:85a3:0000:0000:8a2e:0370:7334")),
+        ("baseline create user validation", lambda: baseline_create_user_validation(baseline, USER)),
+        ("validate_model UserCreate", lambda: validation_engine.validate_model(USER, user_validator.USER_CREATE_RULES)),
+        ("baseline category update validation", lambda: baseline_category_update_validation(baseline, "Music", CATEGORY_UPDATE)),
+        ("validate_model CategoryUpdate", lambda: validation_engine.validate_model(CATEGORY_UPDATE, category_validator.CATEGORY_UPDATE_RULES, category_name="Music")),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark input validators")
+    parser.add_argument("--number", type=int, default=20000, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per benchmark, the best one is reported")
+    parser.add_argument("--baseline", default=None, help="git revision whose validators are the baseline, the root commit by default")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline or get_root_revision())
+
+    for name, benchmark in get_benchmarks(baseline):
+        best = min(timeit.repeat(benchmark, number=args.number, repeat=args.repeat))
+        print(f"{name:<40} {best / args.number * 1e6:>8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
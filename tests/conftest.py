@@ -0,0 +1,92 @@
+#Tests run against SQLite in a temporary directory, which also holds storage and logs. Environment has to be set
+#before the first app import, settings are read when modules are imported
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix="streamabit-tests-")
+os.chdir(TEST_DIR)
+os.environ.setdefault("STREAMABIT_JWT_SECRET", "test-secret")
+os.environ.setdefault("STREAMABIT_BCRYPT_ROUNDS", "4")
+os.environ.setdefault("STREAMABIT_STORAGE_DIR", os.path.join(TEST_DIR, "storage"))
+os.environ.setdefault("STREAMABIT_DATABASE_URL", f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}")
+os.environ.setdefault("STREAMABIT_ASYNC_DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(TEST_DIR, 'test.db')}")
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy import BigInteger, text
+import pytest
+
+
+#SQLite only autoincrements INTEGER PRIMARY KEY columns
+@compiles(BigInteger, "sqlite")
+def compile_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+import app.models.database as db_models
+
+#PostgreSQL defaults SQLite cannot evaluate, the affected columns are always set by the application
+for table in db_models.Base.metadata.tables.values():
+    for column in table.columns:
+        default = getattr(column.server_default, "arg", None)
+        if default == "CURRENT_TIMESTAMP":
+            column.server_default.arg = text("CURRENT_TIMESTAMP")
+        elif default is not None and "INTERVAL" in str(default):
+            column.server_default = None
+
+
+@pytest.fixture
+def db_engine():
+    from app.cache.user_identity_cache import user_identity_cache
+    from app.config.db_connection import engine
+
+    db_models.Base.metadata.drop_all(bind=engine)
+    db_models.Base.metadata.create_all(bind=engine)
+    user_identity_cache.clear()
+    yield engine
+    user_identity_cache.clear()
+
+
+@pytest.fixture
+def client(db_engine):
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    #TestClient reports its address as "testclient", routes validating client IPs need a real one
+    async def app_with_client_address(scope, receive, send):
+        if scope["type"] == "http":
+            scope["client"] = ("127.0.0.1", 50000)
+        await main.app(scope, receive, send)
+
+    return TestClient(app_with_client_address)
+
+
+@pytest.fixture
+def make_user(db_engine):
+    from app.config.db_connection import SessionLocal
+    from app import auth
+
+    def make(username: str = "testuser1", email: str = "test.user@example.com", password: str = "Passw0rd!", role: db_models.UserRole = db_models.UserRole.registered_user):
+        db = SessionLocal()
+        try:
+            db_user = db_models.User(username=username, email=email, password_hash=auth.compute_password_hash(password), role=role)
+            db.add(db_user)
+            db.commit()
+            return db_user.user_id
+        finally:
+            db.close()
+
+    return make
+
+
+@pytest.fixture
+def login(client):
+    def log_in(username: str = "testuser1", password: str = "Passw0rd!") -> dict:
+        response = client.post("/token", data={"username": username, "password": password})
+        assert response.status_code == 200
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return log_in
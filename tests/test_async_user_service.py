@@ -0,0 +1,21 @@
+from app.config.db_connection import async_engine
+from app import auth
+
+
+def test_connection_is_released_before_credentials_are_verified(client, make_user, monkeypatch):
+    make_user()
+    checked_out = []
+    compute_verify_and_update = auth.compute_verify_and_update
+
+    def verify(password: str, stored_hash: str) -> tuple:
+        checked_out.append(async_engine.pool.checkedout())
+        return compute_verify_and_update(password, stored_hash)
+
+    monkeypatch.setattr(auth, "compute_verify_and_update", verify)
+
+    response = client.patch("/async/user/testuser1", json={"email": "test.user@example.com", "password": "Passw0rd!", "new_email": "new.user@example.com"})
+    assert response.status_code == 200
+    response = client.request("DELETE", "/async/users/testuser1", json={"email": "new.user@example.com", "password": "Passw0rd!"})
+    assert response.status_code == 204
+
+    assert checked_out == [0, 0]
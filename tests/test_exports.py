@@ -0,0 +1,26 @@
+import app.models.database as db_models
+import pytest
+import json
+
+EXPORTS = ["/admin/exports/users", "/admin/exports/files"]
+
+
+@pytest.mark.parametrize("path", EXPORTS)
+def test_export_requires_access_token(client, path):
+    assert client.get(path).status_code == 401
+
+
+@pytest.mark.parametrize("path", EXPORTS)
+def test_export_is_refused_to_registered_users(client, make_user, login, path):
+    make_user()
+    assert client.get(path, headers=login()).status_code == 403
+
+
+def test_admin_exports_users(client, make_user, login):
+    make_user()
+    make_user(username="adminuser1", email="admin.user@example.com", role=db_models.UserRole.admin)
+
+    response = client.get("/admin/exports/users", headers=login("adminuser1"))
+
+    assert response.status_code == 200
+    assert sorted(json.loads(line)["username"] for line in response.text.splitlines()) == ["adminuser1", "testuser1"]
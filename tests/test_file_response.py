@@ -0,0 +1,111 @@
+from app.storage.file_response import RangeFileResponse, parse_range
+from starlette.testclient import TestClient
+import pytest
+import os
+
+CONTENT = bytes(range(256)) * 4
+ETAG = '"0123456789abcdef"'
+
+
+@pytest.mark.parametrize("range_header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, len(CONTENT) - 1)),
+    ("bytes=-10", (len(CONTENT) - 10, len(CONTENT) - 1)),
+    ("bytes=-5000", (0, len(CONTENT) - 1)),
+    ("bytes=1000-5000", (1000, len(CONTENT) - 1)),
+    (" bytes=3-3 ", (3, 3)),
+])
+def test_parse_range(range_header, expected):
+    assert parse_range(range_header, len(CONTENT)) == expected
+
+
+@pytest.mark.parametrize("range_header", [None, "", "bytes=5-2", "bytes=-", "bytes=0-1,4-5", "items=0-9", "bytes=a-b"])
+def test_parse_range_ignores_invalid_headers(range_header):
+    assert parse_range(range_header, len(CONTENT)) is None
+
+
+@pytest.mark.parametrize("range_header, size", [("bytes=1024-", 1024), ("bytes=2000-3000", 1024), ("bytes=-0", 1024), ("bytes=-10", 0)])
+def test_parse_range_rejects_unsatisfiable_ranges(range_header, size):
+    with pytest.raises(ValueError):
+        parse_range(range_header, size)
+
+
+@pytest.fixture
+def stored_file(tmp_path):
+    file_path = tmp_path / "blob"
+    file_path.write_bytes(CONTENT)
+    return str(file_path)
+
+
+@pytest.fixture
+def file_client(stored_file):
+    completions = []
+
+    async def on_complete(successful: bool, start: int):
+        completions.append((successful, start))
+
+    async def app(scope, receive, send):
+        headers = {key.decode(): value.decode() for key, value in scope["headers"]}
+        response = RangeFileResponse(file_path=stored_file, size=os.path.getsize(stored_file), etag=ETAG, filename="file name.bin", request_headers=headers, on_complete=on_complete)
+        await response(scope, receive, send)
+
+    client = TestClient(app)
+    client.completions = completions
+    return client
+
+
+def test_full_file_is_served_without_range(file_client):
+    response = file_client.get("/")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == ETAG
+    assert response.headers["content-disposition"] == "attachment; filename*=UTF-8''file%20name.bin"
+    assert file_client.completions == [(True, 0)]
+
+
+@pytest.mark.parametrize("range_header, start, end", [("bytes=100-199", 100, 199), ("bytes=1000-", 1000, 1023), ("bytes=-24", 1000, 1023)])
+def test_byte_range_is_served(file_client, range_header, start, end):
+    response = file_client.get("/", headers={"Range": range_header})
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+    assert file_client.completions == [(True, start)]
+
+
+@pytest.mark.parametrize("range_header", ["bytes=5-2", "bytes=0-1,4-5"])
+def test_invalid_or_multiple_ranges_serve_the_full_file(file_client, range_header):
+    response = file_client.get("/", headers={"Range": range_header})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert "content-range" not in response.headers
+
+
+def test_range_starting_past_the_end_is_unsatisfiable(file_client):
+    response = file_client.get("/", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.content == b""
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+    assert file_client.completions == [(False, 0)]
+
+
+def test_if_range_with_matching_etag_serves_the_range(file_client):
+    response = file_client.get("/", headers={"Range": "bytes=10-19", "If-Range": ETAG})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+
+
+def test_if_range_with_stale_etag_serves_the_full_file(file_client):
+    response = file_client.get("/", headers={"Range": "bytes=10-19", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert "content-range" not in response.headers
+
+
+def test_head_sends_headers_only(file_client):
+    response = file_client.head("/", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.content == b""
+    assert response.headers["content-length"] == "10"
+    assert file_client.completions == []
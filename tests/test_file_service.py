@@ -0,0 +1,51 @@
+from app.config.db_connection import SessionLocal
+import app.models.database as db_models
+import os
+
+
+def upload(client, user_id: int, public: bool = True) -> int:
+    response = client.post(f"/files/?user_id={user_id}", files={"file": ("file.bin", os.urandom(1000))}, data={
+        "title": "original", "public": str(public).lower(), "expiration_date": "2030-01-01T00:00:00"
+    })
+    assert response.status_code == 201
+    return response.json()["upload_id"]
+
+
+def stored_title(upload_type: db_models.UploadType, upload_id: int) -> str:
+    db = SessionLocal()
+    try:
+        if upload_type == db_models.UploadType.public:
+            return db.get(db_models.PublicUpload, upload_id).title
+        return db.get(db_models.PrivateUpload, upload_id).title
+    finally:
+        db.close()
+
+
+def test_owner_updates_upload_title(client, make_user):
+    user_id = make_user()
+    public_id = upload(client, user_id)
+    private_id = upload(client, user_id, public=False)
+
+    response = client.patch(f"/files/{public_id}", json={"user_id": user_id, "new_title": "renamed", "password": "Passw0rd!"})
+    assert response.status_code == 200
+    assert response.json() == {"title": "renamed"}
+    assert stored_title(db_models.UploadType.public, public_id) == "renamed"
+
+    response = client.patch(f"/files/{private_id}?upload_type=private", json={"user_id": user_id, "new_title": "renamed private", "password": "Passw0rd!"})
+    assert response.status_code == 200
+    assert stored_title(db_models.UploadType.private, private_id) == "renamed private"
+
+
+def test_title_update_is_rejected_for_wrong_password_or_other_owner(client, make_user):
+    user_id = make_user()
+    other_id = make_user(username="testuser2", email="other.user@example.com")
+    upload_id = upload(client, user_id)
+
+    response = client.patch(f"/files/{upload_id}", json={"user_id": user_id, "new_title": "renamed", "password": "WrongPassw0rd!"})
+    assert response.status_code == 404
+    response = client.patch(f"/files/{upload_id}", json={"user_id": other_id, "new_title": "renamed", "password": "Passw0rd!"})
+    assert response.status_code == 403
+    response = client.patch(f"/files/{upload_id + 1000}", json={"user_id": user_id, "new_title": "renamed", "password": "Passw0rd!"})
+    assert response.status_code == 404
+
+    assert stored_title(db_models.UploadType.public, upload_id) == "original"
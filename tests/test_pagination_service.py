@@ -0,0 +1,46 @@
+from app.validators.shared_validator import ValidationException
+from app.services import pagination_service
+import pytest
+
+
+@pytest.mark.parametrize("key, types", [
+    (("alice",), (str,)),
+    (("title with spaces", 42), (str, int)),
+    ((0.25, 7), (float, int)),
+    (("ünïcödé", 1), (str, int)),
+])
+def test_cursor_round_trip(key, types):
+    cursor = pagination_service.encode_cursor(*key)
+    assert "=" not in cursor
+    assert pagination_service.decode_cursor(cursor, *types) == key
+
+
+def test_missing_cursor_is_first_page():
+    assert pagination_service.decode_cursor(None, str) is None
+
+
+@pytest.mark.parametrize("cursor, types", [
+    ("not a cursor", (str,)),
+    (pagination_service.encode_cursor("alice"), (str, int)),
+    (pagination_service.encode_cursor("alice", 1), (str,)),
+    (pagination_service.encode_cursor("1"), (int,)),
+    (pagination_service.encode_cursor(True), (int,)),
+    ("eyJhIjoxfQ", (str,)),
+])
+def test_invalid_cursor_is_rejected(cursor, types):
+    with pytest.raises(ValidationException):
+        pagination_service.decode_cursor(cursor, *types)
+
+
+def test_build_page_returns_cursor_of_last_row_when_more_rows_exist():
+    rows = [("a", 1), ("b", 2), ("c", 3)]
+    page, next_cursor = pagination_service.build_page(rows, 2, lambda row: row)
+
+    assert page == rows[:2]
+    assert pagination_service.decode_cursor(next_cursor, str, int) == ("b", 2)
+
+
+def test_build_page_has_no_cursor_on_last_page():
+    rows = [("a", 1), ("b", 2)]
+    assert pagination_service.build_page(rows, 2, lambda row: row) == (rows, None)
+    assert pagination_service.build_page([], 2, lambda row: row) == ([], None)
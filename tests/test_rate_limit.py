@@ -0,0 +1,37 @@
+from app.middleware.rate_limit import RateLimitMiddleware, RouteLimit
+from app.cache.token_buckets import LocalTokenBuckets, RateLimit
+from starlette.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+IP_LIMIT = RateLimit(rate=1 / 60, burst=3)
+USER_LIMIT = RateLimit(rate=1 / 60, burst=1)
+
+
+def rate_limited_client():
+    async def app(scope, receive, send):
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    routes = [RouteLimit("user_update", "PATCH", r"/user/(?P<username>[^/]+)", ip_limit=IP_LIMIT, user_limit=USER_LIMIT)]
+    return TestClient(RateLimitMiddleware(app, routes=routes, buckets=LocalTokenBuckets(max_entries=100)))
+
+
+def test_request_rejected_by_user_bucket_does_not_take_ip_token():
+    client = rate_limited_client()
+
+    assert client.patch("/user/first").status_code == 200
+    for _ in range(5):
+        response = client.patch("/user/first")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+
+    #Two of the three ip tokens are left for other users behind the same address
+    assert client.patch("/user/second").status_code == 200
+    assert client.patch("/user/third").status_code == 200
+    assert client.patch("/user/fourth").status_code == 429
+
+
+def test_routes_without_limits_pass_through():
+    client = rate_limited_client()
+
+    for _ in range(5):
+        assert client.get("/user/first").status_code == 200
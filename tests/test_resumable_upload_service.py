@@ -0,0 +1,97 @@
+from app.services import resumable_upload_service
+from app.config.db_connection import SessionLocal
+import app.models.database as db_models
+from app.crud import file_crud
+from datetime import datetime, timedelta
+import hashlib
+import pytest
+import os
+
+CHUNK_SIZE = 256 * 1024
+
+
+def start_upload(client, user_id: int, content: bytes) -> str:
+    response = client.post(f"/files/uploads/?user_id={user_id}", json={
+        "title": "resumable", "public": False, "expiration_date": "2030-01-01T00:00:00",
+        "total_size": len(content), "file_hash": hashlib.sha256(content).hexdigest(), "chunk_size": CHUNK_SIZE
+    })
+    assert response.status_code == 201
+    return response.json()["upload_key"]
+
+
+def send_chunks(client, upload_key: str, content: bytes):
+    for index in range(-(-len(content) // CHUNK_SIZE)):
+        chunk = content[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+        response = client.put(f"/files/uploads/{upload_key}/chunks/{index}", content=chunk, headers={"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()})
+        assert response.status_code == 200
+
+
+def get_partial_path(upload_key: str) -> str:
+    db = SessionLocal()
+    try:
+        return resumable_upload_service.get_partial_path(db.query(db_models.ResumableUpload).filter_by(upload_key=upload_key).one())
+    finally:
+        db.close()
+
+
+def fail_upload_creation(**kwargs):
+    raise RuntimeError("Database unavailable")
+
+
+def test_complete_is_retried_after_upload_creation_fails(client, make_user, monkeypatch):
+    content = os.urandom(CHUNK_SIZE + 1000)
+    upload_key = start_upload(client, make_user(), content)
+    send_chunks(client, upload_key, content)
+    partial_path = get_partial_path(upload_key)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(file_crud, "create_private_upload", fail_upload_creation)
+        with pytest.raises(RuntimeError):
+            client.post(f"/files/uploads/{upload_key}/complete")
+
+    assert os.path.exists(partial_path)
+    assert client.get(f"/files/uploads/{upload_key}").json()["received_offset"] == len(content)
+
+    response = client.post(f"/files/uploads/{upload_key}/complete")
+    assert response.status_code == 201
+    assert client.get(f"/files/private/{response.json()['download_link']}/download").content == content
+
+
+def test_upload_is_discarded_when_failed_completion_dropped_its_duplicate_content(client, make_user, monkeypatch):
+    user_id = make_user()
+    content = os.urandom(CHUNK_SIZE + 1000)
+    stored_key = start_upload(client, user_id, content)
+    send_chunks(client, stored_key, content)
+    assert client.post(f"/files/uploads/{stored_key}/complete").status_code == 201
+
+    upload_key = start_upload(client, user_id, content)
+    send_chunks(client, upload_key, content)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(file_crud, "create_private_upload", fail_upload_creation)
+        with pytest.raises(RuntimeError):
+            client.post(f"/files/uploads/{upload_key}/complete")
+
+    assert client.get(f"/files/uploads/{upload_key}").status_code == 404
+    assert client.post(f"/files/uploads/{upload_key}/complete").status_code == 404
+
+
+def expire_upload(upload_key: str):
+    db = SessionLocal()
+    try:
+        db.query(db_models.ResumableUpload).filter_by(upload_key=upload_key).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_expired_upload_is_not_found_before_it_is_removed(client, make_user):
+    content = os.urandom(CHUNK_SIZE + 1000)
+    upload_key = start_upload(client, make_user(), content)
+    send_chunks(client, upload_key, content[:CHUNK_SIZE])
+    expire_upload(upload_key)
+
+    chunk = content[CHUNK_SIZE:]
+    assert client.get(f"/files/uploads/{upload_key}").status_code == 404
+    assert client.put(f"/files/uploads/{upload_key}/chunks/1", content=chunk, headers={"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()}).status_code == 404
+    assert client.post(f"/files/uploads/{upload_key}/complete").status_code == 404
@@ -0,0 +1,65 @@
+from app.cache.revocation_filter import BloomFilter, RevocationFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for key in range(0, 3000, 3):
+        bloom.add(key)
+
+    assert all(key in bloom for key in range(0, 3000, 3))
+
+
+def test_bloom_filter_false_positive_rate_stays_near_error_rate():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for key in range(10000):
+        bloom.add(key)
+
+    false_positives = sum(key in bloom for key in range(10000, 110000))
+    assert false_positives / 100000 < 0.02
+
+
+def test_added_sessions_are_revoked():
+    revocations = RevocationFilter(capacity=100, error_rate=0.01)
+    revocations.add([1, 2])
+
+    assert revocations.is_revoked(1) and revocations.is_revoked(2)
+    assert not revocations.is_revoked(3)
+
+
+def test_bloom_false_positive_is_not_revoked():
+    revocations = RevocationFilter(capacity=100, error_rate=0.01)
+    bloom, revoked = revocations._state
+    bloom.add(7)
+
+    assert 7 in bloom
+    assert not revocations.is_revoked(7)
+
+
+def test_install_replaces_revocations_when_nothing_was_added_meanwhile():
+    revocations = RevocationFilter(capacity=100, error_rate=0.01)
+    revocations.add([1])
+    generation = revocations.generation
+
+    revocations.install([2, 3], generation)
+
+    assert revocations.loaded
+    assert not revocations.is_revoked(1)
+    assert revocations.is_revoked(2) and revocations.is_revoked(3)
+
+
+def test_install_keeps_revocations_added_while_loading():
+    revocations = RevocationFilter(capacity=100, error_rate=0.01)
+    generation = revocations.generation
+    revocations.add([5])
+
+    revocations.install([2], generation)
+
+    assert revocations.is_revoked(5) and revocations.is_revoked(2)
+
+
+def test_install_grows_filter_past_its_capacity():
+    revocations = RevocationFilter(capacity=10, error_rate=0.01)
+    revocations.install(list(range(1000)), revocations.generation)
+
+    assert all(revocations.is_revoked(session_id) for session_id in range(1000))
+    assert revocations._state[0].size > BloomFilter(10, 0.01).size
@@ -0,0 +1,77 @@
+from app.storage.virus_scanner import SignatureScanner
+from concurrent.futures import ThreadPoolExecutor
+from app.config.db_connection import SessionLocal
+from app.services import scan_service
+import app.models.database as db_models
+from app.crud import scan_crud
+import hashlib
+import os
+
+
+def upload(client, user_id: int, content: bytes) -> str:
+    response = client.post(f"/files/?user_id={user_id}", files={"file": ("file.bin", content)}, data={
+        "title": "scanned", "public": "true", "expiration_date": "2030-01-01T00:00:00"
+    })
+    assert response.status_code == 201
+    return hashlib.sha256(content).hexdigest()
+
+
+def create_pipeline() -> scan_service.ScanPipeline:
+    pipeline = scan_service.ScanPipeline(workers=1, queue_size=10)
+    pipeline._scanner = SignatureScanner()
+    pipeline._executor = ThreadPoolExecutor(max_workers=1)
+    return pipeline
+
+
+def run_queued(pipeline: scan_service.ScanPipeline):
+    pipeline._queue.put(None)
+    pipeline._run()
+
+
+def test_content_submitted_while_verdict_is_recorded_is_queued_again(client, make_user, monkeypatch):
+    file_hash = upload(client, make_user(), os.urandom(1000))
+    pipeline = create_pipeline()
+    submitted = []
+    record_verdict = scan_service.record_verdict
+
+    #An upload of the same content committed before the verdict, so it did not get virus_free from it
+    def record_with_concurrent_upload(**kwargs):
+        submitted.append(pipeline.submit(file_hash))
+        record_verdict(**kwargs)
+
+    monkeypatch.setattr(scan_service, "record_verdict", record_with_concurrent_upload)
+    pipeline.submit(file_hash)
+    run_queued(pipeline)
+
+    assert submitted == [True]
+    assert pipeline._queue.get_nowait() == file_hash
+    assert file_hash in pipeline._queued
+
+
+def test_stored_verdict_is_applied_without_scanning(client, make_user, monkeypatch):
+    file_hash = upload(client, make_user(), os.urandom(1000))
+    pipeline = create_pipeline()
+    assert pipeline.submit(file_hash)
+    run_queued(pipeline)
+
+    db = SessionLocal()
+    try:
+        assert scan_crud.get_verdict(db=db, file_hash=file_hash).infected is False
+        upload_row = db.query(db_models.PublicUpload).filter_by(file_hash=file_hash).one()
+        assert upload_row.virus_free is True
+
+        upload_row.virus_free = False
+        db.commit()
+    finally:
+        db.close()
+
+    monkeypatch.setattr(pipeline._executor, "submit", None)
+    pipeline.submit(file_hash)
+    run_queued(pipeline)
+
+    db = SessionLocal()
+    try:
+        assert db.query(db_models.PublicUpload).filter_by(file_hash=file_hash).one().virus_free is True
+    finally:
+        db.close()
+    assert not pipeline._queued
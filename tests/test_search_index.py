@@ -0,0 +1,70 @@
+from app.cache.search_index import CATEGORY_WEIGHT, DESCRIPTION_WEIGHT, TITLE_WEIGHT, InvertedIndex, SearchIndex, tokenize
+import pytest
+
+UPLOADS = [
+    (1, "Jazz Piano Lessons", "Beginner piano course"),
+    (2, "Piano sheet music", None),
+    (3, "Guitar lessons", "Learn jazz guitar"),
+]
+CATEGORY_NAMES = [
+    (2, "Classical", "Music"),
+    (3, "Jazz", "Music"),
+]
+
+
+def test_tokenize_lowercases_words():
+    assert tokenize("Jazz-Piano, lessons_2!") == ["jazz", "piano", "lessons_2"]
+    assert tokenize(None) == []
+    assert tokenize("") == []
+
+
+def test_postings_weigh_title_category_and_description_terms():
+    index = InvertedIndex.build(UPLOADS, CATEGORY_NAMES)
+
+    assert index.postings["piano"] == {1: TITLE_WEIGHT + DESCRIPTION_WEIGHT, 2: TITLE_WEIGHT}
+    assert index.postings["music"] == {2: TITLE_WEIGHT + CATEGORY_WEIGHT, 3: CATEGORY_WEIGHT}
+    assert index.postings["jazz"] == {1: TITLE_WEIGHT, 3: DESCRIPTION_WEIGHT + CATEGORY_WEIGHT}
+
+
+def test_search_requires_every_term_and_ranks_best_first():
+    index = InvertedIndex.build(UPLOADS, CATEGORY_NAMES)
+
+    assert index.search(["jazz"]) == [(TITLE_WEIGHT, 1), (pytest.approx(DESCRIPTION_WEIGHT + CATEGORY_WEIGHT), 3)]
+    assert index.search(["jazz", "lessons"]) == [(TITLE_WEIGHT * 2, 1), (pytest.approx(TITLE_WEIGHT + DESCRIPTION_WEIGHT + CATEGORY_WEIGHT), 3)]
+    assert index.search(["piano", "music"]) == [(TITLE_WEIGHT * 2 + CATEGORY_WEIGHT, 2)]
+
+
+def test_search_ties_are_ordered_by_upload_id_descending():
+    index = InvertedIndex.build([(1, "report", None), (5, "report", None), (3, "report", None)], [])
+    assert index.search(["report"]) == [(TITLE_WEIGHT, 5), (TITLE_WEIGHT, 3), (TITLE_WEIGHT, 1)]
+
+
+def test_search_without_matches():
+    index = InvertedIndex.build(UPLOADS, CATEGORY_NAMES)
+
+    assert index.search([]) == []
+    assert index.search(["violin"]) == []
+    assert index.search(["jazz", "violin"]) == []
+
+
+def test_index_built_during_invalidation_is_not_installed():
+    search_index = SearchIndex(ttl_seconds=60)
+    index = InvertedIndex.build(UPLOADS, CATEGORY_NAMES)
+
+    generation = search_index.generation
+    search_index.invalidate()
+    search_index.install(index, generation)
+    assert search_index.get() is None
+
+    search_index.install(index, search_index.generation)
+    assert search_index.get() is index
+
+    search_index.invalidate()
+    assert search_index.get() is None
+
+
+def test_index_expires_after_ttl():
+    search_index = SearchIndex(ttl_seconds=0)
+    search_index.install(InvertedIndex.build(UPLOADS, CATEGORY_NAMES), search_index.generation)
+
+    assert search_index.get() is None
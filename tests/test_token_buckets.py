@@ -0,0 +1,81 @@
+from app.cache.token_buckets import LocalTokenBuckets, RateLimit, parse_rate_limit
+import pytest
+
+LIMIT = RateLimit(rate=2.0, burst=3)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5/3600", RateLimit(rate=5 / 3600, burst=5)),
+    ("10/60", RateLimit(rate=10 / 60, burst=10)),
+    ("4", RateLimit(rate=4.0, burst=4)),
+    ("0", None),
+    ("0/60", None),
+])
+def test_parse_rate_limit(value, expected):
+    assert parse_rate_limit(value) == expected
+
+
+def test_burst_is_taken_then_requests_wait_for_refill():
+    buckets = LocalTokenBuckets(max_entries=10)
+
+    assert [buckets.take_all_now([("key", LIMIT)], 100.0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take_all_now([("key", LIMIT)], 100.0) == pytest.approx(0.5)
+    assert buckets.take_all_now([("key", LIMIT)], 100.25) == pytest.approx(0.25)
+
+
+def test_tokens_refill_at_rate_up_to_burst():
+    buckets = LocalTokenBuckets(max_entries=10)
+    for _ in range(3):
+        buckets.take_all_now([("key", LIMIT)], 100.0)
+
+    assert buckets.take_all_now([("key", LIMIT)], 100.5) == 0
+    assert buckets.take_all_now([("key", LIMIT)], 100.5) > 0
+
+    #A long pause refills the bucket only up to its burst
+    assert [buckets.take_all_now([("key", LIMIT)], 1000.0) for _ in range(4)][3] > 0
+
+
+def test_buckets_are_independent():
+    buckets = LocalTokenBuckets(max_entries=10)
+    for _ in range(3):
+        buckets.take_all_now([("first", LIMIT)], 100.0)
+
+    assert buckets.take_all_now([("first", LIMIT)], 100.0) > 0
+    assert buckets.take_all_now([("second", LIMIT)], 100.0) == 0
+
+
+def test_least_recently_used_bucket_is_dropped_and_starts_full():
+    buckets = LocalTokenBuckets(max_entries=2)
+    for _ in range(3):
+        buckets.take_all_now([("first", LIMIT)], 100.0)
+    buckets.take_all_now([("second", LIMIT)], 100.0)
+    buckets.take_all_now([("first", LIMIT)], 100.0)
+
+    buckets.take_all_now([("third", LIMIT)], 100.0)
+
+    assert list(buckets._buckets) == ["first", "third"]
+    assert buckets.take_all_now([("second", LIMIT)], 100.0) == 0
+
+
+def test_tokens_are_taken_from_all_buckets_or_from_none():
+    buckets = LocalTokenBuckets(max_entries=10)
+    small = RateLimit(rate=1.0, burst=1)
+
+    assert buckets.take_all_now([("ip", LIMIT), ("user", small)], 100.0) == 0
+    assert buckets.take_all_now([("ip", LIMIT), ("user", small)], 100.0) == pytest.approx(1.0)
+    assert buckets.take_all_now([("ip", LIMIT), ("user", small)], 100.0) == pytest.approx(1.0)
+
+    #Rejected requests did not take tokens of the ip bucket, two of its three tokens are left
+    assert buckets.take_all_now([("ip", LIMIT)], 100.0) == 0
+    assert buckets.take_all_now([("ip", LIMIT)], 100.0) == 0
+    assert buckets.take_all_now([("ip", LIMIT)], 100.0) > 0
+
+
+def test_wait_is_the_longest_wait_of_empty_buckets():
+    buckets = LocalTokenBuckets(max_entries=10)
+    slow = RateLimit(rate=0.1, burst=1)
+    fast = RateLimit(rate=10.0, burst=1)
+    buckets.take_all_now([("slow", slow), ("fast", fast)], 100.0)
+
+    assert buckets.take_all_now([("slow", slow), ("fast", fast)], 100.0) == pytest.approx(10.0)
+    assert buckets.take_all_now([("slow", slow), ("fast", fast)], 110.0) == 0
@@ -0,0 +1,88 @@
+from app.cache.trending_ranking import RankedUpload, TopList, TrendingRanking
+from datetime import datetime, timedelta
+import random
+
+
+def ranked_ids(top: TopList) -> list:
+    return [upload_id for _, upload_id in top.entries]
+
+
+def test_top_list_orders_by_score_then_upload_id():
+    top = TopList(size=10)
+    top.update(1, 5.0)
+    top.update(2, 9.0)
+    top.update(3, 5.0)
+
+    assert ranked_ids(top) == [2, 1, 3]
+
+
+def test_top_list_moves_upload_when_its_score_changes():
+    top = TopList(size=10)
+    top.update(1, 5.0)
+    top.update(2, 9.0)
+    top.update(1, 12.0)
+
+    assert ranked_ids(top) == [1, 2]
+    assert top.scores == {1: 12.0, 2: 9.0}
+
+
+def test_full_top_list_evicts_lowest_and_ignores_lower_scores():
+    top = TopList(size=2)
+    top.update(1, 5.0)
+    top.update(2, 9.0)
+
+    top.update(3, 1.0)
+    assert ranked_ids(top) == [2, 1]
+
+    top.update(4, 7.0)
+    assert ranked_ids(top) == [2, 4]
+    assert 1 not in top.scores
+
+
+def test_top_list_discard():
+    top = TopList(size=10)
+    top.update(1, 5.0)
+    top.update(2, 9.0)
+
+    top.discard(1)
+    top.discard(42)
+
+    assert ranked_ids(top) == [2]
+    assert top.scores == {2: 9.0}
+
+
+def test_top_list_matches_sorting_of_growing_scores():
+    generator = random.Random(7)
+    top = TopList(size=5)
+    scores = {}
+    for _ in range(500):
+        upload_id = generator.randrange(30)
+        scores[upload_id] = scores.get(upload_id, 0.0) + generator.random()
+        top.update(upload_id, scores[upload_id])
+
+    expected = sorted(scores, key=lambda upload_id: (-scores[upload_id], upload_id))[:5]
+    assert ranked_ids(top) == expected
+
+
+def test_ranking_keeps_category_lists_and_skips_expired_uploads():
+    ranking = TrendingRanking(size=10)
+    future = datetime.utcnow() + timedelta(days=1)
+    past = datetime.utcnow() - timedelta(days=1)
+    uploads = [
+        RankedUpload(upload_id=1, title="first", expiration_date=future, categories=("Music",)),
+        RankedUpload(upload_id=2, title="second", expiration_date=future, categories=()),
+        RankedUpload(upload_id=3, title="expired", expiration_date=past, categories=("Music",)),
+    ]
+    now = datetime.utcnow().timestamp()
+    ranking.load(uploads, {1: (10.0, now), 2: (20.0, now), 3: (30.0, now)})
+
+    assert [upload["upload_id"] for upload in ranking.top(None, 10)] == [2, 1]
+    assert [upload["upload_id"] for upload in ranking.top("Music", 10)] == [1]
+    assert ranking.top("Unknown", 10) == []
+
+    ranking.record(1, 100.0)
+    assert [upload["upload_id"] for upload in ranking.top(None, 1)] == [1]
+
+    ranking.discard([1])
+    assert [upload["upload_id"] for upload in ranking.top(None, 10)] == [2]
+    assert ranking.top("Music", 10) == []
@@ -0,0 +1,52 @@
+from app.config.db_connection import engine
+from app import auth
+import threading
+
+
+def record_hashing(monkeypatch) -> list:
+    calls = []
+    compute_password_hash = auth.compute_password_hash
+    compute_verify_and_update = auth.compute_verify_and_update
+
+    def hash_password(password: str) -> str:
+        calls.append((threading.current_thread().name, engine.pool.checkedout()))
+        return compute_password_hash(password)
+
+    def verify(password: str, stored_hash: str) -> tuple:
+        calls.append((threading.current_thread().name, engine.pool.checkedout()))
+        return compute_verify_and_update(password, stored_hash)
+
+    monkeypatch.setattr(auth, "compute_password_hash", hash_password)
+    monkeypatch.setattr(auth, "compute_verify_and_update", verify)
+    return calls
+
+
+def test_passwords_are_hashed_by_the_password_executor_without_a_connection(client, monkeypatch):
+    calls = record_hashing(monkeypatch)
+
+    response = client.post("/user", json={"username": "testuser1", "email": "test.user@example.com", "password": "Passw0rd!"})
+    assert response.status_code == 201
+    assert response.json()["email"] == "test.user@example.com"
+
+    response = client.post("/token", data={"username": "testuser1", "password": "Passw0rd!"})
+    assert response.status_code == 200
+
+    response = client.patch("/user/testuser1", json={"email": "test.user@example.com", "password": "Passw0rd!", "new_password": "N3wPassw0rd!"})
+    assert response.status_code == 200
+    assert response.json()["username"] == "testuser1"
+
+    response = client.request("DELETE", "/users/testuser1", json={"email": "test.user@example.com", "password": "N3wPassw0rd!"})
+    assert response.status_code == 204
+
+    #create hashes, login verifies, update verifies and hashes, delete verifies
+    assert len(calls) == 5
+    assert all(name.startswith("password-hash") and checked_out == 0 for name, checked_out in calls)
+
+
+def test_login_rejects_wrong_password(client, make_user):
+    make_user()
+
+    response = client.post("/token", data={"username": "testuser1", "password": "WrongPassw0rd!"})
+    assert response.status_code == 401
+    response = client.post("/token", data={"username": "nobody", "password": "Passw0rd!"})
+    assert response.status_code == 401
@@ -0,0 +1,54 @@
+from app.storage.virus_scanner import EICAR_SIGNATURE, ScanResult, Scanner, SignatureScanner, load_scanner
+from app.storage import virus_scanner
+import pytest
+
+CHUNK_SIZE = 16
+SIGNATURE = b"MALICIOUS-PAYLOAD"
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(virus_scanner, "SCAN_CHUNK_SIZE", CHUNK_SIZE)
+
+
+def scan(tmp_path, content: bytes, signatures: dict = None) -> ScanResult:
+    file_path = tmp_path / "scanned"
+    file_path.write_bytes(content)
+    return SignatureScanner(signatures if signatures is not None else {"Test-Signature": SIGNATURE}).scan(str(file_path))
+
+
+@pytest.mark.parametrize("offset", range(0, CHUNK_SIZE * 3))
+def test_signature_is_found_at_every_offset_across_chunk_boundaries(tmp_path, offset):
+    content = b"a" * offset + SIGNATURE + b"b" * CHUNK_SIZE
+    assert scan(tmp_path, content) == ScanResult(infected=True, signature="Test-Signature")
+
+
+def test_signature_longer_than_a_chunk_is_found(tmp_path):
+    signature = bytes(range(65, 65 + CHUNK_SIZE * 2 + 3))
+    content = b"x" * 5 + signature + b"y" * 5
+    assert scan(tmp_path, content, {"Long": signature}).signature == "Long"
+
+
+def test_clean_and_empty_files(tmp_path):
+    assert scan(tmp_path, b"MALICIOUS" + b"-" * CHUNK_SIZE + b"PAYLOAD") == ScanResult(infected=False)
+    assert scan(tmp_path, b"") == ScanResult(infected=False)
+
+
+def test_default_signatures_detect_eicar(tmp_path):
+    file_path = tmp_path / "eicar"
+    file_path.write_bytes(b"header " + EICAR_SIGNATURE)
+    assert SignatureScanner().scan(str(file_path)) == ScanResult(infected=True, signature="EICAR-Test-File")
+
+
+def test_load_scanner_rejects_classes_which_are_not_scanners():
+    assert isinstance(load_scanner("app.storage.virus_scanner:SignatureScanner"), SignatureScanner)
+    with pytest.raises(TypeError):
+        load_scanner("app.storage.virus_scanner:ScanResult")
+
+
+def test_scanner_without_scan_cannot_be_created():
+    class IncompleteScanner(Scanner):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteScanner()